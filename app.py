@@ -3,10 +3,13 @@ Technical ATS Resume Expert - Optimized Version
 A comprehensive resume analysis tool powered by Google Gemini AI.
 """
 import streamlit as st
-import matplotlib.pyplot as plt
+import base64
+import dataclasses
 import os
 import sys
+import uuid
 from pathlib import Path
+from typing import Optional
 
 # Add src directory to Python path
 sys.path.append(str(Path(__file__).parent / "src"))
@@ -15,18 +18,50 @@ from src.config import Config
 from src.utils import PDFProcessor, TextAnalyzer
 from src.ai_service import GeminiService, PromptManager
 from src.visualization import ChartGenerator, UIComponents
+from src.compaction import JobDescriptionCompactor
+from src.session_store import SessionResultStore, AnalysisResult
+from src.matching import IncrementalMatcher, LocalMatcher, ScoringCascade
+from src.profiling import RequestProfiler, RequestTag
+from src.map_reduce import LongResumeAnalyzer
+from src.speculation import SpeculativePipeline
+from src.admission import AdmissionController
+from src.cache import ContentHasher, LRUCache
+from src.memory import MemoryAccountant
+from src.ingestion import DocumentIngestor, TextPreview
 
 # Initialize configuration and services
 Config.validate_config()
 logger = Config.setup_logging()
 
+@st.cache_resource
+def get_gemini_service() -> GeminiService:
+    """Create the AI service once per process and share it across sessions and reruns."""
+    # Caps concurrent model calls process-wide; others wait in line or are turned away
+    return GeminiService(AdmissionController.get())
+
+@st.cache_resource
+def get_shared_results() -> LRUCache:
+    """Results (without previews) shared across sessions so resubmitted resumes reuse them."""
+    cache = LRUCache(
+        max_entries=Config.SHARED_RESULTS_ENTRIES,
+        max_bytes=Config.SHARED_RESULTS_BYTES,
+        sizeof=MemoryAccountant.estimate_size
+    )
+    MemoryAccountant.get().register_shared("results", cache)
+    return cache
+
 # Initialize services
-gemini_service = GeminiService()
+gemini_service = get_gemini_service()
 pdf_processor = PDFProcessor()
 text_analyzer = TextAnalyzer()
 chart_generator = ChartGenerator()
+jd_compactor = JobDescriptionCompactor()
+scoring_cascade = ScoringCascade(LocalMatcher())
+long_resume_analyzer = LongResumeAnalyzer(gemini_service)
 ui = UIComponents()
 
+WHAT_IF_KEY = "_ats_what_if"
+
 def main():
     """Main application function."""
     
@@ -134,6 +169,7 @@ def main():
         - **Smart Resume Analysis**
         - **ATS Compatibility Check**
         - **Skill Gap Identification**
+        - **Live What-if Scoring**
         - **Career Recommendations**
         - **Visual Analytics**
         """)
@@ -153,15 +189,21 @@ def main():
     
     with col2:
         uploaded_file = st.file_uploader(
-            "Upload Resume (PDF)",
-            type=["pdf"],
-            help="Upload your resume in PDF format (max 10MB)"
+            "Upload Resume (PDF, DOCX, TXT, MD, RTF)",
+            type=Config.SUPPORTED_FORMATS,
+            help="Upload your resume as PDF, Word (DOCX), plain text, Markdown or RTF (max 10MB)"
         )
         
         if uploaded_file:
             ui.display_success_message(f"File uploaded: {uploaded_file.name}")
             st.info(f"📄 File size: {uploaded_file.size / 1024:.1f} KB")
     
+    # Preprocess the upload (and optionally prefetch matching) while the user decides
+    # Work this session hands to executors carries its tag, so a profiled request samples it too
+    RequestTag.set(st.session_state.setdefault("_ats_request_tag", uuid.uuid4().hex))
+    speculation = SpeculativePipeline(gemini_service, jd_compactor, scoring_cascade, long_resume_analyzer)
+    speculation.on_inputs(job_description, uploaded_file)
+    
     # Action buttons
     st.header("🚀 Analysis Actions")
     
@@ -176,149 +218,425 @@ def main():
     with button_col3:
         match_resume = st.button("🎯 Match with Job")
     
+    # Live local re-scoring of an editable copy of the resume; the AI only runs on request
+    what_if_text = render_what_if(job_description, uploaded_file, speculation)
+    
     # Process user actions
-    if analyze_resume:
-        handle_resume_analysis(job_description, uploaded_file)
+    results = SessionResultStore()
     
+    prompt_type = None
+    if analyze_resume:
+        prompt_type = 'analysis'
     elif improve_skills:
-        handle_skill_improvement(job_description, uploaded_file)
+        prompt_type = 'improvement'
+    elif match_resume or what_if_text is not None:
+        prompt_type = 'matching'
     
-    elif match_resume:
-        handle_resume_matching(job_description, uploaded_file)
+    if prompt_type:
+        queue_notice = st.empty()
+        
+        def show_queue_position(position: int):
+            # Called on every wait tick, which also lets Streamlit stop a waiting script
+            if position:
+                queue_notice.info(f"⏳ Many analyses are running right now. You are number {position} in line...")
+            else:
+                queue_notice.empty()
+        
+        # Model calls made by this script show its place in line while they wait for admission
+        with AdmissionController.waiting(show_queue_position):
+            # Profiled when forced by env, requested via ?profile=<admin token>, or sampled
+            with RequestProfiler(
+                prompt_type,
+                metadata={
+                    "prompt_type": prompt_type,
+                    "resume_bytes": uploaded_file.size if uploaded_file else 0,
+                    "jd_chars": len(job_description or "")
+                },
+                admin_token=st.query_params.get("profile")
+            ):
+                if what_if_text is not None:
+                    run_what_if_analysis(job_description, what_if_text, results)
+                else:
+                    run_analysis(prompt_type, job_description, uploaded_file, results, speculation)
+    
+    # Results survive reruns (e.g. download clicks) and are re-rendered from memory
+    result = results.active()
+    if result:
+        display_result(result)
 
-def handle_resume_analysis(job_description: str, uploaded_file):
-    """Handle resume analysis workflow."""
+def run_analysis(prompt_type: str, job_description: str, uploaded_file, results: SessionResultStore,
+                 speculation: SpeculativePipeline):
+    """Run an analysis, or reuse the stored result for the same resume, JD and prompt."""
     
     if not validate_inputs(job_description, uploaded_file):
         return
     
-    # Process PDF
-    pdf_image, pdf_base64 = pdf_processor.process_pdf(uploaded_file)
-    if not pdf_image or not pdf_base64:
+    # Validated, hashed and rendered (PDFs only) in the background since the upload
+    prepared = speculation.prepared_resume(uploaded_file)
+    if prepared.error:
+        st.error(f"⚠️ {prepared.error}")
         return
+    document = prepared.validated
     
-    # Get AI response
-    response = gemini_service.generate_response(
-        job_description, 
-        pdf_base64, 
-        PromptManager.get_prompt('analysis')
-    )
+    compacted_jd = prepare_job_description(job_description)
+    key = SessionResultStore.make_key(document.content_hash, compacted_jd.cache_key, prompt_type)
     
-    if response:
-        st.header("📊 Resume Analysis Results")
-        
-        # Display resume image
-        col1, col2 = st.columns([1, 2])
+    stored = results.get(key)
+    if stored and stored.source != 'fallback':
+        logger.info(f"Reusing stored {prompt_type} result")
+        results.activate(key)
+        return
+    
+    # Text documents are sent as text and previewed from it; only PDFs have a rendered page
+    pdf_base64 = None if prepared.is_text else prepared.pdf_base64
+    preview_jpeg = base64.b64decode(pdf_base64) if pdf_base64 else b""
+    preview_text = document.text[:Config.TEXT_PREVIEW_CHARS] if prepared.is_text else ""
+    pdf_image = None if prepared.is_text else prepared.page_image()
+    
+    reused = find_reusable_result(results, prompt_type, document, compacted_jd, pdf_image)
+    if pdf_image:
+        pdf_image.close()  # Only the encoded JPEG is kept
+    if reused:
+        results.put(dataclasses.replace(
+            reused,
+            key=key,
+            preview_jpeg=preview_jpeg,
+            preview_text=preview_text,
+            resume_hash=document.content_hash,
+            downgraded=False
+        ))
+        results.activate(key)
+        return
+    
+    # Matching starts with the local tier of the scoring cascade
+    decision = None
+    if prompt_type == 'matching':
+        profile = DocumentIngestor.profile(document)
+        decision = scoring_cascade.decide(profile.full_text, compacted_jd.text)
+    
+    if decision and Config.CASCADE_ENABLED and not decision.escalate:
+        # Clear rejects and clear strong matches don't need the LLM
+        logger.info(f"Cascade resolved match locally ({decision.verdict}, {decision.local.score}%)")
+        source = 'cascade'
+        response = decision.local.to_ats_response(
+            note=f"Resolved by local keyword screening as a clear {'match' if decision.verdict == 'strong' else 'mismatch'}."
+        )
+    else:
+        source = 'llm'
         
-        with col1:
-            st.image(pdf_image, caption="📄 Resume Preview", width=400)
+        # Matching can fall back to the local score when the AI service is down
+        def local_fallback() -> str:
+            nonlocal source
+            source = 'fallback'
+            return decision.local.to_ats_response()
         
-        with col2:
-            st.markdown("### 🔍 Detailed Analysis")
-            st.markdown(response)
+        # Get AI response
+        if not prepared.is_text and LongResumeAnalyzer.should_use(document.page_count):
+            # Multi-page resumes are digested page by page instead of sending only the first page image
+            response = long_resume_analyzer.analyze(
+                compacted_jd.text,
+                document.data,
+                PromptManager.get_prompt(prompt_type),
+                fallback=local_fallback if decision else None
+            )
+        else:
+            # A prefetch started before the click is used (or joined) instead of a new request
+            response = None
+            if decision:
+                response = speculation.prefetched_response(document.content_hash, compacted_jd.cache_key)
+            
+            if not response and prepared.is_text:
+                # The whole extracted text fits in one call; no page image is needed
+                response = gemini_service.generate_text_response(
+                    compacted_jd.text,
+                    DocumentIngestor.profile(document).prompt_text(prompt_type),
+                    PromptManager.get_prompt(prompt_type),
+                    fallback=local_fallback if decision else None
+                )
+            elif not response:
+                response = gemini_service.generate_response(
+                    compacted_jd.text, 
+                    pdf_base64, 
+                    PromptManager.get_prompt(prompt_type),
+                    fallback=local_fallback if decision else None
+                )
         
-        # Download option
-        ui.create_download_button(
-            response, 
-            "resume_analysis.txt", 
-            "📥 Download Analysis Report"
+        if response and decision and source == 'llm':
+            scoring_cascade.log_llm_score(decision.local.score, text_analyzer.extract_match_percentage(response),
+                                        decision.local.jd_skills, decision.audit)
+    
+    if not response:
+        return
+    
+    store_result(results, AnalysisResult(
+        key=key,
+        prompt_type=prompt_type,
+        response=response,
+        preview_jpeg=preview_jpeg,
+        resume_hash=document.content_hash,
+        jd_hash=compacted_jd.cache_key,
+        source=source,
+        preview_text=preview_text
+    ))
+
+def render_what_if(job_description: str, uploaded_file, speculation: SpeculativePipeline) -> Optional[str]:
+    """
+    Show the live what-if editor when enabled.
+    
+    The extracted resume text can be edited, and the local match score and
+    missing keywords are updated incrementally on every edit of the resume or
+    the job description, without calling the AI service.
+    
+    Returns:
+        Optional[str]: The edited resume text if AI scoring was requested, else None
+    """
+    if not uploaded_file or not st.checkbox(
+        "🧪 Live what-if mode",
+        help="Edit your resume text and see the local match score update instantly, without using the AI service"
+    ):
+        return None
+    
+    prepared = speculation.prepared_resume(uploaded_file)
+    if prepared.error:
+        st.error(f"⚠️ {prepared.error}")
+        return None
+    document = prepared.validated
+    
+    # Term counts are kept per session and only updated for the lines that change
+    state = st.session_state.setdefault(WHAT_IF_KEY, {})
+    if state.get("resume_hash") != document.content_hash:
+        state.clear()
+        state.update(resume_hash=document.content_hash, matcher=IncrementalMatcher(scoring_cascade.matcher))
+    matcher = state["matcher"]
+    
+    st.header("🧪 What-if Editor")
+    edit_col, score_col = st.columns([2, 1])
+    
+    original_text = DocumentIngestor.profile(document).full_text
+    with edit_col:
+        edited_text = st.text_area(
+            "Resume Text",
+            value=original_text,
+            height=300,
+            key=f"what_if_{document.content_hash}",
+            help="Changes are scored locally as you edit; the uploaded file is not modified"
         )
+    
+    match = matcher.update(resume_text=edited_text, job_description=job_description or "")
+    
+    # The delta compares what-if scores only, so it is hidden until a second edit has been scored;
+    # comparing against the analysis shown above would mix local and AI scores
+    inputs = (edited_text, job_description or "")
+    if edited_text != original_text and state.get("last_inputs") != inputs:
+        state["baseline"] = state.get("last_score")
+        state.update(last_inputs=inputs, last_score=match.score)
+    baseline = state.get("baseline") if edited_text != original_text else None
+    
+    with score_col:
+        delta = match.score - baseline if baseline is not None else 0
+        st.metric("Local Match Score", f"{match.score}%", delta=f"{delta:+d}%" if delta else None,
+                  help="Keyword coverage estimated locally; the delta is relative to your previous edit")
+        st.markdown("**Missing Keywords**")
+        st.markdown("\n".join(f"- {skill}" for skill in match.missing) or "None 🎉")
+        st.caption(f"Matched: {', '.join(match.matched) or 'none'}")
+        score_with_ai = st.button("🤖 Score Edited Resume with AI")
+    
+    return edited_text if score_with_ai else None
 
-def handle_skill_improvement(job_description: str, uploaded_file):
-    """Handle skill improvement workflow."""
+def run_what_if_analysis(job_description: str, resume_text: str, results: SessionResultStore):
+    """Run the AI matching analysis on an edited resume text."""
     
-    if not validate_inputs(job_description, uploaded_file):
+    if not text_analyzer.validate_job_description(job_description):
+        return
+    if not resume_text.strip():
+        ui.display_error_message("The edited resume is empty")
         return
     
-    # Process PDF
-    pdf_image, pdf_base64 = pdf_processor.process_pdf(uploaded_file)
-    if not pdf_image or not pdf_base64:
+    compacted_jd = prepare_job_description(job_description)
+    resume_hash = ContentHasher.hash_text(resume_text)
+    key = SessionResultStore.make_key(resume_hash, compacted_jd.cache_key, 'matching')
+    
+    stored = results.get(key)
+    if stored and stored.source != 'fallback':
+        logger.info("Reusing stored what-if result")
+        results.activate(key)
         return
     
-    # Get AI response
-    response = gemini_service.generate_response(
-        job_description, 
-        pdf_base64, 
-        PromptManager.get_prompt('improvement')
+    response = gemini_service.generate_text_response(
+        compacted_jd.text,
+        resume_text,
+        PromptManager.get_prompt('matching')
     )
+    if not response:
+        return
     
-    if response:
-        st.header("📈 Skill Improvement Suggestions")
-        
-        col1, col2 = st.columns([1, 2])
-        
-        with col1:
-            st.image(pdf_image, caption="📄 Resume Preview", width=400)
-        
-        with col2:
-            st.markdown("### 🎯 Personalized Recommendations")
-            st.markdown(response)
+    store_result(results, AnalysisResult(
+        key=key,
+        prompt_type='matching',
+        response=response,
+        preview_jpeg=b"",
+        resume_hash=resume_hash,
+        jd_hash=compacted_jd.cache_key,
+        preview_text=resume_text[:Config.TEXT_PREVIEW_CHARS]
+    ))
+
+def store_result(results: SessionResultStore, result: AnalysisResult):
+    """Finish a new result (match percentage and chart), store it and make it the active one."""
+    
+    if result.prompt_type == 'matching':
+        # Extract match percentage
+        result.match_percentage = text_analyzer.extract_match_percentage(result.response)
+        pie_chart = chart_generator.create_match_pie_chart(result.match_percentage)
+        if pie_chart:
+            result.chart_png = chart_generator.figure_to_png(pie_chart)  # Also closes the figure
+    
+    results.put(result)
+    results.activate(result.key)
+    if result.source != 'fallback':
+        get_shared_results().put(result.key, dataclasses.replace(result, preview_jpeg=b"", preview_text=""))
+
+def find_reusable_result(results: SessionResultStore, prompt_type: str, document, compacted_jd,
+                         pdf_image) -> Optional[AnalysisResult]:
+    """
+    Return an earlier result for this resume: from any session if byte-identical, else this session's near-duplicate.
+    
+    Args:
+        results: This session's result store
+        prompt_type: Prompt type of the analysis
+        document: Uploaded resume (ValidatedPDF or TextDocument)
+        compacted_jd: Compacted job description
+        pdf_image: Rendered first page, fingerprinted when the resume has no text layer (None for text documents)
         
-        # Download option
-        ui.create_download_button(
-            response, 
-            "skill_improvement_plan.txt", 
-            "📥 Download Improvement Plan"
+    Returns:
+        Optional[AnalysisResult]: Result to reuse, or None
+    """
+    shared = get_shared_results().get(
+        SessionResultStore.make_key(document.content_hash, compacted_jd.cache_key, prompt_type)
+    )
+    if shared:
+        return shared
+    
+    if Config.DEDUP_ENABLED:
+        profile = DocumentIngestor.profile(document)
+        reused = results.find_near_duplicate(
+            document.content_hash, compacted_jd.cache_key, prompt_type, profile.full_text, pdf_image
         )
+        if reused and reused.source != 'fallback':
+            return reused
+    return None
 
-def handle_resume_matching(job_description: str, uploaded_file):
-    """Handle resume matching workflow."""
+def resume_preview(result: AnalysisResult) -> bytes:
+    """Rendered first page of a PDF resume; text resumes get a preview drawn from their text on first display."""
     
-    if not validate_inputs(job_description, uploaded_file):
-        return
+    return result.preview_jpeg or TextPreview.get(result.resume_hash, result.preview_text)
+
+def display_result(result: AnalysisResult):
+    """Render a stored analysis result."""
+    
+    if result.prompt_type == 'matching':
+        display_resume_matching(result)
+    elif result.prompt_type == 'improvement':
+        display_skill_improvement(result)
+    else:
+        display_resume_analysis(result)
+
+def display_resume_analysis(result: AnalysisResult):
+    """Display resume analysis results."""
     
-    # Process PDF
-    pdf_image, pdf_base64 = pdf_processor.process_pdf(uploaded_file)
-    if not pdf_image or not pdf_base64:
-        return
+    st.header("📊 Resume Analysis Results")
     
-    # Get AI response
-    response = gemini_service.generate_response(
-        job_description, 
-        pdf_base64, 
-        PromptManager.get_prompt('matching')
+    # Display resume image
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.image(resume_preview(result), caption="📄 Resume Preview", width=400)
+    
+    with col2:
+        st.markdown("### 🔍 Detailed Analysis")
+        st.markdown(result.response)
+    
+    # Download option
+    ui.create_download_button(
+        result.response, 
+        "resume_analysis.txt", 
+        "📥 Download Analysis Report"
     )
+
+def display_skill_improvement(result: AnalysisResult):
+    """Display skill improvement suggestions."""
     
-    if response:
-        # Extract match percentage
-        match_percentage = text_analyzer.extract_match_percentage(response)
-        
-        st.header("🎯 Resume Matching Results")
-        
-        # Display key metrics
-        metric_col1, metric_col2, metric_col3 = st.columns(3)
-        ui.display_metrics(metric_col1, metric_col2, metric_col3, match_percentage, 100, 100 - match_percentage)
-        
-        # Main content layout
-        col1, col2 = st.columns([1, 1])
-        
-        with col1:
-            st.image(pdf_image, caption="📄 Resume Preview", width=400)
-        
-        with col2:
-            st.subheader("📊 Match Percentage Visualization")
-            pie_chart = chart_generator.create_match_pie_chart(match_percentage)
-            if pie_chart:
-                st.pyplot(pie_chart)
-                plt.close(pie_chart)  # Properly close the figure
-        
-        # Detailed analysis
-        st.markdown("### 📋 Detailed Matching Analysis")
-        st.markdown(response)
-        
-        # Download options
-        col1, col2 = st.columns(2)
-        with col1:
-            ui.create_download_button(
-                response, 
-                "matching_analysis.txt", 
-                "📥 Download Match Report"
+    st.header("📈 Skill Improvement Suggestions")
+    
+    col1, col2 = st.columns([1, 2])
+    
+    with col1:
+        st.image(resume_preview(result), caption="📄 Resume Preview", width=400)
+    
+    with col2:
+        st.markdown("### 🎯 Personalized Recommendations")
+        st.markdown(result.response)
+    
+    # Download option
+    ui.create_download_button(
+        result.response, 
+        "skill_improvement_plan.txt", 
+        "📥 Download Improvement Plan"
+    )
+
+def display_resume_matching(result: AnalysisResult):
+    """Display resume matching results."""
+    
+    match_percentage = result.match_percentage or 0
+    
+    st.header("🎯 Resume Matching Results")
+    
+    # Display key metrics
+    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    ui.display_metrics(metric_col1, metric_col2, metric_col3, match_percentage, 100, 100 - match_percentage)
+    
+    # Main content layout
+    col1, col2 = st.columns([1, 1])
+    
+    with col1:
+        st.image(resume_preview(result), caption="📄 Resume Preview", width=400)
+    
+    with col2:
+        st.subheader("📊 Match Percentage Visualization")
+        if result.chart_png:
+            st.image(result.chart_png)
+    
+    # Detailed analysis
+    st.markdown("### 📋 Detailed Matching Analysis")
+    st.markdown(result.response)
+    
+    # Download options
+    col1, col2 = st.columns(2)
+    with col1:
+        ui.create_download_button(
+            result.response, 
+            "matching_analysis.txt", 
+            "📥 Download Match Report"
+        )
+    
+    with col2:
+        if result.chart_png:
+            st.download_button(
+                label="📥 Download Chart",
+                data=result.chart_png,
+                file_name="match_chart.png",
+                mime="image/png"
             )
-        
-        with col2:
-            if pie_chart:
-                # Save chart as image for download (optional feature)
-                st.info("💡 Chart visualization displayed above")
+
+def prepare_job_description(job_description: str):
+    """Compact the job description before it is sent to the AI service."""
+    
+    compacted_jd = jd_compactor.compact(job_description)
+    if compacted_jd.tokens_saved > 0:
+        st.caption(
+            f"✂️ Job description compacted: ~{compacted_jd.original_tokens} → "
+            f"~{compacted_jd.compacted_tokens} tokens ({compacted_jd.reduction_ratio:.0%} saved)"
+        )
+    return compacted_jd
 
 def validate_inputs(job_description: str, uploaded_file) -> bool:
     """Validate user inputs."""
@@ -327,7 +645,7 @@ def validate_inputs(job_description: str, uploaded_file) -> bool:
         return False
     
     if not uploaded_file:
-        ui.display_error_message("Please upload your resume (PDF format)")
+        ui.display_error_message("Please upload your resume (PDF, DOCX, TXT, Markdown or RTF)")
         return False
     
     return True
@@ -0,0 +1,240 @@
+"""
+Process-wide admission control for the Technical ATS Resume Expert application.
+
+At most ADMISSION_MAX_CONCURRENT model calls run at once. Further requests
+wait in a bounded FIFO queue and are told their position; past the queue
+limit (or after waiting too long) requests are rejected right away so the
+ones admitted still finish in time. Only the model call itself holds a slot,
+so local work (parsing, rendering, charts) never keeps others waiting.
+Queue metrics are exported in the Prometheus text format, as a file for the
+node exporter's textfile collector.
+"""
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Deque, Dict, Optional
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted."""
+
+class AdmissionController:
+    """Caps concurrent model calls with a bounded FIFO wait queue."""
+
+    _instance: Optional["AdmissionController"] = None
+    _instance_lock = threading.Lock()
+    _on_wait: ContextVar[Optional[Callable[[int], None]]] = ContextVar("admission_on_wait", default=None)
+
+    def __init__(self, max_concurrent: int = Config.ADMISSION_MAX_CONCURRENT,
+                 max_queue: int = Config.ADMISSION_MAX_QUEUE, max_wait: float = Config.ADMISSION_MAX_WAIT_SECONDS,
+                 metrics_path: Optional[str] = Config.ADMISSION_METRICS_PATH,
+                 poll_interval: float = Config.ADMISSION_POLL_SECONDS):
+        """
+        Initialize the controller.
+
+        Args:
+            max_concurrent: Model calls allowed to run at the same time
+            max_queue: Requests allowed to wait; more are rejected immediately
+            max_wait: Seconds a request may wait before it is rejected
+            metrics_path: File the Prometheus metrics are written to (None to disable)
+            poll_interval: Seconds between on_wait calls while waiting
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.metrics_path = metrics_path
+        self.poll_interval = poll_interval
+        self._queue: Deque[object] = deque()
+        self._running = 0
+        self._condition = threading.Condition()
+        self._metrics_written = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+        self.timed_out = 0
+        self.wait_seconds_total = 0.0
+        self.max_wait_seconds = 0.0
+
+    @classmethod
+    def get(cls) -> "AdmissionController":
+        """Return the process-wide controller."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @classmethod
+    @contextmanager
+    def waiting(cls, on_wait: Callable[[int], None]):
+        """
+        Report queue positions of admissions made in this context (thread) to on_wait.
+
+        Lets a script show its place in line for model calls made deep inside
+        services, without passing a UI callback through every layer.
+
+        Args:
+            on_wait: Default on_wait for admit() calls in the body
+        """
+        token = cls._on_wait.set(on_wait)
+        try:
+            yield
+        finally:
+            cls._on_wait.reset(token)
+
+    @contextmanager
+    def admit(self, on_wait: Optional[Callable[[int], None]] = None):
+        """
+        Run the body once a slot is free, waiting in line if necessary.
+
+        Args:
+            on_wait: Called with the 1-based queue position on every poll while waiting, so the
+                caller can update its UI and be interrupted, and with 0 once admitted after a wait
+                (defaults to the callback of an enclosing waiting() block)
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait exceeded max_wait
+        """
+        on_wait = on_wait or self._on_wait.get()
+        waited = self._acquire(on_wait)
+        try:
+            if waited and on_wait is not None:
+                on_wait(0)
+            yield
+        finally:
+            with self._condition:
+                self._running -= 1
+                self._condition.notify_all()
+            # Always written on release so the file never keeps reporting finished work
+            self._export_metrics(force=True)
+
+    def _acquire(self, on_wait: Optional[Callable[[int], None]]) -> bool:
+        """Take a slot, waiting in line if necessary; returns True if the request had to wait."""
+        ticket = object()
+        started = time.monotonic()
+
+        with self._condition:
+            if self._running < self.max_concurrent and not self._queue:
+                self._running += 1
+                self.admitted += 1
+                return False
+
+            shed = len(self._queue) >= self.max_queue
+            if shed:
+                self.shed += 1
+                logger.warning(f"Shedding request: {self._running} running, {len(self._queue)} queued")
+            else:
+                self._queue.append(ticket)
+                self.queued += 1
+
+        self._export_metrics(force=shed)
+        if shed:
+            raise AdmissionRejected("The service is at capacity right now. Please try again in a minute.")
+        try:
+            while True:
+                with self._condition:
+                    if self._ready(ticket):
+                        self._queue.popleft()
+                        self._running += 1
+                        self.admitted += 1
+                        waited = time.monotonic() - started
+                        self.wait_seconds_total += waited
+                        self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                        # The next in line may also fit if several slots freed up
+                        self._condition.notify_all()
+                        break
+
+                    remaining = self.max_wait - (time.monotonic() - started)
+                    if remaining <= 0:
+                        self._queue.remove(ticket)
+                        self.timed_out += 1
+                        self._condition.notify_all()
+                        logger.warning(f"Request timed out after waiting {self.max_wait:.0f}s for admission")
+                        raise AdmissionRejected("The service is very busy right now. Please try again in a few minutes.")
+                    position = self._queue.index(ticket) + 1
+
+                # Every tick and outside the lock: a slow UI update doesn't block other requests,
+                # and a Streamlit script gets the chance to notice it was stopped
+                if on_wait is not None:
+                    on_wait(position)
+
+                with self._condition:
+                    if not self._ready(ticket):
+                        self._condition.wait(timeout=min(remaining, self.poll_interval))
+        except BaseException:
+            # e.g. Streamlit stopping the script while it waits; a ticket left behind would block the queue
+            with self._condition:
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._condition.notify_all()
+            raise
+        finally:
+            self._export_metrics()
+        return True
+
+    def _ready(self, ticket: object) -> bool:
+        """True if the ticket is first in line and a slot is free (call with the condition held)."""
+        return self._queue[0] is ticket and self._running < self.max_concurrent
+
+    def stats(self) -> Dict[str, float]:
+        """Return admission statistics."""
+        with self._condition:
+            return {
+                "running": self._running,
+                "waiting": len(self._queue),
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "admitted": self.admitted,
+                "queued": self.queued,
+                "shed": self.shed,
+                "timed_out": self.timed_out,
+                "wait_seconds_total": round(self.wait_seconds_total, 3),
+                "max_wait_seconds": round(self.max_wait_seconds, 3)
+            }
+
+    def prometheus(self) -> str:
+        """Render the statistics in the Prometheus text exposition format."""
+        stats = self.stats()
+        metrics = [
+            ("ats_admission_running", "gauge", "Analyses currently running", stats["running"]),
+            ("ats_admission_waiting", "gauge", "Requests waiting in the admission queue", stats["waiting"]),
+            ("ats_admission_max_concurrent", "gauge", "Concurrent analysis limit", stats["max_concurrent"]),
+            ("ats_admission_max_queue", "gauge", "Admission queue limit", stats["max_queue"]),
+            ("ats_admission_admitted_total", "counter", "Requests admitted", stats["admitted"]),
+            ("ats_admission_queued_total", "counter", "Requests that had to wait", stats["queued"]),
+            ("ats_admission_shed_total", "counter", "Requests rejected because the queue was full", stats["shed"]),
+            ("ats_admission_timed_out_total", "counter", "Requests rejected after waiting too long", stats["timed_out"]),
+            ("ats_admission_wait_seconds_total", "counter", "Total time admitted requests waited",
+             stats["wait_seconds_total"]),
+        ]
+        lines = []
+        for name, kind, description, value in metrics:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _export_metrics(self, force: bool = False) -> None:
+        """Write the metrics file, at most once per second unless forced."""
+        if not self.metrics_path:
+            return
+        now = time.monotonic()
+        if not force and now - self._metrics_written < 1.0:
+            return
+        self._metrics_written = now
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.metrics_path)), exist_ok=True)
+            tmp_path = f"{self.metrics_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as handle:
+                handle.write(self.prometheus())
+            # Atomic replace, so the collector never reads a partial file
+            os.replace(tmp_path, self.metrics_path)
+        except OSError as e:
+            logger.error(f"Error writing admission metrics: {str(e)}")
@@ -1,29 +1,127 @@
 """
 AI service integration for the Technical ATS Resume Expert application.
 """
+import time
 import logging
+import threading
 import streamlit as st
 import google.generativeai as genai
-from typing import Optional, Dict, Any
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable
+from src.admission import AdmissionController, AdmissionRejected
 from src.config import Config
+from src.cache import ContentHasher
+from src.resilience import CircuitBreaker, DeadlineExceeded, HedgedCaller, LatencyTracker, SingleFlight
 
 logger = logging.getLogger(__name__)
 
+class GeminiConcurrencyLimiter:
+    """
+    Process-wide Gemini model shared by all Streamlit sessions, with a cap on concurrent requests.
+    
+    genai.configure() replaces the library's global client, so calling it per
+    session or per rerun throws away established connections. The client is
+    configured once and one model object is shared by every session; its
+    connections are managed by the client library's own transport. This class
+    only bounds how many requests are in flight at once with a fixed number of
+    slots, and tracks slot usage.
+    """
+    
+    _instance: Optional["GeminiConcurrencyLimiter"] = None
+    _instance_lock = threading.Lock()
+    
+    def __init__(self, max_concurrency: int = Config.GEMINI_MAX_CONCURRENCY):
+        """
+        Configure the client and model.
+        
+        Args:
+            max_concurrency: Maximum number of concurrent requests in this process
+        """
+        genai.configure(api_key=Config.GOOGLE_API_KEY, transport=Config.GEMINI_TRANSPORT)
+        self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        self.max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._stats_lock = threading.Lock()
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.requests = 0
+        self.waited = 0
+        self.total_wait = 0.0
+        logger.info(f"Gemini client initialized ({Config.GEMINI_TRANSPORT}, {max_concurrency} concurrent requests)")
+    
+    @classmethod
+    def get(cls) -> "GeminiConcurrencyLimiter":
+        """Return the process-wide limiter, creating it on first use."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+    
+    @contextmanager
+    def lease(self):
+        """Hold one request slot for the duration of a call."""
+        started = time.monotonic()
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.waited += 1
+            self._slots.acquire()
+        
+        with self._stats_lock:
+            self.requests += 1
+            self.total_wait += time.monotonic() - started
+            self.in_use += 1
+            self.peak_in_use = max(self.peak_in_use, self.in_use)
+        try:
+            yield self.model
+        finally:
+            with self._stats_lock:
+                self.in_use -= 1
+            self._slots.release()
+    
+    def stats(self) -> Dict[str, Any]:
+        """Return slot utilization statistics."""
+        with self._stats_lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_use": self.in_use,
+                "peak_in_use": self.peak_in_use,
+                "utilization": self.in_use / self.max_concurrency,
+                "requests": self.requests,
+                "waited": self.waited,
+                "avg_wait_ms": 1000 * self.total_wait / self.requests if self.requests else 0.0
+            }
+
 class GeminiService:
     """Handles Google Gemini AI API interactions."""
     
-    def __init__(self):
-        """Initialize Gemini service with API configuration."""
+    # Shared by every session in the process: latency history, breaker state
+    # and the threads requests run on must reflect all traffic, not one user's
+    _executor = ThreadPoolExecutor(max_workers=Config.GEMINI_WORKER_THREADS, thread_name_prefix="gemini")
+    _hedged_caller = HedgedCaller(_executor, LatencyTracker())
+    _breaker = CircuitBreaker()
+    _single_flight = SingleFlight()
+    
+    def __init__(self, admission: Optional[AdmissionController] = None):
+        """
+        Initialize Gemini service with API configuration.
+        
+        Args:
+            admission: Admission controller every model call must pass (None for no admission control)
+        """
+        self.admission = admission
         try:
-            genai.configure(api_key=Config.GOOGLE_API_KEY)
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+            self.limiter = GeminiConcurrencyLimiter.get()
+            self.model = self.limiter.model
             logger.info("Gemini service initialized successfully")
         except Exception as e:
             logger.error(f"Failed to initialize Gemini service: {str(e)}")
             st.error("⚠️ Failed to initialize AI service. Please check your API key.")
             st.stop()
     
-    def generate_response(self, job_description: str, pdf_content: str, prompt: str) -> Optional[str]:
+    def generate_response(self, job_description: str, pdf_content: str, prompt: str,
+                          fallback: Optional[Callable[[], str]] = None) -> Optional[str]:
         """
         Generate AI response for resume analysis.
         
@@ -31,24 +129,218 @@ class GeminiService:
             job_description: Job description text
             pdf_content: Base64 encoded PDF content
             prompt: Analysis prompt
+            fallback: Produces a locally computed response if the AI service is unavailable
             
         Returns:
             Optional[str]: AI response text or None if error
         """
-        try:
-            # Prepare content for API
-            content_parts = [
-                job_description,
-                {
-                    "mime_type": "image/jpeg",
-                    "data": pdf_content
-                },
-                prompt
-            ]
+        # Prepare content for API
+        content_parts = [
+            job_description,
+            {
+                "mime_type": "image/jpeg",
+                "data": pdf_content
+            },
+            prompt
+        ]
+        return self._generate(content_parts, fallback)
+    
+    def generate_text_response(self, job_description: str, resume_text: str, prompt: str,
+                               fallback: Optional[Callable[[], str]] = None) -> Optional[str]:
+        """
+        Generate AI response from extracted resume text instead of a page image.
+        
+        Args:
+            job_description: Job description text
+            resume_text: Resume text (or a selection of its sections)
+            prompt: Analysis prompt
+            fallback: Produces a locally computed response if the AI service is unavailable
+            
+        Returns:
+            Optional[str]: AI response text or None if error
+        """
+        content_parts = [
+            job_description,
+            f"Resume:\n{resume_text}",
+            prompt
+        ]
+        return self._generate(content_parts, fallback)
+    
+    def generate_page_digest(self, prompt: str, page_text: Optional[str] = None,
+                             page_image: Optional[str] = None) -> Optional[str]:
+        """
+        Summarize one resume page without any UI output, so it can run on worker threads.
+        
+        Args:
+            prompt: Digest prompt
+            page_text: Extracted page text
+            page_image: Base64 encoded JPEG of the page, for pages without a text layer
             
+        Returns:
+            Optional[str]: Digest text, or None if the AI service is unavailable or failed
+        """
+        content_parts = [prompt]
+        if page_text:
+            content_parts.append(f"Resume page:\n{page_text}")
+        if page_image:
+            content_parts.append({"mime_type": "image/jpeg", "data": page_image})
+        return self._generate_quietly(content_parts)
+    
+    def prefetch_response(self, job_description: str, pdf_content: str, prompt: str) -> Optional[str]:
+        """
+        Speculatively run the same request as generate_response without any UI output.
+        
+        The request is identical to generate_response's, so a user click while the
+        prefetch is in flight joins it instead of sending a second request.
+        
+        Args:
+            job_description: Job description text
+            pdf_content: Base64 encoded PDF content
+            prompt: Analysis prompt
+            
+        Returns:
+            Optional[str]: AI response text, or None if the AI service is unavailable or failed
+        """
+        content_parts = [
+            job_description,
+            {
+                "mime_type": "image/jpeg",
+                "data": pdf_content
+            },
+            prompt
+        ]
+        return self._generate_quietly(content_parts)
+    
+    def prefetch_text_response(self, job_description: str, resume_text: str, prompt: str) -> Optional[str]:
+        """
+        Speculatively run the same request as generate_text_response without any UI output.
+        
+        Args:
+            job_description: Job description text
+            resume_text: Resume text
+            prompt: Analysis prompt
+            
+        Returns:
+            Optional[str]: AI response text, or None if the AI service is unavailable or failed
+        """
+        content_parts = [
+            job_description,
+            f"Resume:\n{resume_text}",
+            prompt
+        ]
+        return self._generate_quietly(content_parts)
+    
+    def generate_quietly(self, content_parts: list) -> Optional[str]:
+        """
+        Send prepared content parts without any UI output, e.g. from worker processes.
+        
+        Args:
+            content_parts: Content in the order generate_response or generate_text_response send it
+            
+        Returns:
+            Optional[str]: AI response text, or None if the AI service is unavailable or failed
+        """
+        return self._generate_quietly(content_parts)
+    
+    @classmethod
+    def resilience_stats(cls) -> Dict[str, Any]:
+        """Return hedging and circuit breaker statistics."""
+        stats = cls._hedged_caller.stats()
+        stats["breaker_state"] = cls._breaker.state
+        stats.update({f"single_flight_{name}": value for name, value in cls._single_flight.stats().items()})
+        if GeminiConcurrencyLimiter._instance is not None:
+            stats.update({f"limiter_{name}": value for name, value in GeminiConcurrencyLimiter._instance.stats().items()})
+        return stats
+    
+    @staticmethod
+    def request_key(content_parts: list) -> str:
+        """
+        Content hash identifying a request: model, job description, resume and prompt.
+        
+        Args:
+            content_parts: Content sent to the model
+            
+        Returns:
+            str: Request key
+        """
+        parts = [Config.GEMINI_MODEL]
+        for part in content_parts:
+            if isinstance(part, dict):
+                parts.extend([part.get("mime_type", ""), part.get("data", "")])
+            else:
+                parts.append(part)
+        return ContentHasher.combine(*parts)
+    
+    def _call_model(self, content_parts: list):
+        """Send content to the model with a deadline, hedging slow requests and recording the outcome."""
+        timeout = Config.GEMINI_TIMEOUT_SECONDS
+        
+        def attempt():
+            with self.limiter.lease() as model:
+                return model.generate_content(content_parts, request_options={"timeout": timeout})
+        
+        try:
+            response = self._hedged_caller.call(attempt, deadline=timeout)
+        except (genai.types.BlockedPromptException, genai.types.StopCandidateException):
+            # Content problems are not service failures, so they don't count toward the breaker
+            self._breaker.record_success()
+            raise
+        except Exception:
+            self._breaker.record_failure()
+            raise
+        
+        self._breaker.record_success()
+        return response
+    
+    def _admitted_call(self, content_parts: list):
+        """Call the model, holding an admission slot only for the duration of the call."""
+        if self.admission is None:
+            return self._call_model(content_parts)
+        with self.admission.admit():
+            return self._call_model(content_parts)
+    
+    def _generate_quietly(self, content_parts: list) -> Optional[str]:
+        """Send content to the model from a background thread, logging instead of showing errors."""
+        if not self._breaker.allow():
+            return None
+        
+        try:
+            response, _ = self._single_flight.do(
+                self.request_key(content_parts),
+                lambda: self._admitted_call(content_parts)
+            )
+            return response.text if response and response.text else None
+        except Exception as e:
+            logger.error(f"Error in background AI request: {str(e)}")
+            return None
+    
+    def _use_fallback(self, fallback: Optional[Callable[[], str]], reason: str) -> Optional[str]:
+        """Return the local fallback response, if any, explaining why it is shown."""
+        if fallback is None:
+            return None
+        st.info(f"ℹ️ {reason} Showing a local keyword-based estimate instead.")
+        logger.info(f"Using local fallback: {reason}")
+        return fallback()
+    
+    def _generate(self, content_parts: list, fallback: Optional[Callable[[], str]] = None) -> Optional[str]:
+        """Send content to the model and surface errors in the UI."""
+        if not self._breaker.allow():
+            logger.warning("Circuit breaker open, skipping AI request")
+            fallback_response = self._use_fallback(fallback, "The AI service is currently unavailable.")
+            if fallback_response is None:
+                st.error("⚠️ The AI service is temporarily unavailable. Please try again in a minute.")
+            return fallback_response
+        
+        try:
             # Generate response with error handling
             with st.spinner("🤖 Analyzing your resume with AI..."):
-                response = self.model.generate_content(content_parts)
+                # Identical requests already in flight (double clicks, shared links) are joined, not repeated
+                response, shared = self._single_flight.do(
+                    self.request_key(content_parts),
+                    lambda: self._admitted_call(content_parts)
+                )
+                if shared:
+                    logger.info("Reused response of an identical in-flight request")
                 
                 if response and response.text:
                     logger.info("Successfully generated AI response")
@@ -69,12 +361,27 @@ class GeminiService:
             st.error(error_msg)
             logger.error("AI response stopped due to safety concerns")
             return None
+        
+        except AdmissionRejected as e:
+            fallback_response = self._use_fallback(fallback, "The AI service is at capacity.")
+            if fallback_response is None:
+                st.error(f"⚠️ {str(e)}")
+            return fallback_response
+        
+        except DeadlineExceeded:
+            logger.error(f"AI request exceeded {Config.GEMINI_TIMEOUT_SECONDS:.0f}s deadline")
+            fallback_response = self._use_fallback(fallback, "The AI service took too long to respond.")
+            if fallback_response is None:
+                st.error("⚠️ The AI service took too long to respond. Please try again.")
+            return fallback_response
             
         except Exception as e:
-            error_msg = f"⚠️ Error communicating with AI service: {str(e)}"
-            st.error(error_msg)
             logger.error(f"Error in AI service: {str(e)}")
-            return None
+            fallback_response = self._use_fallback(fallback, "The AI service returned an error.")
+            if fallback_response is None:
+                error_msg = f"⚠️ Error communicating with AI service: {str(e)}"
+                st.error(error_msg)
+            return fallback_response
 
 class PromptManager:
     """Manages AI prompts for different analysis types."""
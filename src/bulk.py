@@ -0,0 +1,686 @@
+"""
+Offline bulk analysis with batch prediction jobs.
+
+For latency-tolerant work such as re-scoring the whole candidate pool
+overnight, requests are packed into JSONL batch input files instead of being
+sent one by one. Each chunk is submitted as a batch job, polled until it
+finishes, and its output joined back by request ID into parsed result rows
+(the match percentage and missing keywords TextAnalyzer extracts), which are
+streamed to a ResultsWriter. Near-duplicate resumes in the manifest are
+flagged in a duplicate_of column. PDFs without a text layer are rendered in
+batches by RenderEngine and sent as a page image, and manifest lines that
+cannot be turned into a request are written as failed results with an error. A checkpoint file records the state of every
+chunk, so an interrupted run resumes without resubmitting finished work.
+
+The matrix command needs no model at all: it scores every resume against
+every job description with the local keyword matcher and writes the top-k
+jobs of each resume and the top-k resumes of each job, with their missing
+keywords. Resumes are scored in blocks, so memory does not grow with their
+number.
+
+Usage:
+    python -m src.bulk run --manifest requests.jsonl --output results.jsonl [--backend local]
+    python -m src.bulk matrix --resumes resumes/*.pdf --jds jds/*.txt --output matrix.csv [--top-k 5]
+
+Each manifest line is a JSON object with 'resume' (path to a PDF, DOCX,
+TXT, Markdown or RTF file), 'job_description' (text) or 'job_description_path', and optionally
+'prompt_type' (default 'matching') and 'request_id'.
+"""
+import os
+import json
+import time
+import logging
+import base64
+import shutil
+import argparse
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+from src.ai_service import PromptManager
+from src.cache import ContentHasher
+from src.compaction import JobDescriptionCompactor
+from src.config import Config
+from src.dedup import DuplicateIndex
+from src.export import ResultsWriter
+from src.ingestion import DocumentIngestor
+from src.matching import LocalMatcher, MatchMatrix, SkillExtractor
+from src.rendering import RenderEngine
+from src.utils import PDFValidationError, TextAnalyzer, ValidatedPDF
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class BulkRequest:
+    """One (resume, job description, prompt) analysis to run in a batch."""
+
+    request_id: str
+    resume_hash: str
+    jd_hash: str
+    prompt_type: str
+    # Text parts and image parts ({'mime_type', 'data'}), in the order the app sends them
+    parts: List[Union[str, Dict[str, str]]] = field(default_factory=list)
+    duplicate_of: Optional[str] = None  # Hash of an earlier manifest resume this one nearly duplicates
+    error: Optional[str] = None  # Why no request could be built; written as a failed result instead of packed
+
+    @classmethod
+    def build(cls, resume_text: str, resume_hash: str, job_description: str, prompt_type: str = "matching",
+              request_id: Optional[str] = None, duplicate_of: Optional[str] = None,
+              resume_image: Optional[str] = None) -> "BulkRequest":
+        """
+        Build a request from extracted resume text, or a page image for PDFs without a text layer.
+
+        Args:
+            resume_text: Resume text (the sections the prompt needs, see ResumeProfile.prompt_text)
+            resume_hash: Content hash of the resume file
+            job_description: Job description text (compacted before sending)
+            prompt_type: Prompt type ('analysis', 'improvement', 'matching')
+            request_id: Identifier for joining results (defaults to the same key as the session store)
+            duplicate_of: Hash of an earlier resume this one nearly duplicates
+            resume_image: Base64 JPEG of the first page, sent instead of resume_text
+
+        Returns:
+            BulkRequest: Request ready to be packed
+        """
+        compacted_jd = JobDescriptionCompactor().compact(job_description)
+        resume_part = (
+            {"mime_type": "image/jpeg", "data": resume_image} if resume_image else f"Resume:\n{resume_text}"
+        )
+        return cls(
+            request_id=request_id or ContentHasher.combine(resume_hash, compacted_jd.cache_key, prompt_type),
+            resume_hash=resume_hash,
+            jd_hash=compacted_jd.cache_key,
+            prompt_type=prompt_type,
+            parts=[compacted_jd.text, resume_part, PromptManager.get_prompt(prompt_type)],
+            duplicate_of=duplicate_of
+        )
+
+    @classmethod
+    def failed(cls, request_id: str, error: str, prompt_type: str = "matching") -> "BulkRequest":
+        """Build a placeholder for a manifest line that could not be turned into a request."""
+        return cls(request_id=request_id, resume_hash="", jd_hash="", prompt_type=prompt_type, error=error)
+
+    def to_batch_line(self) -> Dict[str, Any]:
+        """Return the batch input record (request keyed by request ID)."""
+        parts = [
+            {"text": part} if isinstance(part, str) else {"inline_data": part}
+            for part in self.parts
+        ]
+        return {"key": self.request_id, "request": {"contents": [{"role": "user", "parts": parts}]}}
+
+class LocalBatchBackend:
+    """
+    In-process stand-in for the batch prediction service, for tests and dry runs.
+
+    Jobs complete after a configurable number of polls. Responses come from a
+    responder function; the default one formats a local keyword match so the
+    output is parseable like a real matching response.
+    """
+
+    def __init__(self, responder: Optional[Callable[[List[str]], str]] = None, polls_until_done: int = 1):
+        """
+        Initialize the backend.
+
+        Args:
+            responder: Maps a request's text parts to a response text
+            polls_until_done: Status checks that report 'running' before a job succeeds
+        """
+        self.responder = responder or self._local_match
+        self.polls_until_done = polls_until_done
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self.submitted: List[str] = []
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        """Start a job for a batch input file and return its name."""
+        job_name = f"local/{display_name}"
+        self._jobs[job_name] = {"input_path": input_path, "polls": 0}
+        self.submitted.append(job_name)
+        return job_name
+
+    def status(self, job_name: str) -> str:
+        """Return 'running', 'succeeded' or 'failed'."""
+        job = self._jobs.get(job_name)
+        if job is None:
+            return "failed"  # Unknown to this backend instance, e.g. after a restart
+        job["polls"] += 1
+        return "succeeded" if job["polls"] > self.polls_until_done else "running"
+
+    def download(self, job_name: str, output_path: str) -> None:
+        """Write the job's output file."""
+        with open(self._jobs[job_name]["input_path"], "r", encoding="utf-8") as source, \
+                open(output_path, "w", encoding="utf-8") as output:
+            for line in source:
+                record = json.loads(line)
+                parts = [part.get("text", part.get("inline_data")) for part in record["request"]["contents"][0]["parts"]]
+                try:
+                    text = self.responder(parts)
+                    result = {"key": record["key"], "response": {
+                        "candidates": [{"content": {"parts": [{"text": text}]}}]
+                    }}
+                except Exception as e:
+                    result = {"key": record["key"], "error": {"message": str(e)}}
+                output.write(json.dumps(result) + "\n")
+
+    @staticmethod
+    def _local_match(parts: List[Union[str, Dict[str, str]]]) -> str:
+        job_description, resume = parts[0], parts[1]
+        if not isinstance(resume, str):
+            raise ValueError("Image-only resumes cannot be scored locally")
+        return LocalMatcher().score(resume, job_description).to_ats_response()
+
+class GeminiBatchBackend:
+    """Gemini batch prediction jobs through the google-genai client."""
+
+    STATES = {
+        "JOB_STATE_SUCCEEDED": "succeeded",
+        "JOB_STATE_FAILED": "failed",
+        "JOB_STATE_CANCELLED": "failed",
+        "JOB_STATE_EXPIRED": "failed",
+    }
+
+    def __init__(self, model: str = Config.GEMINI_MODEL):
+        """
+        Create the client.
+
+        Args:
+            model: Model the batch jobs run on
+        """
+        try:
+            from google import genai as genai_client
+        except ImportError:
+            raise ImportError("Batch mode requires google-genai. Install it with: pip install google-genai")
+        self.client = genai_client.Client(api_key=Config.GOOGLE_API_KEY)
+        self.model = model
+
+    def submit(self, input_path: str, display_name: str) -> str:
+        """Upload a batch input file, start a job for it and return the job name."""
+        uploaded = self.client.files.upload(
+            file=input_path,
+            config={"display_name": display_name, "mime_type": "jsonl"}
+        )
+        job = self.client.batches.create(model=self.model, src=uploaded.name, config={"display_name": display_name})
+        return job.name
+
+    def status(self, job_name: str) -> str:
+        """Return 'running', 'succeeded' or 'failed'."""
+        job = self.client.batches.get(name=job_name)
+        return self.STATES.get(job.state.name, "running")
+
+    def download(self, job_name: str, output_path: str) -> None:
+        """Write the job's output file."""
+        job = self.client.batches.get(name=job_name)
+        data = self.client.files.download(file=job.dest.file_name)
+        with open(output_path, "wb") as handle:
+            handle.write(data)
+
+class BulkRunner:
+    """Packs requests into batch jobs, polls them and joins the results, resuming from a checkpoint."""
+
+    CHECKPOINT_FILE = "checkpoint.json"
+
+    def __init__(self, backend, work_dir: str = Config.BULK_WORK_DIR, chunk_size: int = Config.BULK_CHUNK_SIZE,
+                 poll_interval: float = Config.BULK_POLL_SECONDS, max_attempts: int = Config.BULK_MAX_ATTEMPTS):
+        """
+        Initialize the runner.
+
+        Args:
+            backend: GeminiBatchBackend or LocalBatchBackend
+            work_dir: Directory for batch input/output files and the checkpoint
+            chunk_size: Requests per batch job
+            poll_interval: Seconds between status checks
+            max_attempts: Submissions of a failing batch per run before giving up on it
+        """
+        self.backend = backend
+        self.work_dir = work_dir
+        self.chunk_size = max(1, chunk_size)
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.checkpoint_path = os.path.join(work_dir, self.CHECKPOINT_FILE)
+        os.makedirs(work_dir, exist_ok=True)
+        self._checkpoint = self._load_checkpoint()
+
+    def run(self, requests: Iterable[BulkRequest], writer: ResultsWriter) -> Dict[str, int]:
+        """
+        Run all requests that have no result yet and write their parsed results.
+
+        Args:
+            requests: Requests to run; those already in the writer's output are skipped
+            writer: Destination of the parsed results
+
+        Returns:
+            Dict[str, int]: Counts of packed, joined and failed requests
+        """
+        packed, rejected = self._pack(requests, writer)
+        counts = {"packed": packed, "joined": 0, "failed": rejected}
+        chunks = self._checkpoint["chunks"]
+
+        for chunk in chunks:
+            if chunk["state"] in ("packed", "failed"):
+                chunk["attempts"] = 0
+                self._submit(chunk)
+
+        while True:
+            pending = [chunk for chunk in chunks if chunk["state"] == "submitted"]
+            if not pending:
+                break
+
+            for chunk in pending:
+                status = self.backend.status(chunk["job"])
+                if status == "succeeded":
+                    output_path = os.path.join(self.work_dir, f"output-{chunk['index']:05d}.jsonl")
+                    self.backend.download(chunk["job"], output_path)
+                    joined, failed = self._join(chunk, output_path, writer)
+                    counts["joined"] += joined
+                    counts["failed"] += failed
+                    chunk["state"] = "joined"
+                    self._save_checkpoint()
+                elif status == "failed" and chunk.get("attempts", 0) < self.max_attempts:
+                    logger.warning(f"Batch job {chunk['job']} failed, resubmitting")
+                    self._submit(chunk)
+                elif status == "failed":
+                    # Resubmitted on the next run
+                    logger.error(f"Batch job {chunk['job']} failed {chunk['attempts']} times, giving up for this run")
+                    chunk["state"] = "failed"
+                    counts["failed"] += len(chunk["requests"])
+                    self._save_checkpoint()
+
+            if any(chunk["state"] == "submitted" for chunk in chunks):
+                time.sleep(self.poll_interval)
+
+        writer.flush()
+        logger.info(f"Bulk run finished: {counts}")
+        return counts
+
+    def _submit(self, chunk: Dict[str, Any]) -> None:
+        chunk["job"] = self.backend.submit(chunk["input_path"], f"ats-bulk-{chunk['index']:05d}")
+        chunk["attempts"] = chunk.get("attempts", 0) + 1
+        chunk["state"] = "submitted"
+        self._save_checkpoint()
+        logger.info(f"Submitted batch {chunk['index']} ({len(chunk['requests'])} requests) as {chunk['job']}")
+
+    def _pack(self, requests: Iterable[BulkRequest], writer: ResultsWriter) -> Tuple[int, int]:
+        """
+        Write batch input files for requests that are neither finished nor in an unfinished chunk.
+
+        Requests that carry an error are written as failed results straight away.
+
+        Returns:
+            Tuple[int, int]: Requests packed and requests written as failed
+        """
+        chunks = self._checkpoint["chunks"]
+        in_progress = {
+            request_id
+            for chunk in chunks if chunk["state"] != "joined"
+            for request_id in chunk["requests"]
+        }
+
+        packed = rejected = 0
+        batch: List[BulkRequest] = []
+        seen = set()
+        for request in requests:
+            if request.request_id in seen or request.request_id in in_progress or writer.is_completed(request.request_id):
+                continue
+            seen.add(request.request_id)
+            if request.error:
+                writer.append({"request_id": request.request_id, "prompt_type": request.prompt_type,
+                               "error": request.error})
+                rejected += 1
+                continue
+            batch.append(request)
+            if len(batch) >= self.chunk_size:
+                packed += self._write_chunk(batch)
+                batch = []
+        if batch:
+            packed += self._write_chunk(batch)
+        return packed, rejected
+
+    def _write_chunk(self, batch: List[BulkRequest]) -> int:
+        index = len(self._checkpoint["chunks"])
+        input_path = os.path.join(self.work_dir, f"input-{index:05d}.jsonl")
+        with open(input_path, "w", encoding="utf-8") as handle:
+            for request in batch:
+                handle.write(json.dumps(request.to_batch_line(), ensure_ascii=False) + "\n")
+
+        self._checkpoint["chunks"].append({
+            "index": index,
+            "input_path": input_path,
+            "job": None,
+            "attempts": 0,
+            "state": "packed",
+            "requests": {
+                request.request_id: {
+                    "resume_hash": request.resume_hash,
+                    "jd_hash": request.jd_hash,
+                    "prompt_type": request.prompt_type,
+                    "duplicate_of": request.duplicate_of
+                }
+                for request in batch
+            }
+        })
+        self._save_checkpoint()
+        return len(batch)
+
+    def _join(self, chunk: Dict[str, Any], output_path: str, writer: ResultsWriter):
+        """Parse a job's output and write one result row per request ID."""
+        joined = failed = 0
+        with open(output_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                meta = chunk["requests"].get(record.get("key"))
+                if meta is None:
+                    logger.warning(f"Ignoring batch output for unknown request {record.get('key')}")
+                    continue
+
+                text = self._response_text(record)
+                if text is None:
+                    # Left without a result, so the next run packs it again
+                    logger.error(f"Request {record['key']} failed: {record.get('error')}")
+                    failed += 1
+                    continue
+
+                writer.append({
+                    "request_id": record["key"],
+                    **meta,
+                    "match_percentage": (
+                        TextAnalyzer.extract_match_percentage(text) if meta["prompt_type"] == "matching" else None
+                    ),
+                    "missing_keywords": (
+                        TextAnalyzer.extract_missing_keywords(text) if meta["prompt_type"] == "matching" else None
+                    ),
+                    "response": text
+                })
+                joined += 1
+        return joined, failed
+
+    @staticmethod
+    def _response_text(record: Dict[str, Any]) -> Optional[str]:
+        try:
+            parts = record["response"]["candidates"][0]["content"]["parts"]
+        except (KeyError, IndexError, TypeError):
+            return None
+        text = "".join(part.get("text", "") for part in parts)
+        return text or None
+
+    def _load_checkpoint(self) -> Dict[str, Any]:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as handle:
+                checkpoint = json.load(handle)
+            logger.info(f"Resuming bulk run from {self.checkpoint_path} ({len(checkpoint['chunks'])} batches)")
+            return checkpoint
+        return {"chunks": []}
+
+    def _save_checkpoint(self) -> None:
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as handle:
+            json.dump(self._checkpoint, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+def load_manifest(path: str, duplicates: Optional[Dict[str, str]] = None) -> Iterator[BulkRequest]:
+    """
+    Build requests from a manifest file, extracting resume text as it goes.
+
+    Resumes are validated and their text extracted by DocumentIngestor, as
+    for uploads. PDFs without a text layer are set aside and rendered a batch
+    at a time by RenderEngine, then sent as a page image. Lines that cannot
+    be turned into a request (bad JSON, a missing field or file, a rejected
+    resume) are logged and yielded as failed requests.
+
+    Args:
+        path: JSONL manifest (see module docstring)
+        duplicates: Near-duplicate resume hashes mapped to the first resume they duplicate (see find_duplicates)
+
+    Yields:
+        BulkRequest: One request per manifest line
+    """
+    duplicates = duplicates or {}
+    image_only: List[Tuple[int, Dict[str, Any], str, str]] = []  # (line, entry, resume hash, job description)
+    engine: Optional[RenderEngine] = None
+    try:
+        for line_number, entry in _manifest_entries(path):
+            try:
+                if entry is None:
+                    raise ValueError("Manifest line is not a JSON object")
+                prompt_type = entry.get("prompt_type", "matching")
+                document = _ingest(entry["resume"])
+                job_description = _job_description(entry)
+                profile = DocumentIngestor.profile(document)
+                if isinstance(document, ValidatedPDF) and len(profile.full_text.strip()) < Config.BULK_MIN_TEXT_CHARS:
+                    image_only.append((line_number, entry, document.content_hash, job_description))
+                else:
+                    yield BulkRequest.build(
+                        profile.prompt_text(prompt_type),
+                        document.content_hash,
+                        job_description,
+                        prompt_type=prompt_type,
+                        request_id=entry.get("request_id"),
+                        duplicate_of=duplicates.get(document.content_hash)
+                    )
+            except Exception as e:
+                yield _failed_request(path, line_number, entry, e)
+
+            if len(image_only) >= Config.BULK_RENDER_BATCH:
+                engine = engine or RenderEngine()
+                yield from _image_requests(engine, path, image_only, duplicates)
+                image_only = []
+
+        if image_only:
+            engine = engine or RenderEngine()
+            yield from _image_requests(engine, path, image_only, duplicates)
+    finally:
+        if engine is not None:
+            engine.close()
+            shutil.rmtree(engine.output_dir, ignore_errors=True)
+
+def _image_requests(engine: RenderEngine, path: str, pending: List[Tuple[int, Dict[str, Any], str, str]],
+                    duplicates: Dict[str, str]) -> Iterator[BulkRequest]:
+    """Render the first pages of image-only PDFs in parallel and build their requests."""
+    for (line_number, entry, resume_hash, job_description), result in zip(
+            pending, engine.render_files(entry["resume"] for _, entry, _, _ in pending)):
+        if not result.ok:
+            yield _failed_request(path, line_number, entry, PDFValidationError(result.error))
+            continue
+        try:
+            with open(result.image_path, "rb") as image_file:
+                resume_image = base64.b64encode(image_file.read()).decode()
+        finally:
+            os.remove(result.image_path)
+        yield BulkRequest.build(
+            "",
+            resume_hash,
+            job_description,
+            prompt_type=entry.get("prompt_type", "matching"),
+            request_id=entry.get("request_id"),
+            duplicate_of=duplicates.get(resume_hash),
+            resume_image=resume_image
+        )
+
+def _failed_request(path: str, line_number: int, entry: Optional[Dict[str, Any]], error: Exception) -> BulkRequest:
+    """Log a manifest line that cannot be run and return its failed request."""
+    if isinstance(error, KeyError):
+        message = f"Missing field {error.args[0]!r}"
+    elif isinstance(error, OSError):
+        message = f"Cannot read {error.filename}: {error.strerror}"
+    else:
+        message = str(error)
+    logger.error(f"Manifest line {line_number} failed: {message}")
+
+    request_id = (entry or {}).get("request_id") or f"{os.path.basename(path)}:{line_number}"
+    return BulkRequest.failed(str(request_id), message, (entry or {}).get("prompt_type", "matching"))
+
+def find_duplicates(path: str) -> Dict[str, str]:
+    """
+    Cluster the resumes of a manifest by near-duplicate.
+
+    Resumes are extracted one at a time and only their MinHash signatures are
+    kept, so this pass over the manifest runs in bounded memory.
+
+    Args:
+        path: JSONL manifest (see module docstring)
+
+    Returns:
+        Dict[str, str]: Maps each near-duplicate resume's hash to the first resume it duplicates
+    """
+    def resumes() -> Iterator[Tuple[str, str]]:
+        for _, entry in _manifest_entries(path):
+            try:
+                document = _ingest(entry["resume"])
+            except Exception:
+                continue  # Reported when the requests are built
+            yield document.content_hash, DocumentIngestor.profile(document).full_text
+
+    return DuplicateIndex().cluster(resumes())
+
+def _manifest_entries(path: str) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    """Yield (line number, entry) for each non-empty manifest line; the entry is None if it is not a JSON object."""
+    with open(path, "r", encoding="utf-8") as handle:
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                entry = None
+            yield line_number, entry if isinstance(entry, dict) else None
+
+def _ingest(resume_path: str):
+    with open(resume_path, "rb") as resume_file:
+        return DocumentIngestor.ingest(resume_file)
+
+def _job_description(entry: Dict[str, Any]) -> str:
+    job_description = entry.get("job_description")
+    if job_description is None:
+        with open(entry["job_description_path"], "r", encoding="utf-8") as jd_file:
+            job_description = jd_file.read()
+    return job_description
+
+def write_matrix(resumes: Iterable[Tuple[str, str, str]], jobs: Dict[str, str], writer: ResultsWriter,
+                 k: int = Config.BULK_MATRIX_TOP_K, block_rows: int = Config.BULK_MATRIX_BLOCK_ROWS) -> int:
+    """
+    Score resumes against job descriptions locally and write each resume's and each job's top-k cells.
+
+    Job skills are extracted once; resumes are scored a block at a time.
+    A resume's best jobs are written with its block, and each job keeps its
+    k best resumes so far (with their missing keywords), written at the end.
+    A cell in both lists is written once.
+
+    Args:
+        resumes: (resume id, content hash, resume text) triples
+        jobs: Job id -> job description text
+        writer: Destination of the result rows
+        k: Jobs per resume and resumes per job
+        block_rows: Resumes scored at a time
+
+    Returns:
+        int: Rows written
+    """
+    extractor = SkillExtractor()
+    jd_hashes = {job_id: ContentHasher.hash_text(text) for job_id, text in jobs.items()}
+    # Per job: (score, resume position, resume id, resume hash, missing keywords) of the best resumes so far
+    best_resumes: Dict[str, List[Tuple[int, int, str, str, List[str]]]] = {job_id: [] for job_id in jobs}
+    matrix: Optional[MatchMatrix] = None
+    scored = written = 0
+
+    def write(resume_id: str, resume_hash: str, job_id: str, score: int, missing: List[str]) -> bool:
+        return writer.append({
+            "request_id": f"{resume_id}::{job_id}",
+            "resume_hash": resume_hash,
+            "jd_hash": jd_hashes[job_id],
+            "prompt_type": "matching",
+            "match_percentage": score,
+            "missing_keywords": missing
+        })
+
+    def score_block(block: List[Tuple[str, str, str]]) -> int:
+        nonlocal matrix
+        texts = {resume_id: text for resume_id, _, text in block}
+        hashes = {resume_id: resume_hash for resume_id, resume_hash, _ in block}
+        positions = {resume_id: scored + index for index, resume_id in enumerate(texts)}
+        matrix = MatchMatrix.build(texts, jobs, extractor) if matrix is None else matrix.for_resumes(texts, extractor)
+
+        added = 0
+        for resume_id in matrix.resume_ids:
+            for job_id, score in matrix.top_jobs(resume_id, k):
+                added += write(resume_id, hashes[resume_id], job_id, score, matrix.missing_keywords(resume_id, job_id))
+        for job_id in matrix.job_ids:
+            candidates = best_resumes[job_id] + [
+                (score, positions[resume_id], resume_id, hashes[resume_id], matrix.missing_keywords(resume_id, job_id))
+                for resume_id, score in matrix.top_resumes(job_id, k)
+            ]
+            best_resumes[job_id] = sorted(candidates, key=lambda cell: (-cell[0], cell[1]))[:k]
+        return added
+
+    block: List[Tuple[str, str, str]] = []
+    for resume in resumes:
+        block.append(resume)
+        if len(block) >= block_rows:
+            written += score_block(block)
+            scored += len(block)
+            block = []
+    if block:
+        written += score_block(block)
+        scored += len(block)
+
+    for job_id, cells in best_resumes.items():
+        for score, _, resume_id, resume_hash, missing in cells:
+            written += write(resume_id, resume_hash, job_id, score, missing)
+    logger.info(f"Wrote {written} matrix cells for {scored} resumes x {len(jobs)} jobs")
+    return written
+
+def load_resumes(paths: Iterable[str]) -> Iterator[Tuple[str, str, str]]:
+    """
+    Extract resumes for the matrix command with DocumentIngestor; rejected files are logged and skipped.
+
+    Args:
+        paths: Resume files
+
+    Yields:
+        Tuple[str, str, str]: (path, content hash, extracted text)
+    """
+    for path in paths:
+        try:
+            document = _ingest(path)
+        except (OSError, PDFValidationError) as e:
+            logger.error(f"Skipping resume {path}: {str(e)}")
+            continue
+        yield path, document.content_hash, DocumentIngestor.profile(document).full_text
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Run resume analyses as offline batch jobs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the requests of a manifest as batch jobs")
+    run.add_argument("--manifest", required=True, help="JSONL file of requests")
+    run.add_argument("--output", required=True, help="Results file (.jsonl, .csv) or Parquet directory")
+    run.add_argument("--work-dir", default=Config.BULK_WORK_DIR, help="Batch files and checkpoint")
+    run.add_argument("--backend", choices=("gemini", "local"), default="gemini")
+    run.add_argument("--chunk-size", type=int, default=Config.BULK_CHUNK_SIZE)
+    run.add_argument("--poll-seconds", type=float, default=Config.BULK_POLL_SECONDS)
+
+    matrix = commands.add_parser("matrix", help="Score every resume against every job description locally")
+    matrix.add_argument("--resumes", nargs="+", required=True, help="Resume files")
+    matrix.add_argument("--jds", nargs="+", required=True, help="Job description text files")
+    matrix.add_argument("--output", required=True, help="Results file (.jsonl, .csv) or Parquet directory")
+    matrix.add_argument("--top-k", type=int, default=Config.BULK_MATRIX_TOP_K)
+    matrix.add_argument("--block-rows", type=int, default=Config.BULK_MATRIX_BLOCK_ROWS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    if args.command == "matrix":
+        jobs = {}
+        for path in args.jds:
+            with open(path, "r", encoding="utf-8") as jd_file:
+                jobs[path] = jd_file.read()
+        with ResultsWriter(args.output) as writer:
+            write_matrix(load_resumes(args.resumes), jobs, writer, args.top_k, args.block_rows)
+        return
+
+    backend = LocalBatchBackend() if args.backend == "local" else GeminiBatchBackend()
+    runner = BulkRunner(backend, args.work_dir, args.chunk_size, args.poll_seconds)
+    with ResultsWriter(args.output) as writer:
+        runner.run(load_manifest(args.manifest, find_duplicates(args.manifest)), writer)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Caching primitives for the Technical ATS Resume Expert application.
+"""
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+class ContentHasher:
+    """Builds stable content hashes used as cache keys."""
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        """
+        Hash raw bytes.
+
+        Args:
+            data: Bytes to hash
+
+        Returns:
+            str: Hex encoded SHA-256 digest
+        """
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def hash_text(text: str) -> str:
+        """
+        Hash a text value.
+
+        Args:
+            text: Text to hash
+
+        Returns:
+            str: Hex encoded SHA-256 digest of the UTF-8 text
+        """
+        return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def combine(*parts: Union[str, bytes]) -> str:
+        """
+        Hash several values into one key.
+
+        Each part is length-prefixed so ("ab", "c") and ("a", "bc") differ.
+
+        Args:
+            *parts: Strings or bytes to combine
+
+        Returns:
+            str: Hex encoded SHA-256 digest
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            data = part if isinstance(part, bytes) else str(part).encode("utf-8")
+            digest.update(len(data).to_bytes(8, "big"))
+            digest.update(data)
+        return digest.hexdigest()
+
+class LRUCache:
+    """Thread-safe LRU cache bounded by entry count and, optionally, total size."""
+
+    def __init__(self, max_entries: int = 128, max_bytes: Optional[int] = None,
+                 sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept
+            max_bytes: Maximum total size of all values, or None for no size bound
+            sizeof: Function returning the size of a value in bytes (defaults to len())
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or len
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key and mark it as recently used."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting least recently used entries if over budget."""
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            if self.max_bytes is not None and size > self.max_bytes:
+                logger.debug(f"Value for {key!r} ({size} bytes) exceeds cache budget, not cached")
+                return
+
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total_bytes += size
+            self._evict()
+
+    def replace(self, key: Hashable, value: Any) -> bool:
+        """
+        Swap the value for an existing key in place, keeping its recency.
+
+        A value that grew may push the cache over its size bound, in which case
+        least recently used entries (possibly this one) are evicted.
+
+        Returns:
+            bool: False if the key was absent
+        """
+        with self._lock:
+            if key not in self._entries:
+                return False
+            size = self._sizeof(value) if self.max_bytes is not None else 0
+            self._total_bytes += size - self._sizes.get(key, 0)
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._evict()
+            return True
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove and return the value for key."""
+        with self._lock:
+            if key not in self._entries:
+                return default
+            value = self._entries[key]
+            self._remove(key)
+            return value
+
+    def pop_oldest(self) -> Any:
+        """Remove and return the least recently used value (None if empty)."""
+        with self._lock:
+            if not self._entries:
+                return None
+            oldest = next(iter(self._entries))
+            value = self._entries[oldest]
+            self._remove(oldest)
+            self.evictions += 1
+            return value
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of (key, value) pairs from least to most recently used."""
+        with self._lock:
+            return list(self._entries.items())
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """Total size of cached values (0 when the cache has no size bound)."""
+        return self._total_bytes
+
+    def stats(self) -> Dict[str, int]:
+        """Return cache statistics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        del self._entries[key]
+        self._total_bytes -= self._sizes.pop(key, 0)
+
+    def _evict(self) -> None:
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or (self.max_bytes is not None and self._total_bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
@@ -0,0 +1,238 @@
+"""
+Job description compaction for the Technical ATS Resume Expert application.
+
+Real job postings carry a lot of text that has no bearing on how well a resume
+matches the role: benefits, EEO statements, company history and bullet lists
+that are pasted twice. Everything we send to Gemini is billed and adds latency,
+so the job description is compacted locally and deterministically before the
+API call. The compacted text is used both as the prompt input and as the basis
+of the cache key, so two postings that only differ in boilerplate share results.
+"""
+import re
+import math
+import logging
+import unicodedata
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+from src.cache import ContentHasher
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class CompactedJobDescription:
+    """Result of compacting a job description."""
+
+    text: str
+    original_tokens: int
+    compacted_tokens: int
+    removed_sections: Tuple[str, ...] = ()
+    removed_duplicates: int = 0
+
+    @property
+    def cache_key(self) -> str:
+        """SHA-256 of the compacted text, used to key cached results."""
+        return ContentHasher.hash_text(self.text)
+
+    @property
+    def tokens_saved(self) -> int:
+        """Number of estimated input tokens removed by compaction."""
+        return max(0, self.original_tokens - self.compacted_tokens)
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Fraction of estimated input tokens removed (0.0 - 1.0)."""
+        if self.original_tokens == 0:
+            return 0.0
+        return self.tokens_saved / self.original_tokens
+
+class JobDescriptionCompactor:
+    """Strips boilerplate, duplicate requirements and whitespace from job descriptions."""
+
+    # Section headings whose whole body is irrelevant to resume matching
+    BOILERPLATE_HEADINGS = [
+        r"benefits?",
+        r"perks?(\s*(and|&)\s*benefits?)?",
+        r"(compensation|salary|pay)\s*(and|&)\s*benefits?",
+        r"what we offer",
+        r"what'?s in it for you",
+        r"why (join|work (for|with)) us",
+        r"why you'?ll love (it here|working here)",
+        r"about (us|the company|the team|our company)",
+        r"who we are",
+        r"our (story|mission|values|culture)",
+        r"company (overview|description)",
+        r"equal (employment )?opportunity( employer)?( statement)?",
+        r"eeo( statement)?",
+        r"diversity(,)?\s*(equity)?\s*(and|&)?\s*inclusion",
+        r"(reasonable )?accommodations?",
+        r"(applicant )?privacy( notice| policy)?",
+        r"how to apply",
+        r"disclaimer",
+    ]
+
+    # Individual sentences dropped wherever they appear
+    BOILERPLATE_LINES = [
+        r"equal (employment )?opportunity",
+        r"without regard to (race|age|sex|gender|religion)",
+        r"(race|color|religion|sex|national origin|veteran status|disability)(,| or| and).*(protected|status)",
+        r"reasonable accommodations?",
+        r"e-?verify",
+        r"(we are|is) an? (proud )?(equal|affirmative action)",
+        r"by applying,? you (agree|consent)",
+        r"recruitment agencies",
+    ]
+
+    BULLET_PATTERN = re.compile(r"^\s*(?:[-*+•◦▪●‣∙·–—]|\d{1,2}[.)])\s+")
+    HEADING_MAX_WORDS = 8
+    HEADING_STOPWORDS = ("a", "and", "of", "the", "to", "for", "we", "you", "in")
+
+    # Never compact below this many characters; very short output usually means
+    # the heuristics misfired on an unusual posting
+    MIN_COMPACTED_CHARS = 50
+
+    def __init__(self):
+        """Compile the boilerplate patterns once per compactor."""
+        self._heading_patterns = [
+            re.compile(rf"^{pattern}$", re.IGNORECASE) for pattern in self.BOILERPLATE_HEADINGS
+        ]
+        self._line_patterns = [
+            re.compile(pattern, re.IGNORECASE) for pattern in self.BOILERPLATE_LINES
+        ]
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """
+        Estimate the number of Gemini input tokens for a piece of text.
+
+        Gemini averages roughly four characters per token for English text; the
+        estimate is local and free, which is what matters for reporting savings.
+
+        Args:
+            text: Input text
+
+        Returns:
+            int: Estimated token count
+        """
+        if not text:
+            return 0
+        return math.ceil(len(text) / 4)
+
+    def compact(self, job_description: str) -> CompactedJobDescription:
+        """
+        Compact a job description for use as prompt input and cache key.
+
+        Args:
+            job_description: Raw job description text
+
+        Returns:
+            CompactedJobDescription: Compacted text with token accounting
+        """
+        original = job_description or ""
+        lines = self._normalize(original).split("\n")
+
+        kept_lines: List[str] = []
+        removed_sections: List[str] = []
+        seen = set()
+        duplicates = 0
+        skipping_section = False
+
+        for line in lines:
+            if not line:
+                if kept_lines and kept_lines[-1]:
+                    kept_lines.append("")
+                continue
+
+            heading = self._heading_text(line)
+            if heading is not None:
+                skipping_section = self._is_boilerplate_heading(heading)
+                if skipping_section:
+                    removed_sections.append(heading)
+                    continue
+
+            if skipping_section:
+                continue
+
+            if self._is_boilerplate_line(line):
+                continue
+
+            key = self._dedupe_key(line)
+            if heading is None and key:
+                if key in seen:
+                    duplicates += 1
+                    continue
+                seen.add(key)
+
+            kept_lines.append(line)
+
+        compacted = "\n".join(kept_lines).strip()
+        if len(compacted) < self.MIN_COMPACTED_CHARS:
+            logger.warning("Job description compaction removed too much text, keeping normalized original")
+            compacted = self._normalize(original).strip()
+            removed_sections = []
+            duplicates = 0
+
+        result = CompactedJobDescription(
+            text=compacted,
+            original_tokens=self.estimate_tokens(original),
+            compacted_tokens=self.estimate_tokens(compacted),
+            removed_sections=tuple(removed_sections),
+            removed_duplicates=duplicates
+        )
+
+        logger.info(
+            f"Compacted job description: {result.original_tokens} -> {result.compacted_tokens} tokens "
+            f"({result.reduction_ratio:.0%} saved, {len(removed_sections)} sections, {duplicates} duplicates removed)"
+        )
+        return result
+
+    def _normalize(self, text: str) -> str:
+        """Normalize unicode, bullets and whitespace line by line."""
+        text = unicodedata.normalize("NFKC", text)
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+
+        normalized = []
+        for raw_line in text.split("\n"):
+            line = self.BULLET_PATTERN.sub("- ", raw_line)
+            line = re.sub(r"[ \t\f\v]+", " ", line).strip()
+            normalized.append(line)
+
+        # Collapse runs of blank lines to a single separator
+        return re.sub(r"\n{3,}", "\n\n", "\n".join(normalized))
+
+    def _heading_text(self, line: str) -> Optional[str]:
+        """Return the heading text if the line looks like a section heading, otherwise None."""
+        if line.startswith("- "):
+            return None
+
+        candidate = line.strip("#*_ ").rstrip(":").strip()
+        if not candidate or len(candidate.split()) > self.HEADING_MAX_WORDS:
+            return None
+
+        if line.rstrip().endswith(":") or line.lstrip().startswith("#") or candidate.isupper():
+            return candidate
+
+        # Short Title Case lines without sentence punctuation ("Key Responsibilities")
+        words = candidate.split()
+        if 1 < len(words) <= 5 and not candidate.endswith((".", ",", ";")):
+            if all(word[0].isupper() or not word[0].isalpha() or word.lower() in self.HEADING_STOPWORDS for word in words):
+                return candidate
+
+        if self._is_boilerplate_heading(candidate):
+            return candidate
+
+        return None
+
+    def _is_boilerplate_heading(self, heading: str) -> bool:
+        """Check whether a heading introduces a boilerplate section."""
+        cleaned = re.sub(r"[^\w\s&',]", "", heading).strip()
+        return any(pattern.match(cleaned) for pattern in self._heading_patterns)
+
+    def _is_boilerplate_line(self, line: str) -> bool:
+        """Check whether a single line is legal or recruiting boilerplate."""
+        return any(pattern.search(line) for pattern in self._line_patterns)
+
+    @staticmethod
+    def _dedupe_key(line: str) -> str:
+        """Key used to detect repeated requirements regardless of case and punctuation."""
+        text = line[2:] if line.startswith("- ") else line
+        return re.sub(r"\s+", " ", re.sub(r"[^\w\s+#]", " ", text.lower())).strip()
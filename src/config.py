@@ -16,10 +16,138 @@ class Config:
     GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
     GEMINI_MODEL = "gemini-2.5-flash"
     
+    # Shared API Client
+    GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc")  # 'grpc' (HTTP/2, multiplexed) or 'rest'
+    GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))  # Max concurrent requests per process
+    
+    # API Latency and Failure Handling
+    GEMINI_TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+    GEMINI_WORKER_THREADS = int(os.getenv("GEMINI_WORKER_THREADS", "32"))
+    HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+    HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "2"))
+    HEDGE_MAX_DELAY = float(os.getenv("HEDGE_MAX_DELAY", "20"))
+    HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))  # At most 10% extra requests
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+    BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    
     # Application Configuration
     APP_TITLE = "Technical ATS Resume Expert"
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
-    SUPPORTED_FORMATS = ["pdf"]
+    SUPPORTED_FORMATS = ["pdf", "docx", "txt", "md", "markdown", "rtf"]
+    
+    # Upload Validation Limits (enforced before the PDF is rendered)
+    UPLOAD_CHUNK_SIZE = 64 * 1024  # 64KB
+    MAX_PDF_PAGES = int(os.getenv("MAX_PDF_PAGES", "20"))
+    MAX_PAGE_PIXELS = int(os.getenv("MAX_PAGE_PIXELS", str(4096 * 4096)))  # Rendered pixel area per page
+    MAX_EMBEDDED_IMAGES = int(os.getenv("MAX_EMBEDDED_IMAGES", "100"))
+    MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", str(40 * 1000 * 1000)))  # Per embedded image
+    PDF_RENDER_ZOOM = 2  # Higher resolution preview
+    MAX_DOCUMENT_CHARS = int(os.getenv("MAX_DOCUMENT_CHARS", "200000"))  # Extracted text of DOCX/TXT/MD/RTF uploads
+    MAX_DOCX_XML_BYTES = int(os.getenv("MAX_DOCX_XML_BYTES", str(20 * 1024 * 1024)))  # Uncompressed document.xml
+    TEXT_PREVIEW_CHARS = 4000  # Text kept per result to draw the preview of a text resume
+    TEXT_PREVIEW_CACHE_BYTES = int(os.getenv("TEXT_PREVIEW_CACHE_BYTES", str(8 * 1024 * 1024)))  # 8MB
+    TEXT_PREVIEW_FONT_SIZE = 11
+    
+    # Bulk Rendering Configuration
+    RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "0"))  # 0 = one worker per CPU core
+    RENDER_JPEG_QUALITY = int(os.getenv("RENDER_JPEG_QUALITY", "85"))
+    RENDER_MAX_TASKS_PER_CHILD = int(os.getenv("RENDER_MAX_TASKS_PER_CHILD", "200"))  # Recycle workers to cap leaks
+    RENDER_START_METHOD = os.getenv("RENDER_START_METHOD", "spawn")
+    
+    # Session Result Persistence
+    SESSION_MAX_RESULTS = int(os.getenv("SESSION_MAX_RESULTS", "10"))
+    SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(20 * 1024 * 1024)))  # 20MB
+    PROCESS_MEMORY_BUDGET = int(os.getenv("PROCESS_MEMORY_BUDGET", str(512 * 1024 * 1024)))  # All sessions
+    PREVIEW_THUMBNAIL_WIDTH = 400  # Previews are displayed at this width
+    
+    # Resume Parsing Configuration
+    PROFILE_CACHE_ENTRIES = int(os.getenv("PROFILE_CACHE_ENTRIES", "512"))
+    PROFILE_CACHE_BYTES = int(os.getenv("PROFILE_CACHE_BYTES", str(16 * 1024 * 1024)))  # 16MB
+    
+    # Batch Export Configuration
+    EXPORT_FLUSH_ROWS = int(os.getenv("EXPORT_FLUSH_ROWS", "100"))
+    EXPORT_FLUSH_SECONDS = float(os.getenv("EXPORT_FLUSH_SECONDS", "5"))
+    EXPORT_SCAN_BLOCK_BYTES = 64 * 1024  # Read size when repairing a torn output file
+    
+    # Scoring Cascade (local score first, LLM only for the ambiguous band)
+    CASCADE_ENABLED = os.getenv("CASCADE_ENABLED", "true").lower() == "true"
+    CASCADE_REJECT_BELOW = int(os.getenv("CASCADE_REJECT_BELOW", "10"))
+    CASCADE_ACCEPT_ABOVE = int(os.getenv("CASCADE_ACCEPT_ABOVE", "95"))
+    CASCADE_MIN_JD_SKILLS = int(os.getenv("CASCADE_MIN_JD_SKILLS", "5"))  # Fewer known skills always go to the LLM
+    CASCADE_LLM_REJECT_SCORE = 40  # LLM scores below this count as a reject
+    CASCADE_LLM_STRONG_SCORE = 75  # LLM scores at or above this count as a strong match
+    CASCADE_TARGET_AGREEMENT = float(os.getenv("CASCADE_TARGET_AGREEMENT", "0.9"))
+    CASCADE_MIN_CALIBRATION_SAMPLES = 50
+    # Share of locally resolvable pairs still sent to the LLM, so calibration also sees what the cascade resolves
+    CASCADE_AUDIT_RATE = float(os.getenv("CASCADE_AUDIT_RATE", "0.05"))
+    CASCADE_LOG_PATH = os.getenv("CASCADE_LOG_PATH", "logs/cascade_scores.jsonl")
+    CASCADE_THRESHOLDS_PATH = os.getenv("CASCADE_THRESHOLDS_PATH", "logs/cascade_thresholds.json")
+    
+    # Map-reduce analysis of multi-page resumes
+    MAPREDUCE_ENABLED = os.getenv("MAPREDUCE_ENABLED", "true").lower() == "true"
+    MAPREDUCE_MIN_PAGES = int(os.getenv("MAPREDUCE_MIN_PAGES", "2"))  # Shorter resumes use the page image
+    MAPREDUCE_WORKERS = int(os.getenv("MAPREDUCE_WORKERS", "4"))
+    MAPREDUCE_PAGE_CHARS = int(os.getenv("MAPREDUCE_PAGE_CHARS", "3000"))  # Longer pages are summarized
+    MAPREDUCE_MIN_TEXT_CHARS = 100  # Pages with less text are read from their image
+    MAPREDUCE_RENDER_ZOOM = 1.5
+    PAGE_DIGEST_CACHE_BYTES = int(os.getenv("PAGE_DIGEST_CACHE_BYTES", str(16 * 1024 * 1024)))  # 16MB
+    
+    # Admission control
+    ADMISSION_MAX_CONCURRENT = int(os.getenv("ADMISSION_MAX_CONCURRENT", "8"))  # Analyses running at once
+    ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "32"))  # Waiting requests before shedding
+    ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "120"))
+    ADMISSION_POLL_SECONDS = 1.0  # Waiters report their position (and can be stopped) this often
+    ADMISSION_METRICS_PATH = os.getenv("ADMISSION_METRICS_PATH", "logs/admission.prom")
+    
+    # Speculative preprocessing
+    SPECULATION_WORKERS = int(os.getenv("SPECULATION_WORKERS", "4"))
+    SPECULATION_PREFETCH_WORKERS = int(os.getenv("SPECULATION_PREFETCH_WORKERS", "2"))  # Separate from preprocessing
+    SPECULATIVE_PREFETCH = os.getenv("SPECULATIVE_PREFETCH", "false").lower() == "true"  # Costs API calls
+    SPECULATION_PREFETCH_DEBOUNCE_SECONDS = float(os.getenv("SPECULATION_PREFETCH_DEBOUNCE_SECONDS", "2"))
+    
+    # Near-duplicate detection
+    DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_NUM_PERM = 128  # MinHash signature length
+    DEDUP_LSH_BANDS = 16  # 16 bands x 8 rows: candidates above roughly 0.7 Jaccard
+    DEDUP_TEXT_THRESHOLD = float(os.getenv("DEDUP_TEXT_THRESHOLD", "0.9"))
+    DEDUP_REUSE_THRESHOLD = float(os.getenv("DEDUP_REUSE_THRESHOLD", "0.98"))  # Reuse within a session only
+    DEDUP_IMAGE_MAX_DISTANCE = int(os.getenv("DEDUP_IMAGE_MAX_DISTANCE", "4"))  # dHash bits, at most 7
+    DEDUP_MIN_TEXT_CHARS = 200  # Less extracted text than this is treated as an image-only resume
+    DEDUP_INDEX_ENTRIES = int(os.getenv("DEDUP_INDEX_ENTRIES", "10000"))
+    SHARED_RESULTS_ENTRIES = int(os.getenv("SHARED_RESULTS_ENTRIES", "1000"))
+    SHARED_RESULTS_BYTES = int(os.getenv("SHARED_RESULTS_BYTES", str(32 * 1024 * 1024)))  # 32MB
+    
+    # Offline bulk mode
+    BULK_WORK_DIR = os.getenv("BULK_WORK_DIR", "bulk_runs")
+    BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "500"))  # Requests per batch job
+    BULK_POLL_SECONDS = float(os.getenv("BULK_POLL_SECONDS", "60"))
+    BULK_MAX_ATTEMPTS = int(os.getenv("BULK_MAX_ATTEMPTS", "3"))  # Submissions of a failing batch per run
+    BULK_MATRIX_TOP_K = int(os.getenv("BULK_MATRIX_TOP_K", "5"))  # Best jobs per resume and resumes per job
+    BULK_MATRIX_BLOCK_ROWS = int(os.getenv("BULK_MATRIX_BLOCK_ROWS", "1024"))  # Resumes scored at a time
+    BULK_MIN_TEXT_CHARS = 100  # PDFs with less extracted text are sent as a page image
+    BULK_RENDER_BATCH = int(os.getenv("BULK_RENDER_BATCH", "16"))  # Image-only PDFs rendered at a time
+    
+    # Distributed worker mode (shared SQLite work queue)
+    WORK_QUEUE_PATH = os.getenv("WORK_QUEUE_PATH", "work_queue.db")
+    WORK_QUEUE_JOURNAL_MODE = os.getenv("WORK_QUEUE_JOURNAL_MODE", "WAL")  # Use DELETE on network filesystems
+    WORKER_THREADS = int(os.getenv("WORKER_THREADS", "4"))  # Jobs processed concurrently per worker process
+    WORKER_VISIBILITY_TIMEOUT = float(os.getenv("WORKER_VISIBILITY_TIMEOUT", "300"))  # Lease length without heartbeat
+    WORKER_HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "30"))
+    WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))  # Wait when the queue is empty
+    WORKER_MAX_ATTEMPTS = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))  # Leases per job before it is marked failed
+    
+    # Request profiling
+    PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"  # Profile every request
+    PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN", "")  # ?profile=<token> profiles one request
+    PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # Fraction of requests profiled
+    PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between stack samples
+    PROFILE_MAX_SECONDS = 300
+    PROFILE_DIR = os.getenv("PROFILE_DIR", "logs/profiles")
+    PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+    PROFILE_MAX_AGE_DAYS = float(os.getenv("PROFILE_MAX_AGE_DAYS", "7"))
     
     # Visualization Configuration
     CHART_COLORS = ['#4CAF50', '#FF5733']
@@ -0,0 +1,309 @@
+"""
+Near-duplicate resume detection for the Technical ATS Resume Expert application.
+
+The same resume is often resubmitted re-exported from Word, with small edits
+or under another file name, so its byte hash differs every time. Resumes with
+text are compared by MinHash signatures over word shingles, indexed with
+locality-sensitive hashing (LSH) so lookups only touch likely candidates.
+Image-only resumes are compared by a difference hash (dHash) of the rendered
+first page, indexed by byte chunks so close hashes share at least one bucket.
+"""
+import re
+import zlib
+import logging
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from PIL import Image
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 31) - 1
+
+@dataclass(frozen=True)
+class DuplicateMatch:
+    """A previously indexed resume that a new one nearly duplicates."""
+
+    key: str  # Content hash of the indexed resume
+    similarity: float  # Estimated Jaccard similarity (text) or 1 - distance/64 (image)
+    method: str  # 'text' or 'image'
+
+class MinHasher:
+    """Computes MinHash signatures of text over word shingles."""
+
+    WORD_PATTERN = re.compile(r"[a-z0-9+#]+")
+
+    def __init__(self, num_perm: int = Config.DEDUP_NUM_PERM, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize the hasher.
+
+        Args:
+            num_perm: Number of hash functions (signature length)
+            shingle_size: Words per shingle
+            seed: Seed for the hash function parameters, fixed so signatures are comparable
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # Universal hashes (a * x + b) mod p; x < 2^32 and a < 2^31 keep products within uint64
+        self._a = rng.randint(1, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _MERSENNE_PRIME, size=num_perm).astype(np.uint64)
+
+    def shingles(self, text: str) -> Set[str]:
+        """
+        Split text into normalized word shingles.
+
+        Args:
+            text: Resume text
+
+        Returns:
+            Set[str]: Shingles (the whole text as one shingle if it is shorter than shingle_size)
+        """
+        words = self.WORD_PATTERN.findall((text or "").lower())
+        if len(words) < self.shingle_size:
+            return {" ".join(words)} if words else set()
+        return {" ".join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)}
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text: Resume text
+
+        Returns:
+            Optional[np.ndarray]: uint32 signature of length num_perm, or None for empty text
+        """
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+        return permuted.min(axis=0).astype(np.uint32)
+
+    @staticmethod
+    def similarity(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimated Jaccard similarity of the shingle sets behind two signatures."""
+        return float(np.mean(first == second))
+
+class PerceptualHasher:
+    """Difference hash (dHash) of page images, robust to re-encoding and small shifts."""
+
+    @staticmethod
+    def dhash(image: Image.Image, hash_size: int = 8) -> int:
+        """
+        Compute a 64-bit difference hash.
+
+        Args:
+            image: Rendered page
+            hash_size: Hash grid size (hash_size^2 bits)
+
+        Returns:
+            int: Hash as an integer
+        """
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+        pixels = np.asarray(small, dtype=np.int16)
+        bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+        return int("".join("1" if bit else "0" for bit in bits), 2)
+
+    @staticmethod
+    def distance(first: int, second: int) -> int:
+        """Hamming distance between two hashes."""
+        return bin(first ^ second).count("1")
+
+class DuplicateIndex:
+    """Thread-safe LSH index of resume signatures for near-duplicate lookup."""
+
+    IMAGE_CHUNKS = 8  # 8-bit chunks: hashes within 7 bits share at least one chunk exactly
+
+    def __init__(self, max_entries: int = Config.DEDUP_INDEX_ENTRIES, bands: int = Config.DEDUP_LSH_BANDS,
+                 text_threshold: float = Config.DEDUP_TEXT_THRESHOLD,
+                 image_max_distance: int = Config.DEDUP_IMAGE_MAX_DISTANCE,
+                 min_text_chars: int = Config.DEDUP_MIN_TEXT_CHARS, hasher: Optional[MinHasher] = None):
+        """
+        Initialize the index.
+
+        Args:
+            max_entries: Maximum indexed resumes; the oldest are dropped first
+            bands: LSH bands; signature length must be divisible by it
+            text_threshold: Minimum estimated Jaccard similarity for a text duplicate
+            image_max_distance: Maximum dHash Hamming distance for an image duplicate (at most 7)
+            min_text_chars: Below this much extracted text a resume is treated as image-only
+            hasher: MinHasher (a default one is created if omitted)
+        """
+        self.hasher = hasher or MinHasher()
+        if self.hasher.num_perm % bands:
+            raise ValueError(f"Signature length {self.hasher.num_perm} is not divisible by {bands} bands")
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = self.hasher.num_perm // bands
+        self.text_threshold = text_threshold
+        self.image_max_distance = min(image_max_distance, self.IMAGE_CHUNKS - 1)
+        self.min_text_chars = min_text_chars
+
+        self._signatures: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._image_hashes: "OrderedDict[str, int]" = OrderedDict()
+        self._text_buckets: Dict[Tuple[int, bytes], Set[str]] = defaultdict(set)
+        self._image_buckets: Dict[Tuple[int, int], Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+        self.lookups = 0
+        self.duplicates = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(set(self._signatures) | set(self._image_hashes))
+
+    def find(self, text: str = "", image: Optional[Image.Image] = None,
+             exclude: Optional[str] = None) -> Optional[DuplicateMatch]:
+        """
+        Look up the closest indexed near-duplicate.
+
+        Args:
+            text: Extracted resume text
+            image: Rendered first page, used when the resume has too little text
+            exclude: Key to ignore (the resume itself, if already indexed)
+
+        Returns:
+            Optional[DuplicateMatch]: Best match above the thresholds, or None
+        """
+        text_signature, image_hash = self._fingerprint(text, image)
+        with self._lock:
+            self.lookups += 1
+            match = self._find(text_signature, image_hash, exclude)
+            if match:
+                self.duplicates += 1
+            return match
+
+    def add(self, key: str, text: str = "", image: Optional[Image.Image] = None) -> None:
+        """
+        Index a resume.
+
+        Args:
+            key: Content hash identifying the resume
+            text: Extracted resume text
+            image: Rendered first page, used when the resume has too little text
+        """
+        text_signature, image_hash = self._fingerprint(text, image)
+        with self._lock:
+            self.remove(key)
+            if text_signature is not None:
+                self._signatures[key] = text_signature
+                for band in self._bands(text_signature):
+                    self._text_buckets[band].add(key)
+            elif image_hash is not None:
+                self._image_hashes[key] = image_hash
+                for chunk in self._chunks(image_hash):
+                    self._image_buckets[chunk].add(key)
+
+            while len(self._signatures) + len(self._image_hashes) > self.max_entries:
+                oldest = next(iter(self._signatures)) if self._signatures else next(iter(self._image_hashes))
+                self.remove(oldest)
+
+    def find_or_add(self, key: str, text: str = "", image: Optional[Image.Image] = None) -> Optional[DuplicateMatch]:
+        """
+        Return the near-duplicate of a resume, indexing it if it has none.
+
+        Args:
+            key: Content hash identifying the resume
+            text: Extracted resume text
+            image: Rendered first page, used when the resume has too little text
+
+        Returns:
+            Optional[DuplicateMatch]: The earlier resume this one duplicates, or None if it is new
+        """
+        with self._lock:
+            match = self.find(text, image, exclude=key)
+            if match is None:
+                self.add(key, text, image)
+            return match
+
+    def remove(self, key: str) -> None:
+        """Drop a resume from the index."""
+        with self._lock:
+            signature = self._signatures.pop(key, None)
+            if signature is not None:
+                for band in self._bands(signature):
+                    self._discard(self._text_buckets, band, key)
+            image_hash = self._image_hashes.pop(key, None)
+            if image_hash is not None:
+                for chunk in self._chunks(image_hash):
+                    self._discard(self._image_buckets, chunk, key)
+
+    def cluster(self, resumes: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Group a batch of resumes by near-duplicate, e.g. to flag or skip them in batch runs.
+
+        Args:
+            resumes: (key, text) pairs in submission order
+
+        Returns:
+            Dict[str, str]: Maps each duplicate's key to the first resume it duplicates
+        """
+        duplicates = {}
+        for key, text in resumes:
+            match = self.find_or_add(key, text)
+            if match:
+                duplicates[key] = duplicates.get(match.key, match.key)
+        if duplicates:
+            logger.info(f"Found {len(duplicates)} near-duplicate resumes in batch")
+        return duplicates
+
+    def stats(self) -> Dict[str, int]:
+        """Return index statistics."""
+        with self._lock:
+            return {
+                "text_entries": len(self._signatures),
+                "image_entries": len(self._image_hashes),
+                "lookups": self.lookups,
+                "duplicates": self.duplicates
+            }
+
+    def _fingerprint(self, text: str, image: Optional[Image.Image]) -> Tuple[Optional[np.ndarray], Optional[int]]:
+        """Text signature when there is enough text, otherwise the page's perceptual hash."""
+        if text and len(text.strip()) >= self.min_text_chars:
+            return self.hasher.signature(text), None
+        if image is not None:
+            return None, PerceptualHasher.dhash(image)
+        return None, None
+
+    def _find(self, signature: Optional[np.ndarray], image_hash: Optional[int],
+              exclude: Optional[str]) -> Optional[DuplicateMatch]:
+        best: Optional[DuplicateMatch] = None
+
+        if signature is not None:
+            candidates: Set[str] = set()
+            for band in self._bands(signature):
+                candidates |= self._text_buckets.get(band, set())
+            for key in candidates - {exclude}:
+                similarity = MinHasher.similarity(signature, self._signatures[key])
+                if similarity >= self.text_threshold and (best is None or similarity > best.similarity):
+                    best = DuplicateMatch(key, similarity, "text")
+
+        elif image_hash is not None:
+            candidates = set()
+            for chunk in self._chunks(image_hash):
+                candidates |= self._image_buckets.get(chunk, set())
+            for key in candidates - {exclude}:
+                distance = PerceptualHasher.distance(image_hash, self._image_hashes[key])
+                similarity = 1 - distance / 64
+                if distance <= self.image_max_distance and (best is None or similarity > best.similarity):
+                    best = DuplicateMatch(key, similarity, "image")
+
+        return best
+
+    def _bands(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _chunks(self, image_hash: int) -> List[Tuple[int, int]]:
+        return [(chunk, (image_hash >> (8 * chunk)) & 0xFF) for chunk in range(self.IMAGE_CHUNKS)]
+
+    @staticmethod
+    def _discard(buckets: Dict, bucket_key, key: str) -> None:
+        bucket = buckets.get(bucket_key)
+        if bucket is not None:
+            bucket.discard(key)
+            if not bucket:
+                del buckets[bucket_key]
@@ -0,0 +1,279 @@
+"""
+Streaming export of batch analysis results.
+
+ResultsWriter appends results as they complete instead of collecting them in
+memory. Rows are buffered up to a small bound, then flushed (and optionally
+fsync'ed) to JSONL, CSV or Parquet. Because every flushed row is durable, an
+interrupted run can be resumed by skipping request IDs already in the output.
+"""
+import os
+import csv
+import json
+import glob
+import time
+import logging
+from typing import Any, Dict, List, Optional, Set
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class ResultsWriter:
+    """Appends analysis results to JSONL, CSV or Parquet with bounded memory."""
+
+    FORMATS = ("jsonl", "csv", "parquet")
+
+    # Column order for tabular formats; nested values are JSON encoded in CSV
+    FIELDS = [
+        "request_id",
+        "resume_hash",
+        "jd_hash",
+        "prompt_type",
+        "duplicate_of",
+        "match_percentage",
+        "missing_keywords",
+        "sections",
+        "timings",
+        "response",
+        "error",
+        "created_at",
+    ]
+
+    def __init__(self, path: str, fmt: Optional[str] = None, flush_every: int = Config.EXPORT_FLUSH_ROWS,
+                 flush_interval: float = Config.EXPORT_FLUSH_SECONDS, fsync: bool = True):
+        """
+        Open (or resume) an export.
+
+        Args:
+            path: Output file (JSONL/CSV) or directory of part files (Parquet)
+            fmt: 'jsonl', 'csv' or 'parquet' (inferred from the path extension if omitted)
+            flush_every: Flush after this many buffered rows
+            flush_interval: Flush when the oldest buffered row is older than this many seconds
+            fsync: fsync the output after each flush so flushed rows survive a crash
+        """
+        self.path = path
+        self.fmt = (fmt or os.path.splitext(path)[1].lstrip(".") or "jsonl").lower()
+        if self.fmt not in self.FORMATS:
+            raise ValueError(f"Unsupported export format: {self.fmt}")
+
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_started: Optional[float] = None
+        self.rows_written = 0
+
+        if self.fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ImportError("Parquet export requires pyarrow. Install it with: pip install pyarrow")
+            os.makedirs(self.path, exist_ok=True)
+        else:
+            parent = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(parent, exist_ok=True)
+            self._repair_tail()
+
+        self._completed = self._load_completed_ids()
+        if self._completed:
+            logger.info(f"Resuming export {self.path}: {len(self._completed)} results already written")
+
+    def __enter__(self) -> "ResultsWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def is_completed(self, request_id: str) -> bool:
+        """True if a result for request_id is already in the output (or buffered)."""
+        return request_id in self._completed
+
+    @property
+    def completed_ids(self) -> Set[str]:
+        """Request IDs already written or buffered."""
+        return set(self._completed)
+
+    def append(self, record: Dict[str, Any]) -> bool:
+        """
+        Add one result; duplicates of already exported request IDs are skipped.
+
+        Args:
+            record: Result fields (see FIELDS); 'request_id' is required
+
+        Returns:
+            bool: True if the record was added, False if it was a duplicate
+        """
+        request_id = str(record["request_id"])
+        if request_id in self._completed:
+            return False
+
+        row = {name: record.get(name) for name in self.FIELDS}
+        row["request_id"] = request_id
+        if row["created_at"] is None:
+            row["created_at"] = time.time()
+
+        self._buffer.append(row)
+        self._completed.add(request_id)
+        if self._buffer_started is None:
+            self._buffer_started = time.monotonic()
+
+        if len(self._buffer) >= self.flush_every or (
+            time.monotonic() - self._buffer_started >= self.flush_interval
+        ):
+            self.flush()
+        return True
+
+    def flush(self) -> None:
+        """Write buffered rows to the output."""
+        if not self._buffer:
+            return
+
+        if self.fmt == "jsonl":
+            self._write_jsonl(self._buffer)
+        elif self.fmt == "csv":
+            self._write_csv(self._buffer)
+        else:
+            self._write_parquet(self._buffer)
+
+        self.rows_written += len(self._buffer)
+        logger.debug(f"Flushed {len(self._buffer)} results to {self.path}")
+        self._buffer = []
+        self._buffer_started = None
+
+    def close(self) -> None:
+        """Flush remaining rows."""
+        self.flush()
+
+    def _sync(self, handle) -> None:
+        handle.flush()
+        if self.fsync:
+            os.fsync(handle.fileno())
+
+    def _write_jsonl(self, rows: List[Dict[str, Any]]) -> None:
+        with open(self.path, "a", encoding="utf-8") as handle:
+            for row in rows:
+                handle.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._sync(handle)
+
+    def _write_csv(self, rows: List[Dict[str, Any]]) -> None:
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8", newline="") as handle:
+            writer = csv.DictWriter(handle, fieldnames=self.FIELDS)
+            if new_file:
+                writer.writeheader()
+            for row in rows:
+                writer.writerow({
+                    name: json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+                    for name, value in row.items()
+                })
+            self._sync(handle)
+
+    def _write_parquet(self, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            ("request_id", pa.string()),
+            ("resume_hash", pa.string()),
+            ("jd_hash", pa.string()),
+            ("prompt_type", pa.string()),
+            ("duplicate_of", pa.string()),
+            ("match_percentage", pa.int32()),
+            ("missing_keywords", pa.list_(pa.string())),
+            ("sections", pa.map_(pa.string(), pa.string())),
+            ("timings", pa.map_(pa.string(), pa.float64())),
+            ("response", pa.string()),
+            ("error", pa.string()),
+            ("created_at", pa.float64()),
+        ])
+        columns = {name: [row[name] for row in rows] for name in self.FIELDS}
+        for name in ("sections", "timings"):
+            columns[name] = [list(value.items()) if value else None for value in columns[name]]
+        table = pa.Table.from_pydict(columns, schema=schema)
+
+        # Each flush is an immutable part file, written under a temporary name and
+        # renamed, so a crash never leaves a half-written file in the dataset
+        part = len(glob.glob(os.path.join(self.path, "part-*.parquet")))
+        final_path = os.path.join(self.path, f"part-{part:06d}.parquet")
+        tmp_path = final_path + ".tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        if self.fsync:
+            with open(tmp_path, "rb") as handle:
+                os.fsync(handle.fileno())
+        os.replace(tmp_path, final_path)
+
+    def _repair_tail(self) -> None:
+        """Drop a trailing partial record left by a crash mid-write."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as handle:
+            size = handle.seek(0, os.SEEK_END)
+            end = self._csv_records_end(handle) if self.fmt == "csv" else self._last_line_end(handle, size)
+            if end < size:
+                handle.truncate(end)
+                logger.warning(f"Removed partial trailing record from {self.path}")
+
+    @staticmethod
+    def _last_line_end(handle, size: int) -> int:
+        """Byte offset just past the last newline, reading fixed-size blocks backwards from the end."""
+        position = size
+        while position > 0:
+            start = max(0, position - Config.EXPORT_SCAN_BLOCK_BYTES)
+            handle.seek(start)
+            index = handle.read(position - start).rfind(b"\n")
+            if index >= 0:
+                return start + index + 1
+            position = start
+        return 0
+
+    @staticmethod
+    def _csv_records_end(handle) -> int:
+        """
+        Byte offset just past the last complete CSV record.
+
+        Quoted fields may contain newlines, so a newline only ends a record when
+        an even number of quote characters precede it (escaped quotes are
+        doubled). That depends on everything before it, so unlike JSONL this is
+        a forward pass, in fixed-size blocks.
+        """
+        handle.seek(0)
+        offset = quotes = end = 0
+        while True:
+            block = handle.read(Config.EXPORT_SCAN_BLOCK_BYTES)
+            if not block:
+                return end
+            lines = block.split(b"\n")
+            for line in lines[:-1]:
+                quotes += line.count(b'"')
+                offset += len(line) + 1
+                if quotes % 2 == 0:
+                    end = offset
+            quotes += lines[-1].count(b'"')
+            offset += len(lines[-1])
+
+    def _load_completed_ids(self) -> Set[str]:
+        """Read request IDs already present in the output."""
+        completed: Set[str] = set()
+
+        if self.fmt == "jsonl" and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as handle:
+                for line in handle:
+                    try:
+                        completed.add(str(json.loads(line)["request_id"]))
+                    except (ValueError, KeyError):
+                        continue
+
+        elif self.fmt == "csv" and os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8", newline="") as handle:
+                for row in csv.DictReader(handle):
+                    if row.get("request_id"):
+                        completed.add(row["request_id"])
+
+        elif self.fmt == "parquet":
+            import pyarrow.parquet as pq
+            for tmp_path in glob.glob(os.path.join(self.path, "*.tmp")):
+                os.remove(tmp_path)
+            for part_path in sorted(glob.glob(os.path.join(self.path, "part-*.parquet"))):
+                table = pq.read_table(part_path, columns=["request_id"])
+                completed.update(table.column("request_id").to_pylist())
+
+        return completed
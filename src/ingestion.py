@@ -0,0 +1,380 @@
+"""
+Resume ingestion for the Technical ATS Resume Expert application.
+
+PDFs are validated and rendered as before, but text-based formats (DOCX,
+plain text, Markdown and RTF) do not need rasterizing at all: their text is
+extracted directly, parsed into the same cached ResumeProfile the PDF path
+produces, and sent to the AI service as text. A small preview image is only
+drawn from the text when a result is actually displayed.
+
+Extractors are registered per file extension, so supporting another format
+means adding one function decorated with DocumentIngestor.register().
+"""
+import io
+import re
+import hashlib
+import logging
+import textwrap
+import zipfile
+from dataclasses import dataclass
+from typing import Callable, Dict, Tuple, Union
+from xml.etree import ElementTree
+from PIL import Image, ImageDraw, ImageFont
+from src.cache import LRUCache
+from src.config import Config
+from src.memory import MemoryAccountant
+from src.resume_parser import ProfileCache, ResumeProfile
+from src.utils import PDFProcessor, PDFValidationError, ValidatedPDF
+
+logger = logging.getLogger(__name__)
+
+class DocumentValidationError(PDFValidationError):
+    """Raised when an uploaded text document is rejected; the message is safe to show to users."""
+
+@dataclass
+class TextDocument:
+    """An uploaded text-based resume that passed validation."""
+
+    name: str
+    data: bytes
+    content_hash: str
+    format: str  # File extension, e.g. 'docx'
+    text: str
+    page_count: int = 1  # Text documents are analyzed in a single call
+
+class DocumentIngestor:
+    """Validates uploads and extracts text from the supported resume formats."""
+
+    _extractors: Dict[str, Callable[[bytes], str]] = {}
+
+    @classmethod
+    def register(cls, *extensions: str):
+        """
+        Register a text extractor for one or more file extensions.
+
+        Args:
+            extensions: Extensions (without the dot) handled by the decorated function
+
+        Returns:
+            Decorator taking a function from raw bytes to text
+        """
+        def decorator(extractor: Callable[[bytes], str]) -> Callable[[bytes], str]:
+            for extension in extensions:
+                cls._extractors[extension.lower()] = extractor
+            return extractor
+        return decorator
+
+    @staticmethod
+    def extension(name: str) -> str:
+        """Return the lower-case extension of a file name, without the dot."""
+        return name.rsplit(".", 1)[-1].lower() if "." in (name or "") else ""
+
+    @classmethod
+    def ingest(cls, uploaded_file) -> Union[ValidatedPDF, TextDocument]:
+        """
+        Validate an upload of any supported format.
+
+        Args:
+            uploaded_file: Streamlit uploaded file object (any binary file-like with a name)
+
+        Returns:
+            Union[ValidatedPDF, TextDocument]: Validated PDF, or a text document with its extracted text
+
+        Raises:
+            PDFValidationError: If the upload is rejected (DocumentValidationError for text formats)
+        """
+        name = getattr(uploaded_file, "name", "") or ""
+        extension = cls.extension(name)
+        if extension == "pdf":
+            return PDFProcessor.inspect_pdf(uploaded_file)
+
+        extractor = cls._extractors.get(extension)
+        if extractor is None or extension not in Config.SUPPORTED_FORMATS:
+            raise DocumentValidationError("Please upload a PDF, DOCX, TXT, Markdown or RTF file.")
+
+        data, content_hash = cls._read(uploaded_file)
+        try:
+            text = cls._normalize(extractor(data))
+        except DocumentValidationError:
+            raise
+        except Exception as e:
+            logger.warning(f"Could not extract text from {name}: {str(e)}")
+            raise DocumentValidationError(f"The uploaded file is not a valid {extension.upper()} document.")
+
+        if not text:
+            raise DocumentValidationError("The uploaded document contains no text.")
+
+        return TextDocument(name=name, data=data, content_hash=content_hash, format=extension, text=text)
+
+    @staticmethod
+    def profile(document: Union[ValidatedPDF, TextDocument]) -> ResumeProfile:
+        """
+        Return the cached profile of a validated upload, parsing it on a cache miss.
+
+        Args:
+            document: Result of ingest()
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        if isinstance(document, TextDocument):
+            return ProfileCache.get_text_profile(document.text, document.content_hash)
+        return ProfileCache.get_pdf_profile(document.data, document.content_hash)
+
+    @staticmethod
+    def _read(uploaded_file) -> Tuple[bytes, str]:
+        """Read the upload in chunks, enforcing the size limit and hashing as we go."""
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+
+        hasher = hashlib.sha256()
+        buffer = bytearray()
+        while True:
+            chunk = uploaded_file.read(Config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer.extend(chunk)
+            hasher.update(chunk)
+            if len(buffer) > Config.MAX_FILE_SIZE:
+                raise DocumentValidationError(f"File size exceeds {Config.MAX_FILE_SIZE // (1024 * 1024)}MB limit.")
+
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+
+        if not buffer:
+            raise DocumentValidationError("The uploaded file is empty.")
+        return bytes(buffer), hasher.hexdigest()
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Trim trailing whitespace, unify line endings and collapse runs of blank lines."""
+        lines = [line.rstrip() for line in (text or "").replace("\r\n", "\n").replace("\r", "\n").split("\n")]
+        text = "\n".join(lines)
+        text = re.sub(r"\n{3,}", "\n\n", text).strip()
+        if len(text) > Config.MAX_DOCUMENT_CHARS:
+            raise DocumentValidationError("The document is too long for a resume.")
+        return text
+
+def _decode_text(data: bytes) -> str:
+    """Decode a text file, honoring byte order marks and falling back to Windows-1252."""
+    if data.startswith((b"\xff\xfe", b"\xfe\xff")):
+        text = data.decode("utf-16")
+    else:
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            text = data.decode("cp1252", errors="replace")
+
+    if "\x00" in text:
+        raise DocumentValidationError("The uploaded file does not look like a text document.")
+    return text
+
+@DocumentIngestor.register("txt")
+def extract_plain_text(data: bytes) -> str:
+    """Extract the text of a plain text resume."""
+    return _decode_text(data)
+
+@DocumentIngestor.register("md", "markdown")
+def extract_markdown(data: bytes) -> str:
+    """Extract the text of a Markdown resume, dropping the markup but keeping headings and bullets."""
+    lines = []
+    for line in _decode_text(data).splitlines():
+        stripped = line.strip()
+        if stripped.startswith(("```", "~~~")):
+            continue  # Fence markers; the fenced content is kept as text
+        if re.fullmatch(r"([-*_=])(\s*\1){2,}", stripped):
+            continue  # Horizontal rules and setext heading underlines
+        if re.fullmatch(r"\|?(\s*:?-{2,}:?\s*\|)+\s*:?-*:?\s*\|?", stripped):
+            continue  # Table header separators
+
+        line = re.sub(r"^\s{0,3}#{1,6}\s+(.*?)(\s+#+)?\s*$", r"\1", line)  # ATX headings
+        line = re.sub(r"^\s*>\s?", "", line)  # Block quotes
+        line = re.sub(r"^(\s*)[*+]\s+", r"\1- ", line)  # Bullets
+        line = re.sub(r"!\[([^\]]*)\]\([^)]*\)", r"\1", line)  # Images
+        line = re.sub(r"\[([^\]]+)\]\(([^)]*)\)", r"\1", line)  # Links
+        line = re.sub(r"<(https?://[^>]+)>", r"\1", line)  # Autolinks
+        line = re.sub(r"</?[a-zA-Z][^>]*>", "", line)  # Inline HTML
+        line = re.sub(r"(\*\*|__)(.+?)\1", r"\2", line)  # Bold
+        line = re.sub(r"(?<![\w*])([*_])(\S(?:.*?\S)?)\1(?![\w*])", r"\2", line)  # Italics
+        line = re.sub(r"~~(.+?)~~", r"\1", line)  # Strikethrough
+        line = re.sub(r"`([^`]*)`", r"\1", line)  # Inline code
+        if stripped.startswith("|"):
+            line = " | ".join(cell.strip() for cell in line.strip().strip("|").split("|"))
+        lines.append(line)
+    return "\n".join(lines)
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+@DocumentIngestor.register("docx")
+def extract_docx(data: bytes) -> str:
+    """Extract the paragraphs (including those inside tables) of a Word document."""
+    try:
+        archive = zipfile.ZipFile(io.BytesIO(data))
+    except zipfile.BadZipFile:
+        raise DocumentValidationError("The uploaded file is not a valid DOCX document.")
+
+    with archive:
+        try:
+            info = archive.getinfo("word/document.xml")
+        except KeyError:
+            raise DocumentValidationError("The uploaded file is not a valid DOCX document.")
+        # Checked before decompressing, so a zip bomb is never expanded
+        if info.file_size > Config.MAX_DOCX_XML_BYTES:
+            raise DocumentValidationError("The document is too large to process.")
+        root = ElementTree.fromstring(archive.read(info))
+
+    paragraphs = []
+    for paragraph in root.iter(f"{_WORD_NAMESPACE}p"):
+        parts = []
+        for element in paragraph.iter():
+            if element.tag == f"{_WORD_NAMESPACE}t":
+                parts.append(element.text or "")
+            elif element.tag == f"{_WORD_NAMESPACE}tab":
+                parts.append("\t")
+            elif element.tag in (f"{_WORD_NAMESPACE}br", f"{_WORD_NAMESPACE}cr"):
+                parts.append("\n")
+        text = "".join(parts)
+        # List paragraphs carry their bullet in numbering properties, not in the text
+        if text.strip() and paragraph.find(f"{_WORD_NAMESPACE}pPr/{_WORD_NAMESPACE}numPr") is not None:
+            text = f"- {text.strip()}"
+        paragraphs.append(text)
+    return "\n".join(paragraphs)
+
+_RTF_TOKEN = re.compile(
+    r"\\([a-zA-Z]{1,32})(-?\d{1,10})? ?|\\'([0-9a-fA-F]{2})|\\([^a-zA-Z])|([{}])|[\r\n]+|([^\\{}\r\n]+)"
+)
+
+# Destinations whose content is formatting or metadata rather than document text
+_RTF_SKIPPED_DESTINATIONS = {
+    "fonttbl", "colortbl", "stylesheet", "info", "pict", "object", "header", "headerl", "headerr", "headerf",
+    "footer", "footerl", "footerr", "footerf", "fldinst", "themedata", "colorschememapping", "latentstyles",
+    "datastore", "xmlnstbl", "listtable", "listoverridetable", "rsidtbl", "generator", "filetbl", "revtbl",
+}
+
+_RTF_CHARACTERS = {
+    "par": "\n", "line": "\n", "row": "\n", "sect": "\n", "page": "\n", "tab": "\t", "cell": "\t",
+    "emdash": "—", "endash": "–", "bullet": "•", "lquote": "‘", "rquote": "’", "ldblquote": "“", "rdblquote": "”",
+}
+
+@DocumentIngestor.register("rtf")
+def extract_rtf(data: bytes) -> str:
+    """Extract the text of an RTF document by interpreting its control words."""
+    source = data.decode("latin-1")
+    if not source.lstrip().startswith("{\\rtf"):
+        raise DocumentValidationError("The uploaded file is not a valid RTF document.")
+
+    output = []
+    stack = []
+    skipping = False
+    unicode_skip = 1  # Fallback characters following each \uN (set by \ucN)
+    pending_skip = 0
+
+    for match in _RTF_TOKEN.finditer(source):
+        word, argument, hex_code, symbol, brace, text = match.groups()
+
+        if brace == "{":
+            stack.append((skipping, unicode_skip))
+        elif brace == "}":
+            if stack:
+                skipping, unicode_skip = stack.pop()
+        elif symbol is not None:
+            if symbol == "*":
+                skipping = True  # Ignorable destination
+            elif skipping:
+                continue
+            elif symbol in "\\{}":
+                output.append(symbol)
+            elif symbol == "~":
+                output.append(" ")
+            elif symbol == "_":
+                output.append("-")
+            elif symbol in "\r\n":
+                output.append("\n")
+        elif word is not None:
+            if word in _RTF_SKIPPED_DESTINATIONS:
+                skipping = True
+            elif skipping:
+                continue
+            elif word == "uc" and argument:
+                unicode_skip = int(argument)
+            elif word == "u" and argument:
+                code = int(argument)
+                output.append(chr(code + 65536 if code < 0 else code))
+                pending_skip = unicode_skip
+            elif word in _RTF_CHARACTERS:
+                output.append(_RTF_CHARACTERS[word])
+        elif hex_code is not None:
+            if pending_skip:
+                pending_skip -= 1
+            elif not skipping:
+                output.append(bytes([int(hex_code, 16)]).decode("cp1252", errors="replace"))
+        elif text is not None:
+            if pending_skip:
+                text, pending_skip = text[pending_skip:], max(0, pending_skip - len(text))
+            if not skipping:
+                output.append(text)
+
+    return "".join(output)
+
+class TextPreview:
+    """Small preview images of text resumes, drawn on first display and cached by content hash."""
+
+    _cache = LRUCache(max_entries=256, max_bytes=Config.TEXT_PREVIEW_CACHE_BYTES)
+
+    @classmethod
+    def get(cls, content_hash: str, text: str) -> bytes:
+        """
+        Return the preview JPEG for a text resume, rendering it on a cache miss.
+
+        Args:
+            content_hash: Content hash of the document
+            text: Document text (only the beginning is drawn)
+
+        Returns:
+            bytes: JPEG image
+        """
+        cached = cls._cache.get(content_hash)
+        if cached is None:
+            cached = cls.render(text)
+            cls._cache.put(content_hash, cached)
+        return cached
+
+    @staticmethod
+    def render(text: str, width: int = Config.PREVIEW_THUMBNAIL_WIDTH) -> bytes:
+        """
+        Draw the beginning of a text as a page-shaped image.
+
+        Args:
+            text: Text to draw
+            width: Image width in pixels (the height follows the US Letter aspect ratio)
+
+        Returns:
+            bytes: JPEG image
+        """
+        height = int(width * 11 / 8.5)
+        margin = width // 16
+        # Pillow's bundled TrueType font; builds without FreeType fall back to a Latin-1 bitmap font
+        font = ImageFont.load_default(size=Config.TEXT_PREVIEW_FONT_SIZE)
+        if not isinstance(font, ImageFont.FreeTypeFont):
+            text = text.encode("latin-1", "replace").decode("latin-1")
+        left, top, right, bottom = font.getbbox("M")
+        char_width, line_height = max(1, right - left), (bottom - top) + 4
+        columns = max(10, (width - 2 * margin) // char_width)
+
+        image = Image.new("RGB", (width, height), "white")
+        draw = ImageDraw.Draw(image)
+        y = margin
+        lines = (line for paragraph in text.splitlines()
+                 for line in textwrap.wrap(paragraph.expandtabs(4), columns) or [""])
+        for line in lines:
+            if y + line_height > height - margin:
+                break
+            draw.text((margin, y), line, fill="black", font=font)
+            y += line_height
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=80)
+        image.close()
+        return buffer.getvalue()
+
+MemoryAccountant.get().register_shared("text_previews", TextPreview._cache)
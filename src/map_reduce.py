@@ -0,0 +1,214 @@
+"""
+Map-reduce analysis of long resumes for the Technical ATS Resume Expert application.
+
+The single-call path only sends the first page image to Gemini. For multi-page
+resumes each page is reduced to a digest in parallel (map): short text pages
+are used as extracted, long ones are summarized with a small LLM call, and
+pages without a text layer are transcribed from a low-resolution render.
+Digests are cached by page content hash, so a resubmitted resume only
+reprocesses pages that changed. The chosen prompt then runs once over the
+combined digest (reduce).
+"""
+import re
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import fitz  # PyMuPDF
+from src.cache import ContentHasher, LRUCache
+from src.config import Config
+from src.memory import MemoryAccountant
+from src.profiling import RequestTag
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ResumePage:
+    """Content extracted from one PDF page."""
+
+    number: int  # 1-based
+    text: str
+    page_hash: str
+    image_base64: Optional[str] = None  # Only for pages without a usable text layer
+
+@dataclass
+class PageDigest:
+    """Condensed content of one page."""
+
+    number: int
+    page_hash: str
+    text: str
+    method: str  # 'text', 'summary', 'transcription' or 'truncated'
+    cached: bool = False
+
+class PageDigestCache:
+    """Process-wide cache of page digests keyed by page content hash."""
+
+    _cache = LRUCache(max_entries=4096, max_bytes=Config.PAGE_DIGEST_CACHE_BYTES,
+                      sizeof=lambda digest: len(digest.text.encode("utf-8")))
+
+    @classmethod
+    def get(cls, page_hash: str) -> Optional[PageDigest]:
+        """Return the cached digest for a page, or None."""
+        return cls._cache.get(page_hash)
+
+    @classmethod
+    def put(cls, digest: PageDigest) -> None:
+        """Store a page digest."""
+        cls._cache.put(digest.page_hash, digest)
+
+    @classmethod
+    def stats(cls):
+        """Return cache statistics."""
+        return cls._cache.stats()
+
+MemoryAccountant.get().register_shared("page_digests", PageDigestCache._cache)
+
+class LongResumeAnalyzer:
+    """Analyzes multi-page resumes by digesting pages in parallel and prompting once over the digest."""
+
+    PAGE_SUMMARY_PROMPT = """
+    Condense this resume page for a later evaluation against a job description. Keep every job title, employer, date range, degree, certification, skill, tool, technology and quantified achievement. Drop filler, repetition and formatting. Answer with plain lines of text only.
+    """
+
+    PAGE_TRANSCRIPTION_PROMPT = """
+    Transcribe the resume content of this page image as plain lines of text. Keep every job title, employer, date range, degree, certification, skill, tool, technology and quantified achievement; omit decorative elements.
+    """
+
+    _executor = ThreadPoolExecutor(max_workers=Config.MAPREDUCE_WORKERS, thread_name_prefix="page-digest")
+
+    def __init__(self, gemini_service):
+        """
+        Initialize the analyzer.
+
+        Args:
+            gemini_service: GeminiService used for page digests and the final prompt
+        """
+        self.gemini_service = gemini_service
+
+    @staticmethod
+    def should_use(page_count: int) -> bool:
+        """True if a resume is long enough to need map-reduce analysis."""
+        return Config.MAPREDUCE_ENABLED and page_count >= Config.MAPREDUCE_MIN_PAGES
+
+    @staticmethod
+    def extract_pages(pdf_bytes: bytes) -> List[ResumePage]:
+        """
+        Extract the text of every page, rendering only pages without a text layer.
+
+        Args:
+            pdf_bytes: Raw PDF bytes
+
+        Returns:
+            List[ResumePage]: Pages in document order
+        """
+        pages = []
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+            for index, page in enumerate(pdf_doc):
+                text = LongResumeAnalyzer._normalize(page.get_text("text"))
+                if len(text) >= Config.MAPREDUCE_MIN_TEXT_CHARS:
+                    pages.append(ResumePage(index + 1, text, ContentHasher.combine("text", text)))
+                    continue
+
+                zoom = Config.MAPREDUCE_RENDER_ZOOM
+                jpeg_bytes = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes("jpeg")
+                pages.append(ResumePage(
+                    index + 1,
+                    text,
+                    ContentHasher.combine("image", jpeg_bytes),
+                    image_base64=base64.b64encode(jpeg_bytes).decode()
+                ))
+        return pages
+
+    def map_pages(self, pages: List[ResumePage]) -> List[PageDigest]:
+        """
+        Digest pages in parallel, reusing cached digests of unchanged pages.
+
+        Args:
+            pages: Extracted pages
+
+        Returns:
+            List[PageDigest]: Digests in page order
+        """
+        return list(self._executor.map(RequestTag.propagate(self._digest_page), pages))
+
+    def reduce(self, job_description: str, digests: List[PageDigest], prompt: str,
+               fallback: Optional[Callable[[], str]] = None) -> Optional[str]:
+        """
+        Run the analysis prompt once over the combined page digests.
+
+        Args:
+            job_description: Job description text
+            digests: Page digests in page order
+            prompt: Analysis prompt
+            fallback: Produces a locally computed response if the AI service is unavailable
+
+        Returns:
+            Optional[str]: AI response text or None if error
+        """
+        return self.gemini_service.generate_text_response(job_description, self.combine(digests), prompt,
+                                                          fallback=fallback)
+
+    @staticmethod
+    def combine(digests: List[PageDigest]) -> str:
+        """Join page digests into the resume text sent with the final prompt."""
+        return "\n\n".join(f"[Page {digest.number}]\n{digest.text}" for digest in digests if digest.text)
+
+    def analyze(self, job_description: str, pdf_bytes: bytes, prompt: str,
+                fallback: Optional[Callable[[], str]] = None) -> Optional[str]:
+        """
+        Analyze every page of a resume with one final prompt call.
+
+        Args:
+            job_description: Job description text
+            pdf_bytes: Raw (validated) PDF bytes
+            prompt: Analysis prompt
+            fallback: Produces a locally computed response if the AI service is unavailable
+
+        Returns:
+            Optional[str]: AI response text or None if error
+        """
+        pages = self.extract_pages(pdf_bytes)
+        digests = self.map_pages(pages)
+        reused = sum(digest.cached for digest in digests)
+        logger.info(
+            f"Digested {len(digests)} pages ({reused} from cache): "
+            f"{sum(len(page.text) for page in pages)} -> {sum(len(digest.text) for digest in digests)} chars"
+        )
+        return self.reduce(job_description, digests, prompt, fallback)
+
+    def _digest_page(self, page: ResumePage) -> PageDigest:
+        cached = PageDigestCache.get(page.page_hash)
+        if cached is not None:
+            return PageDigest(page.number, page.page_hash, cached.text, cached.method, cached=True)
+
+        if page.image_base64:
+            text = self.gemini_service.generate_page_digest(self.PAGE_TRANSCRIPTION_PROMPT, page_text=page.text,
+                                                            page_image=page.image_base64)
+            method = "transcription"
+        elif len(page.text) > Config.MAPREDUCE_PAGE_CHARS:
+            text = self.gemini_service.generate_page_digest(self.PAGE_SUMMARY_PROMPT, page_text=page.text)
+            method = "summary"
+        else:
+            text, method = page.text, "text"
+
+        if text is None:
+            # Not cached, so the page is digested properly on the next submission
+            logger.warning(f"Could not digest page {page.number}, using its extracted text")
+            return PageDigest(page.number, page.page_hash, page.text[:Config.MAPREDUCE_PAGE_CHARS], "truncated")
+
+        digest = PageDigest(page.number, page.page_hash, text.strip(), method)
+        PageDigestCache.put(digest)
+        return digest
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """Collapse whitespace and drop blank and repeated lines."""
+        lines, seen = [], set()
+        for line in (text or "").splitlines():
+            line = re.sub(r"\s+", " ", line).strip()
+            if line and line not in seen:
+                seen.add(line)
+                lines.append(line)
+        return "\n".join(lines)
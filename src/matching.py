@@ -0,0 +1,734 @@
+"""
+Local (non-LLM) resume matching for the Technical ATS Resume Expert application.
+
+Skills are extracted from resumes and job descriptions with a lexicon of
+technical terms and compared as vectors. This is far cheaper than a Gemini
+call and is used to score many resumes against many job descriptions at once,
+sending only the most promising pairs to the LLM for a narrative, as the
+first tier of a cascade that only asks the LLM about ambiguous matches, and
+for live re-scoring while a resume is being edited.
+"""
+import os
+import re
+import json
+import math
+import time
+import hashlib
+import logging
+import argparse
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class LocalMatchResult:
+    """Local keyword match of one resume against one job description."""
+
+    score: int
+    matched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def jd_skills(self) -> int:
+        """Number of distinct lexicon skills found in the job description."""
+        return len(self.matched) + len(self.missing)
+
+    def to_ats_response(self, note: str = "Estimated locally from keyword coverage of the job requirements.") -> str:
+        """
+        Format the result like an ATS matching response from the AI service.
+
+        Args:
+            note: Text for the Final Thoughts section
+
+        Returns:
+            str: Response text parseable by TextAnalyzer
+        """
+        missing = "\n".join(f"- {skill}" for skill in self.missing) or "- None"
+        matched = ", ".join(self.matched) or "none"
+        return (
+            f"**Match Percentage**: {self.score}%\n\n"
+            f"**Missing Keywords**: \n{missing}\n\n"
+            f"**Final Thoughts**: \n{note} Matched skills: {matched}."
+        )
+
+class SkillExtractor:
+    """Extracts canonical skill names from free text using a lexicon of aliases."""
+
+    # canonical skill -> aliases (the canonical name is always an alias of itself)
+    SKILL_LEXICON = {
+        # Languages
+        "python": [], "java": [], "javascript": ["js", "ecmascript"], "typescript": ["ts"],
+        "go": ["golang"], "rust": [], "c++": ["cpp"], "c#": ["csharp"], "ruby": [], "php": [],
+        "scala": [], "kotlin": [], "swift": [], "r": [], "sql": [], "bash": ["shell scripting"],
+        "matlab": [],
+        # Web
+        "react": ["react.js", "reactjs"], "angular": ["angularjs"], "vue": ["vue.js", "vuejs"],
+        "node.js": ["nodejs", "node"], "django": [], "flask": [], "fastapi": [], "spring": ["spring boot"],
+        ".net": ["dotnet", "asp.net"], "html": ["html5"], "css": ["css3"], "graphql": [], "rest api": ["rest", "restful"],
+        # Data
+        "postgresql": ["postgres"], "mysql": [], "mongodb": ["mongo"], "redis": [], "elasticsearch": [],
+        "cassandra": [], "snowflake": [], "bigquery": [], "spark": ["apache spark", "pyspark"], "hadoop": [],
+        "kafka": ["apache kafka"], "airflow": ["apache airflow"], "dbt": [], "etl": [], "pandas": [], "numpy": [],
+        "tableau": [], "power bi": ["powerbi"], "excel": [],
+        # ML / AI
+        "machine learning": ["ml"], "deep learning": [], "nlp": ["natural language processing"],
+        "computer vision": [], "tensorflow": [], "pytorch": [], "scikit-learn": ["sklearn"], "llm": ["llms"],
+        "statistics": ["statistical analysis"],
+        # Cloud / DevOps
+        "aws": ["amazon web services"], "azure": ["microsoft azure"], "gcp": ["google cloud", "google cloud platform"],
+        "docker": [], "kubernetes": ["k8s"], "terraform": [], "ansible": [], "jenkins": [],
+        "ci/cd": ["cicd", "continuous integration"], "git": [], "linux": [], "microservices": [],
+        "prometheus": [], "grafana": [],
+        # Practices
+        "agile": ["scrum"], "tdd": ["test driven development"], "system design": [], "data structures": [],
+        "algorithms": [], "security": ["cybersecurity"],
+    }
+
+    # Aliases that are ordinary words and only count when written in a technical way
+    CASE_SENSITIVE_ALIASES = {"go": "Go", "r": "R", "node": "Node", "rest": "REST", "ts": "TS", "ml": "ML"}
+
+    def __init__(self, extra_skills: Optional[Dict[str, Sequence[str]]] = None):
+        """
+        Compile the skill lexicon into a single pattern.
+
+        Args:
+            extra_skills: Additional canonical skills and their aliases
+        """
+        lexicon = {skill: list(aliases) for skill, aliases in self.SKILL_LEXICON.items()}
+        for skill, aliases in (extra_skills or {}).items():
+            lexicon.setdefault(skill.lower(), []).extend(alias.lower() for alias in aliases)
+
+        self._alias_to_skill: Dict[str, str] = {}
+        for skill, aliases in lexicon.items():
+            for alias in [skill] + aliases:
+                self._alias_to_skill[alias] = skill
+
+        self.vocabulary: List[str] = sorted(lexicon)
+
+        insensitive = sorted(
+            (alias for alias in self._alias_to_skill if alias not in self.CASE_SENSITIVE_ALIASES),
+            key=len, reverse=True
+        )
+        boundary_start, boundary_end = r"(?<![\w+#.])", r"(?![\w+#]|\.\w)"
+        self._pattern = re.compile(
+            boundary_start + "(" + "|".join(re.escape(alias) for alias in insensitive) + ")" + boundary_end,
+            re.IGNORECASE
+        )
+        # "R&D" and "Go-to-market" are not skills
+        self._case_pattern = re.compile(
+            boundary_start + "(" + "|".join(re.escape(word) for word in self.CASE_SENSITIVE_ALIASES.values()) + ")"
+            + r"(?![\w+#&-]|\.\w)"
+        )
+
+    def extract_counts(self, text: str) -> Counter:
+        """
+        Count mentions of each canonical skill in text.
+
+        Args:
+            text: Resume or job description text
+
+        Returns:
+            Counter: Canonical skill -> number of mentions
+        """
+        counts: Counter = Counter()
+        if not text:
+            return counts
+        for match in self._pattern.finditer(text):
+            counts[self._alias_to_skill[match.group(1).lower()]] += 1
+        for match in self._case_pattern.finditer(text):
+            counts[self._alias_to_skill[match.group(1).lower()]] += 1
+        return counts
+
+    def extract(self, text: str) -> Set[str]:
+        """
+        Return the set of canonical skills mentioned in text.
+
+        Args:
+            text: Resume or job description text
+
+        Returns:
+            Set[str]: Canonical skill names
+        """
+        return set(self.extract_counts(text))
+
+class LocalMatcher:
+    """Scores a single resume against a single job description without the LLM."""
+
+    def __init__(self, extractor: Optional[SkillExtractor] = None):
+        """
+        Initialize the matcher.
+
+        Args:
+            extractor: Skill extractor to use (a default one is created if omitted)
+        """
+        self.extractor = extractor or SkillExtractor()
+
+    @staticmethod
+    def skill_weight(mentions: int) -> float:
+        """Weight of a job requirement; skills mentioned repeatedly count more, with diminishing returns."""
+        return 1.0 + math.log(mentions) if mentions > 0 else 0.0
+
+    def score(self, resume_text: str, job_description: str) -> LocalMatchResult:
+        """
+        Score a resume against a job description.
+
+        Args:
+            resume_text: Resume text
+            job_description: Job description text
+
+        Returns:
+            LocalMatchResult: Weighted skill coverage (0-100) with matched and missing skills
+        """
+        jd_counts = self.extractor.extract_counts(job_description)
+        resume_skills = self.extractor.extract(resume_text)
+        return self.score_counts(resume_skills, jd_counts)
+
+    def score_counts(self, resume_skills: Set[str], jd_counts: Counter) -> LocalMatchResult:
+        """
+        Score precomputed skill sets.
+
+        Args:
+            resume_skills: Skills present in the resume
+            jd_counts: Skill mention counts in the job description
+
+        Returns:
+            LocalMatchResult: Weighted skill coverage (0-100) with matched and missing skills
+        """
+        if not jd_counts:
+            return LocalMatchResult(score=0)
+
+        weights = {skill: self.skill_weight(count) for skill, count in jd_counts.items()}
+        matched = sorted((skill for skill in weights if skill in resume_skills), key=lambda s: (-weights[s], s))
+        missing = sorted((skill for skill in weights if skill not in resume_skills), key=lambda s: (-weights[s], s))
+        covered = sum(weights[skill] for skill in matched)
+        return LocalMatchResult(score=round(100 * covered / sum(weights.values())), matched=matched, missing=missing)
+
+class IncrementalMatcher:
+    """
+    Keeps a local match score current while the resume or job description is edited.
+
+    Skill counts are kept per side and updated from a line diff: lines shared
+    with the previous version at the start and end are skipped, and only the
+    changed lines in between are re-extracted. Typing in one place therefore
+    costs a scan of a few lines instead of the whole document.
+    """
+
+    SIDES = ("resume", "job_description")
+
+    def __init__(self, matcher: Optional[LocalMatcher] = None, max_cached_lines: int = 2048):
+        """
+        Initialize the matcher.
+
+        Args:
+            matcher: Local matcher whose extractor and weighting are used
+            max_cached_lines: Distinct lines whose skill counts are remembered
+        """
+        self.matcher = matcher or LocalMatcher()
+        self.max_cached_lines = max_cached_lines
+        self._lines: Dict[str, List[str]] = {side: [] for side in self.SIDES}
+        self._counts: Dict[str, Counter] = {side: Counter() for side in self.SIDES}
+        self._line_cache: Dict[str, Counter] = {}
+        self.result = LocalMatchResult(score=0)
+        self.previous: Optional[LocalMatchResult] = None
+        self.lines_scanned = 0
+
+    def update(self, resume_text: Optional[str] = None, job_description: Optional[str] = None) -> LocalMatchResult:
+        """
+        Apply edits and rescore.
+
+        Args:
+            resume_text: New resume text (None if unchanged)
+            job_description: New job description text (None if unchanged)
+
+        Returns:
+            LocalMatchResult: Score, matched and missing skills for the current texts
+        """
+        changed = False
+        if resume_text is not None:
+            changed |= self._apply("resume", resume_text)
+        if job_description is not None:
+            changed |= self._apply("job_description", job_description)
+
+        if changed:
+            self.previous = self.result
+            self.result = self.matcher.score_counts(set(self._counts["resume"]), self._counts["job_description"])
+        return self.result
+
+    def _apply(self, side: str, text: str) -> bool:
+        """Update one side's counts from the lines that differ from its previous version."""
+        old, new = self._lines[side], (text or "").splitlines()
+        if old == new:
+            return False
+
+        # Lines shared at the start and the end are unchanged by the edit
+        start = 0
+        limit = min(len(old), len(new))
+        while start < limit and old[start] == new[start]:
+            start += 1
+        end = 0
+        while end < limit - start and old[-1 - end] == new[-1 - end]:
+            end += 1
+
+        counts = self._counts[side]
+        for line in old[start:len(old) - end]:
+            counts.subtract(self._line_counts(line))
+        for line in new[start:len(new) - end]:
+            counts.update(self._line_counts(line))
+        self._counts[side] = +counts  # Drop skills no longer mentioned
+        self._lines[side] = new
+        return True
+
+    def _line_counts(self, line: str) -> Counter:
+        cached = self._line_cache.get(line)
+        if cached is None:
+            if len(self._line_cache) >= self.max_cached_lines:
+                self._line_cache.clear()
+            cached = self._line_cache[line] = self.matcher.extractor.extract_counts(line)
+            self.lines_scanned += 1
+        return cached
+
+class MatchMatrix:
+    """Resume x job description score matrix computed with vectorized NumPy operations."""
+
+    def __init__(self, resume_ids: List[str], job_ids: List[str], vocabulary: List[str],
+                 resume_matrix: np.ndarray, job_weights: np.ndarray):
+        """
+        Initialize the matrix from precomputed skill vectors.
+
+        Args:
+            resume_ids: Row identifiers
+            job_ids: Column identifiers
+            vocabulary: Skill name for each vector dimension
+            resume_matrix: M x V 0/1 matrix of resume skills
+            job_weights: N x V matrix of job requirement weights
+        """
+        self.resume_ids = resume_ids
+        self.job_ids = job_ids
+        self.vocabulary = vocabulary
+        self.resume_matrix = resume_matrix
+        self.job_weights = job_weights
+        self._resume_index = {resume_id: index for index, resume_id in enumerate(resume_ids)}
+        self._job_index = {job_id: index for index, job_id in enumerate(job_ids)}
+
+        totals = job_weights.sum(axis=1)
+        # Weighted coverage: (M x V) @ (V x N), normalized by each job's total weight
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = (resume_matrix @ job_weights.T) / totals[np.newaxis, :]
+        self.scores = np.nan_to_num(scores * 100.0).astype(np.float32)
+
+    @classmethod
+    def build(cls, resumes: Dict[str, str], jobs: Dict[str, str],
+              extractor: Optional[SkillExtractor] = None) -> "MatchMatrix":
+        """
+        Extract skills from every resume and job description and compute the score matrix.
+
+        Args:
+            resumes: Resume id -> resume text
+            jobs: Job id -> job description text
+            extractor: Skill extractor to use
+
+        Returns:
+            MatchMatrix: Computed matrix
+        """
+        extractor = extractor or SkillExtractor()
+        job_counts = {job_id: extractor.extract_counts(text) for job_id, text in jobs.items()}
+
+        # Only skills some job asks for can affect a score
+        vocabulary = sorted({skill for counts in job_counts.values() for skill in counts})
+        column = {skill: index for index, skill in enumerate(vocabulary)}
+
+        job_weights = np.zeros((len(jobs), len(vocabulary)), dtype=np.float32)
+        for row, counts in enumerate(job_counts.values()):
+            for skill, count in counts.items():
+                job_weights[row, column[skill]] = LocalMatcher.skill_weight(count)
+
+        resume_matrix = cls._resume_matrix(resumes, vocabulary, extractor)
+        matrix = cls(list(resumes), list(jobs), vocabulary, resume_matrix, job_weights)
+        logger.info(f"Built {len(resumes)} x {len(jobs)} match matrix over {len(vocabulary)} skills")
+        return matrix
+
+    def for_resumes(self, resumes: Dict[str, str], extractor: Optional[SkillExtractor] = None) -> "MatchMatrix":
+        """
+        Score other resumes against the same job descriptions without extracting their skills again.
+
+        Args:
+            resumes: Resume id -> resume text
+            extractor: Skill extractor to use (the one the matrix was built with)
+
+        Returns:
+            MatchMatrix: Matrix of the given resumes against this matrix's jobs
+        """
+        resume_matrix = self._resume_matrix(resumes, self.vocabulary, extractor or SkillExtractor())
+        return MatchMatrix(list(resumes), self.job_ids, self.vocabulary, resume_matrix, self.job_weights)
+
+    @staticmethod
+    def _resume_matrix(resumes: Dict[str, str], vocabulary: List[str], extractor: SkillExtractor) -> np.ndarray:
+        """0/1 matrix of which vocabulary skills each resume mentions."""
+        column = {skill: index for index, skill in enumerate(vocabulary)}
+        resume_matrix = np.zeros((len(resumes), len(vocabulary)), dtype=np.float32)
+        for row, text in enumerate(resumes.values()):
+            for skill in extractor.extract(text):
+                if skill in column:
+                    resume_matrix[row, column[skill]] = 1.0
+        return resume_matrix
+
+    def score(self, resume_id: str, job_id: str) -> int:
+        """Return the score of one cell."""
+        return int(round(self.scores[self._resume_index[resume_id], self._job_index[job_id]]))
+
+    def missing_keywords(self, resume_id: str, job_id: str) -> List[str]:
+        """
+        Return the skills a job asks for that a resume lacks (computed on demand per cell).
+
+        Args:
+            resume_id: Resume identifier
+            job_id: Job identifier
+
+        Returns:
+            List[str]: Missing skills, most important first
+        """
+        row = self._resume_index[resume_id]
+        col = self._job_index[job_id]
+        weights = self.job_weights[col]
+        mask = (weights > 0) & (self.resume_matrix[row] == 0)
+        indices = np.flatnonzero(mask)
+        order = indices[np.argsort(-weights[indices], kind="stable")]
+        return [self.vocabulary[index] for index in order]
+
+    def top_jobs(self, resume_id: str, k: int = 5) -> List[Tuple[str, int]]:
+        """
+        Return the k best matching jobs for a resume.
+
+        Args:
+            resume_id: Resume identifier
+            k: Number of jobs
+
+        Returns:
+            List[Tuple[str, int]]: (job id, score) pairs, best first
+        """
+        row = self.scores[self._resume_index[resume_id]]
+        return [(self.job_ids[i], int(round(row[i]))) for i in self._top_indices(row, k)]
+
+    def top_resumes(self, job_id: str, k: int = 5) -> List[Tuple[str, int]]:
+        """
+        Return the k best matching resumes for a job.
+
+        Args:
+            job_id: Job identifier
+            k: Number of resumes
+
+        Returns:
+            List[Tuple[str, int]]: (resume id, score) pairs, best first
+        """
+        column = self.scores[:, self._job_index[job_id]]
+        return [(self.resume_ids[i], int(round(column[i]))) for i in self._top_indices(column, k)]
+
+    def top_cells(self, k: int = 10) -> List[Tuple[str, str, int]]:
+        """
+        Return the k highest scoring (resume, job) pairs in the whole matrix.
+
+        Args:
+            k: Number of cells
+
+        Returns:
+            List[Tuple[str, str, int]]: (resume id, job id, score) triples, best first
+        """
+        flat = self.scores.ravel()
+        n_jobs = len(self.job_ids)
+        return [
+            (self.resume_ids[i // n_jobs], self.job_ids[i % n_jobs], int(round(flat[i])))
+            for i in self._top_indices(flat, k)
+        ]
+
+    def narrate_top_cells(self, gemini_service, resumes: Dict[str, str], jobs: Dict[str, str], prompt: str,
+                          k: int = 10) -> Dict[Tuple[str, str], Optional[str]]:
+        """
+        Ask the LLM for a narrative on the k best cells only.
+
+        Requests go through the service's quiet path, so nothing is written to
+        the UI and a failed request just leaves its narrative empty.
+
+        Args:
+            gemini_service: GeminiService instance
+            resumes: Resume id -> resume text
+            jobs: Job id -> job description text
+            prompt: Analysis prompt
+            k: Number of cells to narrate
+
+        Returns:
+            Dict[Tuple[str, str], Optional[str]]: (resume id, job id) -> LLM response, or None if it failed
+        """
+        narratives = {}
+        for resume_id, job_id, _ in self.top_cells(k):
+            narratives[(resume_id, job_id)] = gemini_service.generate_quietly(
+                [jobs[job_id], f"Resume:\n{resumes[resume_id]}", prompt]
+            )
+        return narratives
+
+    @staticmethod
+    def _top_indices(values: np.ndarray, k: int) -> Iterable[int]:
+        """Indices of the k largest values, largest first (ties keep input order)."""
+        k = min(k, values.size)
+        if k <= 0:
+            return []
+        if k < values.size:
+            candidates = np.argpartition(-values, k - 1)[:k]
+        else:
+            candidates = np.arange(values.size)
+        return candidates[np.lexsort((candidates, -values[candidates]))]
+
+@dataclass
+class CascadeDecision:
+    """Outcome of the local tier of the scoring cascade."""
+
+    local: LocalMatchResult
+    verdict: str  # 'reject', 'strong' or 'ambiguous'
+    audit: bool = False  # Resolvable locally, but sampled for the LLM to keep calibration unbiased
+
+    @property
+    def escalate(self) -> bool:
+        """True if the LLM should score this pair."""
+        return self.verdict == "ambiguous" or self.audit
+
+@dataclass
+class CascadeReport:
+    """How the cascade would have behaved on logged (local, LLM) score pairs."""
+
+    samples: int
+    escalation_rate: float
+    agreement: float
+    reject_below: int
+    accept_above: int
+
+class ScoringCascade:
+    """Resolves clear rejects and clear matches locally and escalates only ambiguous pairs to the LLM."""
+
+    def __init__(self, matcher: Optional[LocalMatcher] = None, reject_below: Optional[int] = None,
+                 accept_above: Optional[int] = None, log_path: str = Config.CASCADE_LOG_PATH,
+                 thresholds_path: str = Config.CASCADE_THRESHOLDS_PATH):
+        """
+        Initialize the cascade.
+
+        Thresholds come from the arguments, else from the last calibration
+        saved at thresholds_path, else from Config.
+
+        Args:
+            matcher: Local matcher used for the first tier
+            reject_below: Local scores below this are resolved as rejects
+            accept_above: Local scores at or above this are resolved as strong matches
+            log_path: JSONL file where (local, LLM) score pairs are logged for calibration
+            thresholds_path: JSON file holding calibrated thresholds
+        """
+        self.matcher = matcher or LocalMatcher()
+        self.log_path = log_path
+        self.thresholds_path = thresholds_path
+
+        saved = self._load_thresholds()
+        self.reject_below = reject_below if reject_below is not None else saved.get("reject_below", Config.CASCADE_REJECT_BELOW)
+        self.accept_above = accept_above if accept_above is not None else saved.get("accept_above", Config.CASCADE_ACCEPT_ABOVE)
+
+    def decide(self, resume_text: str, job_description: str) -> CascadeDecision:
+        """
+        Score locally and decide whether the LLM is needed.
+
+        Args:
+            resume_text: Resume text
+            job_description: Job description text
+
+        Returns:
+            CascadeDecision: Local result and verdict
+        """
+        local = self.matcher.score(resume_text, job_description)
+        verdict = self.verdict(local.score, local.jd_skills)
+        audit = verdict != "ambiguous" and self.sampled_for_audit(resume_text, job_description)
+        return CascadeDecision(local=local, verdict=verdict, audit=audit)
+
+    @staticmethod
+    def sampled_for_audit(resume_text: str, job_description: str) -> bool:
+        """
+        Pick about Config.CASCADE_AUDIT_RATE of pairs for an LLM audit.
+
+        The choice is a hash of the inputs rather than a random draw, so a
+        prefetch and the click it anticipates make the same decision.
+        """
+        digest = hashlib.sha256(f"{resume_text}\0{job_description}".encode("utf-8", errors="replace")).digest()
+        return int.from_bytes(digest[:4], "big") < Config.CASCADE_AUDIT_RATE * 2 ** 32
+
+    def verdict(self, local_score: int, jd_skills: Optional[int] = None) -> str:
+        """
+        Classify a local score against the current thresholds.
+
+        Args:
+            local_score: Local tier score
+            jd_skills: Lexicon skills found in the job description; with fewer than
+                Config.CASCADE_MIN_JD_SKILLS the local score says too little to resolve anything
+
+        Returns:
+            str: 'reject', 'strong' or 'ambiguous'
+        """
+        if jd_skills is not None and jd_skills < Config.CASCADE_MIN_JD_SKILLS:
+            return "ambiguous"
+        if local_score < self.reject_below:
+            return "reject"
+        if local_score >= self.accept_above:
+            return "strong"
+        return "ambiguous"
+
+    def log_llm_score(self, local_score: int, llm_score: int, jd_skills: Optional[int] = None,
+                      audit: bool = False) -> None:
+        """
+        Record the LLM score of an escalated or audited pair for later calibration.
+
+        Args:
+            local_score: Local tier score
+            llm_score: Match percentage returned by the LLM
+            jd_skills: Lexicon skills found in the job description; pairs escalated only
+                because there were too few are not logged, as their local score means nothing
+            audit: The pair was resolvable locally and only sampled for an audit
+        """
+        if jd_skills is not None and jd_skills < Config.CASCADE_MIN_JD_SKILLS:
+            return
+        record = {"local": local_score, "llm": llm_score, "ts": time.time()}
+        if audit and Config.CASCADE_AUDIT_RATE > 0:
+            # Stands for all the locally resolved pairs it was sampled from
+            record["weight"] = round(1 / Config.CASCADE_AUDIT_RATE)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            with open(self.log_path, "a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not log cascade scores: {str(e)}")
+
+    def load_pairs(self) -> List[Tuple[int, int]]:
+        """Read logged (local, LLM) score pairs; audited pairs are repeated by their sampling weight."""
+        pairs = []
+        if not os.path.exists(self.log_path):
+            return pairs
+        with open(self.log_path, "r", encoding="utf-8") as handle:
+            for line in handle:
+                try:
+                    record = json.loads(line)
+                    pairs.extend([(int(record["local"]), int(record["llm"]))] * int(record.get("weight", 1)))
+                except (ValueError, KeyError, TypeError):
+                    continue
+        return pairs
+
+    @staticmethod
+    def agrees(verdict: str, llm_score: int) -> bool:
+        """True if the LLM score is consistent with a local verdict."""
+        if verdict == "reject":
+            return llm_score < Config.CASCADE_LLM_REJECT_SCORE
+        if verdict == "strong":
+            return llm_score >= Config.CASCADE_LLM_STRONG_SCORE
+        return True
+
+    def report(self, pairs: Optional[List[Tuple[int, int]]] = None) -> CascadeReport:
+        """
+        Evaluate the current thresholds on logged score pairs.
+
+        Args:
+            pairs: (local, LLM) score pairs (defaults to the logged pairs)
+
+        Returns:
+            CascadeReport: Escalation rate and agreement of locally resolved pairs with the LLM
+        """
+        pairs = self.load_pairs() if pairs is None else pairs
+        verdicts = [(self.verdict(local), llm) for local, llm in pairs]
+        resolved = [(verdict, llm) for verdict, llm in verdicts if verdict != "ambiguous"]
+        escalated = len(verdicts) - len(resolved)
+        agreeing = sum(self.agrees(verdict, llm) for verdict, llm in resolved)
+        return CascadeReport(
+            samples=len(pairs),
+            escalation_rate=escalated / len(pairs) if pairs else 1.0,
+            agreement=agreeing / len(resolved) if resolved else 1.0,
+            reject_below=self.reject_below,
+            accept_above=self.accept_above
+        )
+
+    def calibrate(self, pairs: Optional[List[Tuple[int, int]]] = None,
+                  target_agreement: float = Config.CASCADE_TARGET_AGREEMENT, save: bool = True) -> CascadeReport:
+        """
+        Pick the widest local bands whose decisions agree with the LLM at the target rate.
+
+        The reject threshold is raised while pairs scored below it are still
+        LLM rejects at least target_agreement of the time; the accept threshold
+        is lowered the same way for strong matches.
+
+        Args:
+            pairs: (local, LLM) score pairs (defaults to the logged pairs)
+            target_agreement: Required agreement rate for locally resolved pairs
+            save: Persist the thresholds for future cascades
+
+        Returns:
+            CascadeReport: Report for the calibrated thresholds
+        """
+        pairs = self.load_pairs() if pairs is None else pairs
+        if len(pairs) < Config.CASCADE_MIN_CALIBRATION_SAMPLES:
+            logger.warning(f"Only {len(pairs)} logged scores, keeping current cascade thresholds")
+            return self.report(pairs)
+
+        # Candidate thresholds are the observed local scores, so bands end at real data points
+        candidates = sorted({local for local, _ in pairs} | {101})
+
+        reject_below = 0
+        for threshold in candidates:
+            below = [llm for local, llm in pairs if local < threshold]
+            if below and sum(llm < Config.CASCADE_LLM_REJECT_SCORE for llm in below) / len(below) >= target_agreement:
+                reject_below = threshold
+
+        accept_above = 101
+        for threshold in reversed(candidates):
+            if threshold <= reject_below:
+                break
+            above = [llm for local, llm in pairs if local >= threshold]
+            if above and sum(llm >= Config.CASCADE_LLM_STRONG_SCORE for llm in above) / len(above) >= target_agreement:
+                accept_above = threshold
+
+        self.reject_below, self.accept_above = reject_below, accept_above
+        if save:
+            self._save_thresholds()
+
+        report = self.report(pairs)
+        logger.info(
+            f"Calibrated cascade on {report.samples} samples: reject < {reject_below}, accept >= {accept_above}, "
+            f"escalation {report.escalation_rate:.0%}, agreement {report.agreement:.0%}"
+        )
+        return report
+
+    def _load_thresholds(self) -> Dict[str, int]:
+        try:
+            with open(self.thresholds_path, "r", encoding="utf-8") as handle:
+                return json.load(handle)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_thresholds(self) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(self.thresholds_path)), exist_ok=True)
+        with open(self.thresholds_path, "w", encoding="utf-8") as handle:
+            json.dump({"reject_below": self.reject_below, "accept_above": self.accept_above}, handle)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Evaluate or calibrate the scoring cascade on logged LLM scores.")
+    parser.add_argument("command", choices=("report", "calibrate"),
+                        help="'report' evaluates the current thresholds, 'calibrate' fits and saves new ones")
+    parser.add_argument("--log", default=Config.CASCADE_LOG_PATH, help="JSONL file of logged score pairs")
+    parser.add_argument("--thresholds", default=Config.CASCADE_THRESHOLDS_PATH, help="Calibrated thresholds file")
+    parser.add_argument("--target-agreement", type=float, default=Config.CASCADE_TARGET_AGREEMENT)
+    parser.add_argument("--dry-run", action="store_true", help="Calibrate without saving the thresholds")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    cascade = ScoringCascade(log_path=args.log, thresholds_path=args.thresholds)
+    if args.command == "calibrate":
+        report = cascade.calibrate(target_agreement=args.target_agreement, save=not args.dry_run)
+    else:
+        report = cascade.report()
+    print(json.dumps(asdict(report)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Memory accounting for the Technical ATS Resume Expert application.
+
+Every session keeps its results (preview images, charts, response text) in
+memory, and process-wide caches (parsed profiles, page digests, text previews,
+shared results) hold more. MemoryAccountant tracks all of them against a
+per-process budget. When the budget is exceeded it first downgrades large
+session artifacts (previews become thumbnails) and then evicts the least
+recently used entries of the largest caches, so memory use grows predictably
+with session count.
+"""
+import io
+import os
+import sys
+import logging
+import threading
+import weakref
+from typing import Any, Dict, List, Optional
+from PIL import Image
+from src.cache import LRUCache
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+class MemoryAccountant:
+    """Process-wide accounting of memory held by session result caches."""
+
+    _instance: Optional["MemoryAccountant"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self, process_budget: int = Config.PROCESS_MEMORY_BUDGET):
+        """
+        Initialize the accountant.
+
+        Args:
+            process_budget: Total bytes all sessions may hold before downgrading and eviction start
+        """
+        self.process_budget = process_budget
+        # Session caches disappear with their session, so they are only weakly referenced
+        self._sessions: "weakref.WeakValueDictionary[str, LRUCache]" = weakref.WeakValueDictionary()
+        self._shared: Dict[str, LRUCache] = {}  # Process-wide caches, alive as long as the process
+        self._lock = threading.RLock()
+        self.downgrades = 0
+        self.evictions = 0
+
+    @classmethod
+    def get(cls) -> "MemoryAccountant":
+        """Return the process-wide accountant."""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    @staticmethod
+    def estimate_size(obj: Any) -> int:
+        """
+        Estimate the memory held by an artifact.
+
+        Args:
+            obj: Bytes, text, PIL image, object with a size_bytes attribute, or anything else
+
+        Returns:
+            int: Approximate size in bytes
+        """
+        if obj is None:
+            return 0
+        if isinstance(obj, (bytes, bytearray, memoryview)):
+            return len(obj)
+        if isinstance(obj, str):
+            return len(obj.encode("utf-8"))
+        if isinstance(obj, Image.Image):
+            return obj.width * obj.height * len(obj.getbands())
+        if hasattr(obj, "size_bytes"):
+            return int(obj.size_bytes)
+        return sys.getsizeof(obj)
+
+    @staticmethod
+    def process_rss() -> int:
+        """Current resident set size of the process in bytes (0 if unavailable)."""
+        try:
+            with open("/proc/self/statm", "r") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            pass
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is KB on Linux and bytes on macOS; this is the peak, not current usage
+            return peak if sys.platform == "darwin" else peak * 1024
+        except (ImportError, OSError):
+            return 0
+
+    def register(self, session_id: str, cache: LRUCache) -> None:
+        """
+        Track a session's result cache.
+
+        Args:
+            session_id: Streamlit session id
+            cache: The session's result cache
+        """
+        with self._lock:
+            self._sessions[session_id] = cache
+
+    def register_shared(self, name: str, cache: LRUCache) -> None:
+        """
+        Track a process-wide cache, which counts toward the budget and may be evicted from.
+
+        Args:
+            name: Cache name, for statistics
+            cache: Size-bounded cache (its total_bytes is only tracked when it has max_bytes)
+        """
+        with self._lock:
+            self._shared[name] = cache
+
+    def total_bytes(self) -> int:
+        """Bytes held by all live sessions and shared caches."""
+        with self._lock:
+            return sum(cache.total_bytes for cache in self._caches())
+
+    def stats(self) -> Dict[str, int]:
+        """Return per-process memory statistics."""
+        with self._lock:
+            sessions = {session_id: cache.total_bytes for session_id, cache in list(self._sessions.items())}
+            shared = {name: cache.total_bytes for name, cache in self._shared.items()}
+        return {
+            "sessions": len(sessions),
+            "session_bytes": sum(sessions.values()),
+            "largest_session_bytes": max(sessions.values(), default=0),
+            "shared_bytes": sum(shared.values()),
+            **{f"shared_{name}_bytes": size for name, size in shared.items()},
+            "process_budget": self.process_budget,
+            "rss": self.process_rss(),
+            "downgrades": self.downgrades,
+            "evictions": self.evictions
+        }
+
+    def enforce(self) -> None:
+        """Bring total session memory under the process budget."""
+        with self._lock:
+            if self.total_bytes() <= self.process_budget:
+                return
+
+            # Cheapest first: shrink session previews, which are kept at render resolution
+            for cache in self._largest_first(list(self._sessions.values())):
+                for key, result in cache.items():
+                    if self.total_bytes() <= self.process_budget:
+                        return
+                    if self.downgrade(result):
+                        cache.replace(key, result)  # Update the size accounting without touching recency
+
+            # Then drop least recently used entries from the largest session or shared cache
+            while self.total_bytes() > self.process_budget:
+                caches = self._largest_first(self._caches())
+                if not caches or not len(caches[0]):
+                    break
+                caches[0].pop_oldest()
+                self.evictions += 1
+
+            logger.warning(
+                f"Session memory over budget; now {self.total_bytes() / (1024 * 1024):.1f}MB "
+                f"({self.downgrades} downgrades, {self.evictions} evictions so far)"
+            )
+
+    def downgrade(self, result: Any) -> bool:
+        """
+        Replace a result's preview with a thumbnail.
+
+        Args:
+            result: AnalysisResult
+
+        Returns:
+            bool: True if the result got smaller
+        """
+        preview = getattr(result, "preview_jpeg", None)
+        if not preview or getattr(result, "downgraded", False):
+            return False
+
+        try:
+            with Image.open(io.BytesIO(preview)) as image:
+                image.thumbnail((Config.PREVIEW_THUMBNAIL_WIDTH, Config.PREVIEW_THUMBNAIL_WIDTH * 2))
+                buffer = io.BytesIO()
+                image.convert("RGB").save(buffer, format="JPEG", quality=70)
+        except Exception as e:
+            logger.error(f"Could not downgrade preview: {str(e)}")
+            return False
+
+        result.downgraded = True
+        if len(buffer.getvalue()) >= len(preview):
+            return False
+
+        result.preview_jpeg = buffer.getvalue()
+        self.downgrades += 1
+        return True
+
+    def _caches(self) -> List[LRUCache]:
+        return list(self._sessions.values()) + list(self._shared.values())
+
+    @staticmethod
+    def _largest_first(caches: List[LRUCache]) -> List[LRUCache]:
+        return sorted(caches, key=lambda cache: cache.total_bytes, reverse=True)
@@ -0,0 +1,297 @@
+"""
+On-demand request profiling for the Technical ATS Resume Expert application.
+
+A profile is captured for a request when profiling is forced through the
+environment, requested with the admin query parameter, or the request is
+picked by the sample rate. A background thread samples the stacks of the
+handler thread and of every pool thread working for the same request at a
+fixed interval, which keeps overhead bounded and independent of how much
+Python code runs. Work handed to executors carries the request's tag in a
+context variable (RequestTag.propagate), so those threads can be found. Stacks are written in the collapsed format read by
+flamegraph.pl, speedscope and similar tools, next to a JSON metadata file.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import hmac
+import logging
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Set, TypeVar
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class RequestTag:
+    """Tags the threads doing work for a request, including pool threads it hands work to."""
+
+    _current: ContextVar[Optional[str]] = ContextVar("request_tag", default=None)
+    _threads: Dict[int, str] = {}  # Thread ident -> tag of the work it is running
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> Optional[str]:
+        """Return the tag of the current context, or None."""
+        return cls._current.get()
+
+    @classmethod
+    def set(cls, tag: Optional[str]):
+        """
+        Tag the current context, e.g. with the session so its speculative work is sampled too.
+
+        Args:
+            tag: Request tag
+
+        Returns:
+            Token restoring the previous tag with reset()
+        """
+        return cls._current.set(tag)
+
+    @classmethod
+    def reset(cls, token) -> None:
+        """Restore the tag replaced by set()."""
+        cls._current.reset(token)
+
+    @classmethod
+    def propagate(cls, fn: Callable[..., T]) -> Callable[..., T]:
+        """
+        Wrap a callable handed to an executor so it runs under the submitter's tag.
+
+        Args:
+            fn: Callable to run on a pool thread
+
+        Returns:
+            Callable[..., T]: Wrapper tagging the running thread for the duration of the call
+        """
+        tag = cls._current.get()
+        if tag is None:
+            return fn
+
+        def run(*args, **kwargs) -> T:
+            token = cls._current.set(tag)
+            thread_id = threading.get_ident()
+            with cls._lock:
+                previous = cls._threads.get(thread_id)
+                cls._threads[thread_id] = tag
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with cls._lock:
+                    if previous is None:
+                        cls._threads.pop(thread_id, None)
+                    else:
+                        cls._threads[thread_id] = previous
+                cls._current.reset(token)
+        return run
+
+    @classmethod
+    def threads(cls, tag: Optional[str]) -> Set[int]:
+        """Idents of the threads currently running work with this tag."""
+        if tag is None:
+            return set()
+        with cls._lock:
+            return {thread_id for thread_id, thread_tag in cls._threads.items() if thread_tag == tag}
+
+class SamplingProfiler:
+    """Statistical profiler that periodically samples the call stacks of a request's threads."""
+
+    def __init__(self, thread_id: Optional[int] = None, interval: float = Config.PROFILE_INTERVAL,
+                 max_seconds: float = Config.PROFILE_MAX_SECONDS, tag: Optional[str] = None):
+        """
+        Initialize the profiler.
+
+        Args:
+            thread_id: Handler thread to sample (defaults to the calling thread)
+            interval: Seconds between samples
+            max_seconds: Sampling stops after this long, bounding the cost of a runaway request
+            tag: Request tag; pool threads running work with this tag are sampled too
+        """
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.tag = tag
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.started_at = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread."""
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.monotonic() - self.started_at
+
+    def collapsed(self) -> str:
+        """Return samples in collapsed stack format ('frame;frame;frame count' per line)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def _run(self) -> None:
+        deadline = self.started_at + self.max_seconds
+        while not self._stop.wait(self.interval):
+            if time.monotonic() > deadline:
+                logger.warning(f"Profiling stopped after {self.max_seconds:.0f}s limit")
+                break
+            frames = sys._current_frames()
+            if self.thread_id not in frames:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id in {self.thread_id} | RequestTag.threads(self.tag):
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    # The thread name is the root frame, so each thread gets its own subtree
+                    thread_name = names.get(thread_id, str(thread_id)).replace(";", ",").replace(" ", "_")
+                    self.stacks[f"thread:{thread_name};{self._format_stack(frame)}"] += 1
+            self.samples += 1
+
+    @staticmethod
+    def _format_stack(frame) -> str:
+        """Render a frame chain root-first as 'module:function' entries."""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            module = os.path.splitext(os.path.basename(code.co_filename))[0]
+            names.append(f"{module}:{code.co_name}".replace(";", ",").replace(" ", "_"))
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+class RequestProfiler:
+    """Decides whether to profile a request and stores the resulting profile."""
+
+    def __init__(self, name: str, metadata: Optional[Dict[str, Any]] = None, admin_token: Optional[str] = None,
+                 output_dir: str = Config.PROFILE_DIR):
+        """
+        Initialize the profiler for one request.
+
+        Args:
+            name: Handler name, used in file names
+            metadata: Request details stored next to the profile (no resume or JD content)
+            admin_token: Token from the admin query parameter, if present
+            output_dir: Directory the profiles are written to
+        """
+        self.name = name
+        self.metadata = dict(metadata or {})
+        self.output_dir = output_dir
+        self.trigger = self._trigger(admin_token)
+        self.profile_path: Optional[str] = None
+        self._sampler: Optional[SamplingProfiler] = None
+        self._tag_token = None
+
+    @staticmethod
+    def _trigger(admin_token: Optional[str]) -> Optional[str]:
+        """Return why this request is profiled ('env', 'admin', 'sampled'), or None."""
+        if Config.PROFILE_ENABLED:
+            return "env"
+        if admin_token and Config.PROFILE_ADMIN_TOKEN and hmac.compare_digest(
+            admin_token.encode("utf-8"), Config.PROFILE_ADMIN_TOKEN.encode("utf-8")
+        ):
+            return "admin"
+        if Config.PROFILE_SAMPLE_RATE > 0 and random.random() < Config.PROFILE_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    @property
+    def enabled(self) -> bool:
+        """True if this request is being profiled."""
+        return self.trigger is not None
+
+    def __enter__(self) -> "RequestProfiler":
+        if self.enabled:
+            tag = RequestTag.get()
+            if tag is None:
+                # Untagged caller: tag the request itself so the work it hands to executors is sampled
+                tag = uuid.uuid4().hex
+                self._tag_token = RequestTag.set(tag)
+            self._sampler = SamplingProfiler(tag=tag)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._sampler is None:
+            return
+        self._sampler.stop()
+        if self._tag_token is not None:
+            RequestTag.reset(self._tag_token)
+            self._tag_token = None
+        if exc_type is not None:
+            self.metadata["error"] = exc_type.__name__
+        try:
+            self._save()
+        except Exception as e:
+            # Profiling must never break the request it observes
+            logger.error(f"Error saving profile: {str(e)}")
+
+    def _save(self) -> None:
+        """Write the collapsed stacks and metadata, then apply retention."""
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{self.name}-{uuid.uuid4().hex[:8]}"
+        self.profile_path = os.path.join(self.output_dir, f"{profile_id}.folded")
+
+        with open(self.profile_path, "w", encoding="utf-8") as handle:
+            handle.write(self._sampler.collapsed())
+
+        metadata = {
+            "id": profile_id,
+            "handler": self.name,
+            "trigger": self.trigger,
+            "started_at": time.time() - self._sampler.duration,
+            "duration": round(self._sampler.duration, 4),
+            "samples": self._sampler.samples,
+            "interval": self._sampler.interval,
+            "pid": os.getpid(),
+            **self.metadata
+        }
+        with open(os.path.join(self.output_dir, f"{profile_id}.json"), "w", encoding="utf-8") as handle:
+            json.dump(metadata, handle, indent=2)
+
+        logger.info(
+            f"Saved {self.trigger} profile of {self.name} ({self._sampler.samples} samples, "
+            f"{self._sampler.duration:.2f}s) to {self.profile_path}"
+        )
+        self.prune(self.output_dir)
+
+    @staticmethod
+    def prune(output_dir: str, max_files: int = Config.PROFILE_MAX_FILES,
+              max_age_days: float = Config.PROFILE_MAX_AGE_DAYS) -> int:
+        """
+        Delete profiles beyond the retention limits.
+
+        Args:
+            output_dir: Profile directory
+            max_files: Number of most recent profiles kept
+            max_age_days: Profiles older than this are deleted
+
+        Returns:
+            int: Number of profiles deleted
+        """
+        profiles = sorted(
+            (entry for entry in os.scandir(output_dir) if entry.name.endswith(".folded")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        cutoff = time.time() - max_age_days * 86400
+        deleted = 0
+        for index, entry in enumerate(profiles):
+            if index < max_files and entry.stat().st_mtime >= cutoff:
+                continue
+            for path in (entry.path, entry.path[:-len(".folded")] + ".json"):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            deleted += 1
+        return deleted
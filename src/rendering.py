@@ -0,0 +1,241 @@
+"""
+Process-pool PDF rasterization for bulk resume processing.
+
+Rendering a page with PyMuPDF and encoding it as JPEG is CPU-bound and holds
+the GIL for most of its run time, so threads cannot use more than one core.
+RenderEngine fans the work out to a pool of worker processes instead. Workers
+read their input straight from disk and write the encoded image to a file in
+the output directory, so only small result records cross process boundaries.
+Workers are recycled periodically to cap memory leaked by native code.
+"""
+import os
+import sys
+import mmap
+import time
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+# ProcessPoolExecutor recycles its own workers from Python 3.11; before that the whole pool is replaced
+_NATIVE_RECYCLING = sys.version_info >= (3, 11)
+
+@dataclass
+class RenderResult:
+    """Outcome of rendering one PDF."""
+
+    index: int
+    source_path: str
+    image_path: Optional[str] = None
+    content_hash: Optional[str] = None
+    page_count: int = 0
+    width: int = 0
+    height: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        """True if the PDF was rendered successfully."""
+        return self.error is None
+
+def _render_file(index: int, source_path: str, output_dir: str, zoom: float, jpeg_quality: int) -> RenderResult:
+    """
+    Render the first page of a PDF on disk to a JPEG file (runs in a worker process).
+
+    The input is memory-mapped for hashing and header checks, then handed to
+    MuPDF by path so the document is never copied into Python memory. The
+    document is checked against the same limits as uploads before rendering.
+    """
+    import fitz  # PyMuPDF, imported in the worker
+    from src.utils import PDFProcessor
+
+    started = time.perf_counter()
+    result = RenderResult(index=index, source_path=source_path)
+
+    try:
+        with open(source_path, "rb") as source:
+            size = os.fstat(source.fileno()).st_size
+            if size == 0:
+                raise ValueError("file is empty")
+            if size > Config.MAX_FILE_SIZE:
+                raise ValueError(f"file exceeds {Config.MAX_FILE_SIZE} bytes")
+
+            with mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if mapped.find(b"%PDF-", 0, 1024) < 0:
+                    raise ValueError("not a PDF file")
+                result.content_hash = hashlib.sha256(mapped).hexdigest()
+
+        with fitz.open(source_path, filetype="pdf") as pdf_doc:
+            result.page_count = PDFProcessor.check_document(pdf_doc)
+
+            first_page = pdf_doc[0]
+            if first_page.rect.width * first_page.rect.height * zoom * zoom > Config.MAX_PAGE_PIXELS:
+                raise ValueError("first page is too large to render")
+
+            pixmap = first_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            result.width, result.height = pixmap.width, pixmap.height
+
+            # Content-addressed output name: re-rendering a duplicate overwrites the same file
+            image_path = os.path.join(output_dir, f"{result.content_hash}.jpg")
+            tmp_path = f"{image_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as output:
+                output.write(pixmap.tobytes("jpeg", jpg_quality=jpeg_quality))
+            os.replace(tmp_path, image_path)
+            result.image_path = image_path
+
+    except Exception as e:
+        result.error = f"{type(e).__name__}: {str(e)}"
+
+    result.elapsed = time.perf_counter() - started
+    return result
+
+class RenderEngine:
+    """Renders many PDFs in parallel across worker processes."""
+
+    def __init__(self, max_workers: Optional[int] = None, output_dir: Optional[str] = None,
+                 zoom: float = Config.PDF_RENDER_ZOOM, jpeg_quality: int = Config.RENDER_JPEG_QUALITY):
+        """
+        Initialize the render engine.
+
+        Args:
+            max_workers: Number of worker processes (defaults to Config.RENDER_WORKERS or the CPU count)
+            output_dir: Directory for rendered JPEG files (defaults to a new temporary directory)
+            zoom: Render scale factor
+            jpeg_quality: JPEG quality (1-100)
+        """
+        self.max_workers = max_workers or Config.RENDER_WORKERS or os.cpu_count() or 1
+        self.output_dir = output_dir or tempfile.mkdtemp(prefix="ats_render_")
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.zoom = zoom
+        self.jpeg_quality = jpeg_quality
+        self._context = multiprocessing.get_context(Config.RENDER_START_METHOD)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._submitted = 0  # Tasks sent to the current pool
+        self.crashes = 0
+
+    def __enter__(self) -> "RenderEngine":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Shut down the worker pool."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def render_files(self, paths: Iterable[str], ordered: bool = True) -> Iterator[RenderResult]:
+        """
+        Render the first page of each PDF.
+
+        Args:
+            paths: PDF file paths
+            ordered: Yield results in input order (True) or as soon as each completes (False)
+
+        Returns:
+            Iterator[RenderResult]: One result per input path; failures carry an error message
+        """
+        results = self._run_pool(deque(enumerate(paths)))
+        if not ordered:
+            yield from results
+            return
+
+        # Reorder with a buffer that only holds results that finished early
+        next_index = 0
+        buffered: Dict[int, RenderResult] = {}
+        for result in results:
+            buffered[result.index] = result
+            while next_index in buffered:
+                yield buffered.pop(next_index)
+                next_index += 1
+        for index in sorted(buffered):
+            yield buffered[index]
+
+    def _submit(self, executor: ProcessPoolExecutor, index: int, path: str):
+        return executor.submit(_render_file, index, str(path), self.output_dir, self.zoom, self.jpeg_quality)
+
+    def _new_executor(self, max_workers: int) -> ProcessPoolExecutor:
+        options = {}
+        if _NATIVE_RECYCLING and Config.RENDER_MAX_TASKS_PER_CHILD > 0:
+            options["max_tasks_per_child"] = Config.RENDER_MAX_TASKS_PER_CHILD
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=self._context, **options)
+
+    def _pool_exhausted(self) -> bool:
+        """True when the current pool has run its share of tasks and should be replaced (before Python 3.11)."""
+        if _NATIVE_RECYCLING or Config.RENDER_MAX_TASKS_PER_CHILD <= 0:
+            return False
+        return self._submitted >= self.max_workers * Config.RENDER_MAX_TASKS_PER_CHILD
+
+    def _run_pool(self, queue: Deque[Tuple[int, str]]) -> Iterator[RenderResult]:
+        """Run tasks on the shared pool, keeping a bounded number in flight."""
+        window = self.max_workers * 4
+        in_flight: Dict = {}
+        suspects: List[Tuple[int, str]] = []
+
+        while queue or in_flight:
+            if self._executor is not None and not in_flight and self._pool_exhausted():
+                # Drained; replacing the pool now recycles every worker without losing tasks
+                logger.info(f"Recycling render pool after {self._submitted} tasks")
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+            if self._executor is None:
+                self._executor = self._new_executor(self.max_workers)
+                self._submitted = 0
+
+            while queue and len(in_flight) < window and not self._pool_exhausted():
+                index, path = queue.popleft()
+                in_flight[self._submit(self._executor, index, path)] = (index, path)
+                self._submitted += 1
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken = False
+            for future in done:
+                index, path = in_flight.pop(future)
+                try:
+                    yield future.result()
+                except BrokenProcessPool:
+                    broken = True
+                    suspects.append((index, path))
+
+            if broken:
+                # A worker died (e.g. MuPDF crashed on a malformed file). Every task that
+                # was in flight is a suspect; retry them in isolation to find the culprit.
+                self.crashes += 1
+                suspects.extend(in_flight.values())
+                in_flight.clear()
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+                logger.warning(f"Render worker crashed; isolating {len(suspects)} in-flight tasks")
+                yield from self._run_isolated(suspects)
+                suspects = []
+
+    def _run_isolated(self, tasks: List[Tuple[int, str]]) -> Iterator[RenderResult]:
+        """Run each task in its own single-worker process so a crash only affects that task."""
+        for batch_start in range(0, len(tasks), self.max_workers):
+            batch = tasks[batch_start:batch_start + self.max_workers]
+            executors = [self._new_executor(1) for _ in batch]
+            try:
+                futures = [
+                    (self._submit(executor, index, path), index, path)
+                    for executor, (index, path) in zip(executors, batch)
+                ]
+                for future, index, path in futures:
+                    try:
+                        yield future.result()
+                    except BrokenProcessPool:
+                        logger.error(f"Render worker crashed on {path}")
+                        yield RenderResult(index=index, source_path=str(path), error="Worker crashed while rendering")
+            finally:
+                for executor in executors:
+                    executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,328 @@
+"""
+Latency and failure handling for calls to the Gemini API.
+
+Provides deadlines, hedged requests (a duplicate request is sent when the
+first one is slower than the recent p95, and whichever answers first wins),
+a circuit breaker that fails fast while the service is erroring, and
+single-flight coalescing of identical concurrent requests.
+"""
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, Optional, Tuple, TypeVar
+from src.config import Config
+from src.profiling import RequestTag
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not complete within its deadline."""
+
+class LatencyTracker:
+    """Rolling window of call latencies used to pick the hedging delay."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        """
+        Initialize the tracker.
+
+        Args:
+            window: Number of recent latencies kept
+            min_samples: Samples needed before percentiles are trusted
+        """
+        self.min_samples = min_samples
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of a successful call."""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """
+        Return a latency percentile, or None until enough samples are collected.
+
+        Args:
+            pct: Percentile (0-100)
+
+        Returns:
+            Optional[float]: Latency in seconds
+        """
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+class CircuitBreaker:
+    """Opens after the recent failure rate crosses a threshold, then probes for recovery."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_rate: float = Config.BREAKER_FAILURE_RATE, window: int = Config.BREAKER_WINDOW,
+                 min_calls: int = Config.BREAKER_MIN_CALLS, open_seconds: float = Config.BREAKER_OPEN_SECONDS):
+        """
+        Initialize the breaker.
+
+        Args:
+            failure_rate: Failure ratio over the window that opens the circuit
+            window: Number of recent call outcomes considered
+            min_calls: Minimum calls in the window before the breaker can open
+            open_seconds: How long to fail fast before letting a probe call through
+        """
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the cool-down has passed."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self._state = self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Return True if a call may proceed (a single probe is allowed while half-open)."""
+        state = self.state
+        with self._lock:
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        """Record a successful call; a successful probe closes the circuit."""
+        with self._lock:
+            self._outcomes.append(True)
+            if self._state == self.HALF_OPEN:
+                logger.info("Circuit breaker closed after successful probe")
+                self._state = self.CLOSED
+                self._outcomes.clear()
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call; opens the circuit if the failure rate is too high."""
+        with self._lock:
+            self._outcomes.append(False)
+            self._probe_in_flight = False
+
+            if self._state == self.HALF_OPEN:
+                self._open()
+                return
+
+            failures = self._outcomes.count(False)
+            if (self._state == self.CLOSED and len(self._outcomes) >= self.min_calls
+                    and failures / len(self._outcomes) >= self.failure_rate):
+                self._open()
+
+    def _open(self) -> None:
+        logger.warning(f"Circuit breaker opened for {self.open_seconds:.0f}s")
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+
+class HedgedCaller:
+    """Runs calls with a deadline, sending a hedge request when the first one is slow."""
+
+    def __init__(self, executor: ThreadPoolExecutor, tracker: Optional[LatencyTracker] = None,
+                 percentile: float = Config.HEDGE_PERCENTILE, min_delay: float = Config.HEDGE_MIN_DELAY,
+                 max_delay: float = Config.HEDGE_MAX_DELAY, max_hedge_ratio: float = Config.HEDGE_MAX_RATIO,
+                 enabled: bool = Config.HEDGE_ENABLED):
+        """
+        Initialize the caller.
+
+        Args:
+            executor: Thread pool the requests run on
+            tracker: Latency tracker used to derive the hedge delay
+            percentile: Latency percentile after which a hedge is sent
+            min_delay: Lower bound for the hedge delay in seconds
+            max_delay: Upper bound (and initial value) for the hedge delay in seconds
+            max_hedge_ratio: Maximum fraction of calls that may be hedged, so hedging cannot double load
+            enabled: Whether hedging is enabled at all
+        """
+        self.executor = executor
+        self.tracker = tracker or LatencyTracker()
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> float:
+        """Current hedge delay: the tracked percentile latency, clamped to [min_delay, max_delay]."""
+        observed = self.tracker.percentile(self.percentile)
+        if observed is None:
+            return self.max_delay
+        return max(self.min_delay, min(self.max_delay, observed))
+
+    def stats(self) -> Dict[str, float]:
+        """Return hedging statistics."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "hedge_delay": self.hedge_delay()
+            }
+
+    def call(self, fn: Callable[[], T], deadline: float, hedge: bool = True) -> T:
+        """
+        Run fn, returning the first successful result within the deadline.
+
+        Args:
+            fn: Zero-argument callable performing the request
+            deadline: Total time budget in seconds
+            hedge: Allow a hedge request for this call
+
+        Returns:
+            T: Result of whichever attempt succeeded first
+
+        Raises:
+            DeadlineExceeded: If no attempt finished in time
+            Exception: The error of the last attempt if all attempts failed
+        """
+        started = time.monotonic()
+        with self._lock:
+            self.calls += 1
+
+        # Attempts run under the caller's request tag so a profiled request samples them
+        fn = RequestTag.propagate(fn)
+        primary = self.executor.submit(fn)
+        attempts = [primary]
+
+        delay = self.hedge_delay()
+        if hedge and self.enabled and delay < deadline:
+            done, _ = wait(attempts, timeout=delay)
+            if not done and self._may_hedge():
+                logger.info(f"Request slower than {delay:.1f}s, sending hedge request")
+                attempts.append(self.executor.submit(fn))
+
+        pending = set(attempts)
+        last_error: Optional[BaseException] = None
+        while pending:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    self._finish(attempts, future, time.monotonic() - started)
+                    return future.result()
+                last_error = error
+
+        for future in attempts:
+            future.cancel()
+        if pending or last_error is None:
+            raise DeadlineExceeded(f"No response within {deadline:.0f}s")
+        raise last_error
+
+    def _may_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.max_hedge_ratio * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _finish(self, attempts, winner: Future, elapsed: float) -> None:
+        """Record the winner and cancel the losing attempt if it has not started yet."""
+        self.tracker.record(elapsed)
+        if len(attempts) > 1 and winner is attempts[1]:
+            with self._lock:
+                self.hedge_wins += 1
+        for future in attempts:
+            if future is not winner:
+                # A running request cannot be interrupted; its own timeout bounds it
+                future.cancel()
+
+class _Flight:
+    """A call in progress that other callers can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution."""
+
+    def __init__(self):
+        """Initialize an empty set of in-flight calls."""
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Run fn unless a call with the same key is already in flight, in which case wait for it.
+
+        Args:
+            key: Identity of the call (e.g. a content hash of the request)
+            fn: Zero-argument callable performing the call
+
+        Returns:
+            Tuple[T, bool]: The result, and True if it was shared from another caller's execution
+
+        Raises:
+            Exception: Whatever the shared execution raised
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executions += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            # Later callers start a fresh call; results are not cached here
+            with self._lock:
+                self._flights.pop(key, None)
+            if flight.waiters:
+                logger.info(f"Shared one in-flight request with {flight.waiters} concurrent callers")
+            flight.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Return coalescing statistics."""
+        with self._lock:
+            return {
+                "executions": self.executions,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights)
+            }
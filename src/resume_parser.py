@@ -0,0 +1,539 @@
+"""
+Layout-aware resume parsing for the Technical ATS Resume Expert application.
+
+Splits a resume into its sections (Summary, Experience, Skills, Education,
+Certifications) using PyMuPDF text blocks and font metadata, so that local
+scorers and prompts can work on the relevant parts of a resume instead of a
+rendered page image. Parsed profiles are cached per content hash.
+"""
+import re
+import json
+import zlib
+import logging
+import bisect
+import statistics
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import fitz  # PyMuPDF
+from src.cache import ContentHasher, LRUCache
+from src.config import Config
+from src.memory import MemoryAccountant
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class TextLine:
+    """A single line of resume text with the layout hints used for parsing."""
+
+    text: str
+    size: float = 0.0
+    bold: bool = False
+    page: int = 0
+
+@dataclass
+class ExperienceEntry:
+    """A dated entry within a section (a job, a degree, a certification)."""
+
+    title: str
+    dates: str = ""
+    start_year: Optional[int] = None
+    end_year: Optional[int] = None
+    lines: List[str] = field(default_factory=list)
+
+    @property
+    def sort_year(self) -> int:
+        """Year used to order entries by recency."""
+        return self.end_year or self.start_year or 0
+
+@dataclass
+class ResumeSection:
+    """A resume section with its raw lines and any dated entries."""
+
+    name: str
+    lines: List[str] = field(default_factory=list)
+    entries: List[ExperienceEntry] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        """Section body as plain text."""
+        return "\n".join(self.lines)
+
+@dataclass
+class ResumeProfile:
+    """Structured view of a resume."""
+
+    content_hash: str
+    sections: Dict[str, ResumeSection] = field(default_factory=dict)
+    page_count: int = 0
+
+    @property
+    def skills(self) -> List[str]:
+        """Individual skills listed in the Skills section."""
+        section = self.sections.get("skills")
+        if not section:
+            return []
+
+        skills = []
+        for line in section.lines:
+            # "Languages: Python, Go" -> "Python, Go"
+            line = line.split(":", 1)[1] if ":" in line and len(line.split(":", 1)[0].split()) <= 3 else line
+            for item in re.split(r"[,;|•·/]|\s{2,}", line):
+                item = item.strip(" -*\t")
+                if item and len(item) <= 40:
+                    skills.append(item)
+        return skills
+
+    def recent_experience(self, limit: int = 3) -> List[ExperienceEntry]:
+        """
+        Return the most recent experience entries.
+
+        Args:
+            limit: Maximum number of entries
+
+        Returns:
+            List[ExperienceEntry]: Entries ordered from most to least recent
+        """
+        section = self.sections.get("experience")
+        if not section:
+            return []
+        return sorted(section.entries, key=lambda entry: entry.sort_year, reverse=True)[:limit]
+
+    def select_text(self, sections: Sequence[str] = ("skills", "experience"), max_experience_entries: int = 3) -> str:
+        """
+        Build a compact text view containing only the requested sections.
+
+        Args:
+            sections: Section names to include, in output order
+            max_experience_entries: Number of most recent experience entries to keep
+
+        Returns:
+            str: Plain text suitable for local scoring or prompt input
+        """
+        parts = []
+        for name in sections:
+            section = self.sections.get(name)
+            if not section:
+                continue
+
+            if name == "experience" and section.entries:
+                body = []
+                for entry in self.recent_experience(max_experience_entries):
+                    header = f"{entry.title} ({entry.dates})" if entry.dates else entry.title
+                    body.append("\n".join([header] + entry.lines))
+                text = "\n\n".join(body)
+            else:
+                text = section.text
+
+            if text:
+                parts.append(f"{name.upper()}\n{text}")
+        return "\n\n".join(parts)
+
+    def prompt_text(self, prompt_type: str) -> str:
+        """
+        Resume text to send with a prompt.
+
+        Matching only needs Skills and recent Experience; other prompts review the
+        whole resume. A resume without those sections is sent in full.
+
+        Args:
+            prompt_type: Prompt type ('analysis', 'improvement', 'matching')
+
+        Returns:
+            str: Resume text for the prompt
+        """
+        selected = self.select_text() if prompt_type == "matching" else ""
+        return selected or self.full_text
+
+    @property
+    def full_text(self) -> str:
+        """All parsed text, section by section."""
+        return "\n\n".join(
+            f"{name.upper()}\n{section.text}" for name, section in self.sections.items() if section.lines
+        )
+
+    def to_compact(self) -> bytes:
+        """
+        Serialize the profile into a compact, zlib-compressed representation.
+
+        Returns:
+            bytes: Compressed JSON
+        """
+        payload = {
+            "h": self.content_hash,
+            "p": self.page_count,
+            "s": {
+                name: [
+                    section.lines,
+                    [[e.title, e.dates, e.start_year, e.end_year, e.lines] for e in section.entries]
+                ]
+                for name, section in self.sections.items()
+            }
+        }
+        return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def from_compact(cls, data: bytes) -> "ResumeProfile":
+        """
+        Restore a profile serialized with to_compact().
+
+        Args:
+            data: Compressed profile
+
+        Returns:
+            ResumeProfile: Restored profile
+        """
+        payload = json.loads(zlib.decompress(data).decode("utf-8"))
+        sections = {
+            name: ResumeSection(
+                name=name,
+                lines=lines,
+                entries=[ExperienceEntry(title, dates, start, end, entry_lines)
+                         for title, dates, start, end, entry_lines in entries]
+            )
+            for name, (lines, entries) in payload["s"].items()
+        }
+        return cls(content_hash=payload["h"], sections=sections, page_count=payload["p"])
+
+class ResumeSectionParser:
+    """Splits resumes into sections using text layout and font metadata."""
+
+    SECTION_ALIASES = {
+        "summary": [
+            "summary", "professional summary", "profile", "professional profile",
+            "about me", "objective", "career objective", "overview"
+        ],
+        "experience": [
+            "experience", "work experience", "professional experience", "employment",
+            "employment history", "work history", "career history", "relevant experience"
+        ],
+        "skills": [
+            "skills", "technical skills", "core skills", "key skills", "core competencies",
+            "competencies", "technologies", "tools and technologies", "tech stack", "expertise"
+        ],
+        "education": [
+            "education", "academic background", "academics", "education and training", "qualifications"
+        ],
+        "certifications": [
+            "certifications", "certificates", "licenses", "licenses and certifications",
+            "certifications and licenses", "courses", "training"
+        ],
+        "projects": ["projects", "personal projects", "selected projects", "key projects"],
+    }
+
+    MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+    DATE_POINT = rf"(?:{MONTH}\s+)?(?:\d{{1,2}}/)?(?:19|20)\d{{2}}"
+    DATE_RANGE_PATTERN = re.compile(
+        rf"({DATE_POINT})\s*(?:-|–|—|to)\s*({DATE_POINT}|present|current|now|today)",
+        re.IGNORECASE
+    )
+    SINGLE_DATE_PATTERN = re.compile(rf"\b{DATE_POINT}\b", re.IGNORECASE)
+
+    HEADING_MAX_WORDS = 5
+    HEADING_SIZE_RATIO = 1.15
+    COLUMN_MAX_WIDTH_RATIO = 0.6  # Blocks wider than this share of the page span columns
+    LINE_ALIGN_TOLERANCE = 3.0  # Points between the baselines of text on the same line
+
+    def __init__(self):
+        """Build the heading lookup table."""
+        self._heading_lookup = {
+            alias: section for section, aliases in self.SECTION_ALIASES.items() for alias in aliases
+        }
+
+    def parse_pdf(self, pdf_bytes: bytes, content_hash: Optional[str] = None) -> ResumeProfile:
+        """
+        Parse a PDF resume into a structured profile.
+
+        Args:
+            pdf_bytes: Raw PDF bytes
+            content_hash: Precomputed hash of pdf_bytes, if available
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        content_hash = content_hash or ContentHasher.hash_bytes(pdf_bytes)
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+            lines = list(self._pdf_lines(pdf_doc))
+            page_count = len(pdf_doc)
+        return self.parse_lines(lines, content_hash, page_count)
+
+    def parse_text(self, text: str, content_hash: Optional[str] = None) -> ResumeProfile:
+        """
+        Parse plain resume text (no font metadata) into a structured profile.
+
+        Args:
+            text: Resume text
+            content_hash: Precomputed hash of the source document, if available
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        content_hash = content_hash or ContentHasher.hash_text(text)
+        lines = [TextLine(text=line.strip()) for line in (text or "").splitlines() if line.strip()]
+        return self.parse_lines(lines, content_hash, page_count=1)
+
+    def parse_lines(self, lines: List[TextLine], content_hash: str, page_count: int = 1) -> ResumeProfile:
+        """
+        Group text lines into sections and dated entries.
+
+        Args:
+            lines: Lines in reading order
+            content_hash: Hash identifying the source document
+            page_count: Number of pages in the source document
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        sizes = [line.size for line in lines if line.size > 0]
+        body_size = statistics.median(sizes) if sizes else 0.0
+
+        sections: Dict[str, ResumeSection] = {}
+        current: Optional[ResumeSection] = None
+
+        for line in lines:
+            section_name = self._section_for_heading(line, body_size)
+            if section_name:
+                current = sections.setdefault(section_name, ResumeSection(name=section_name))
+                continue
+
+            if current is None:
+                # Text before the first heading is the contact block / headline
+                current = sections.setdefault("header", ResumeSection(name="header"))
+
+            current.lines.append(line.text)
+
+        for name in ("experience", "education", "certifications", "projects"):
+            if name in sections:
+                sections[name].entries = self._split_entries(sections[name].lines, lines)
+
+        return ResumeProfile(content_hash=content_hash, sections=sections, page_count=page_count)
+
+    def _pdf_lines(self, pdf_doc) -> Iterable[TextLine]:
+        """Yield text lines in reading order with their dominant font size and weight."""
+        for page_number, page in enumerate(pdf_doc):
+            page_dict = page.get_text("dict", flags=fitz.TEXT_PRESERVE_WHITESPACE)
+            # MuPDF may put both columns' text on the same baseline into one block, so lines are ordered
+            lines = [
+                line for block in page_dict.get("blocks", []) if block.get("type") == 0
+                for line in block.get("lines", [])
+                if any(span.get("text", "").strip() for span in line.get("spans", []))
+            ]
+
+            for line in self._reading_order(lines, page.rect.width):
+                spans = [span for span in line["spans"] if span.get("text", "").strip()]
+                text = re.sub(r"\s+", " ", "".join(span["text"] for span in spans)).strip()
+                largest = max(spans, key=lambda span: len(span["text"].strip()))
+                # PyMuPDF span flag bit 4 marks bold text
+                bold = all(span.get("flags", 0) & 16 or "bold" in span.get("font", "").lower() for span in spans)
+                yield TextLine(text=text, size=float(largest.get("size", 0.0)), bold=bool(bold), page=page_number)
+
+    @classmethod
+    def _reading_order(cls, lines: List[dict], page_width: float) -> List[dict]:
+        """
+        Order text lines column by column, so a two-column layout is not read across both columns.
+
+        Columns are clusters of overlapping x-ranges of narrow lines. A cluster
+        whose lines are mostly dates on the same baseline as a line to their
+        left holds the right-aligned dates of entries, not a column, and joins
+        its left neighbour. Lines spanning several columns (a full-width header)
+        split the page into bands that are read in turn, each column by column.
+        """
+        max_width = page_width * cls.COLUMN_MAX_WIDTH_RATIO
+        narrow = [line for line in lines if line["bbox"][2] - line["bbox"][0] < max_width]
+
+        clusters: List[List[float]] = []
+        for line in sorted(narrow, key=lambda line: line["bbox"][0]):
+            x0, _, x1, _ = line["bbox"]
+            if clusters and x0 <= clusters[-1][1]:
+                clusters[-1][1] = max(clusters[-1][1], x1)
+            else:
+                clusters.append([x0, x1])
+
+        def members(cluster: List[float]) -> List[dict]:
+            return [line for line in narrow if cluster[0] <= line["bbox"][0] and line["bbox"][2] <= cluster[1]]
+
+        columns: List[List[float]] = []
+        for cluster in clusters:
+            if columns:
+                left_bottoms = [line["bbox"][3] for line in members(columns[-1])]
+                inside = members(cluster)
+                dates = sum(
+                    any(abs(line["bbox"][3] - bottom) <= cls.LINE_ALIGN_TOLERANCE for bottom in left_bottoms)
+                    and bool(cls.SINGLE_DATE_PATTERN.search(cls._line_text(line)))
+                    for line in inside
+                )
+                if dates * 2 > len(inside):
+                    columns[-1][1] = cluster[1]
+                    continue
+            columns.append(cluster)
+
+        def overlapping(line: dict) -> List[int]:
+            x0, _, x1, _ = line["bbox"]
+            return [index for index, (left, right) in enumerate(columns) if x0 < right and left < x1]
+
+        spanning_tops = sorted(line["bbox"][1] for line in lines if len(overlapping(line)) != 1)
+
+        def key(line: dict) -> Tuple[int, int, float, float]:
+            x0, y0 = line["bbox"][0], line["bbox"][1]
+            column = overlapping(line)
+            if len(column) != 1:
+                return bisect.bisect_left(spanning_tops, y0) + 1, -1, y0, x0
+            return bisect.bisect_right(spanning_tops, y0), column[0], y0, x0
+
+        return sorted(lines, key=key)
+
+    @staticmethod
+    def _line_text(line: dict) -> str:
+        return "".join(span.get("text", "") for span in line.get("spans", []))
+
+    def _section_for_heading(self, line: TextLine, body_size: float) -> Optional[str]:
+        """Return the canonical section name if the line is a section heading."""
+        text = line.text.strip().rstrip(":").strip()
+        words = text.split()
+        if not words or len(words) > self.HEADING_MAX_WORDS:
+            return None
+
+        key = re.sub(r"[^a-z ]", "", text.lower().replace("&", "and")).strip()
+        key = re.sub(r"\s+", " ", key)
+        section = self._heading_lookup.get(key)
+        if not section:
+            return None
+
+        # With font metadata, require the heading to stand out from body text;
+        # without it (plain text), a known heading on its own line is enough
+        if body_size > 0:
+            stands_out = (
+                line.bold
+                or line.size >= body_size * self.HEADING_SIZE_RATIO
+                or text.isupper()
+                or line.text.rstrip().endswith(":")
+            )
+            if not stands_out:
+                return None
+        return section
+
+    def _split_entries(self, section_lines: List[str], all_lines: List[TextLine]) -> List[ExperienceEntry]:
+        """Split a section into entries, each starting at a title line near a date range."""
+        bold_lines = {line.text for line in all_lines if line.bold}
+        entries: List[ExperienceEntry] = []
+        current: Optional[ExperienceEntry] = None
+
+        for index, text in enumerate(section_lines):
+            dates, start_year, end_year = self._extract_dates(text)
+            is_bullet = bool(re.match(r"^[-*•◦▪●‣·]", text))
+
+            if dates and not is_bullet:
+                title = self._strip_dates(text, dates)
+                if not title and current is not None and not current.dates and not current.lines:
+                    # Title on the previous line, dates on this one
+                    current.dates, current.start_year, current.end_year = dates, start_year, end_year
+                    continue
+                if not title and index > 0:
+                    title = section_lines[index - 1]
+                    if current is not None and current.lines and current.lines[-1] == title:
+                        current.lines.pop()
+                current = ExperienceEntry(title=title, dates=dates, start_year=start_year, end_year=end_year)
+                entries.append(current)
+            elif text in bold_lines and not is_bullet:
+                current = ExperienceEntry(title=text)
+                entries.append(current)
+            elif current is not None:
+                current.lines.append(text)
+            else:
+                current = ExperienceEntry(title=text)
+                entries.append(current)
+
+        return entries
+
+    def _extract_dates(self, text: str) -> Tuple[str, Optional[int], Optional[int]]:
+        """Return (date text, start year, end year) for the first date range or date in text."""
+        match = self.DATE_RANGE_PATTERN.search(text)
+        if match:
+            start_year = self._year(match.group(1))
+            end_text = match.group(2).lower()
+            end_year = date.today().year if end_text in ("present", "current", "now", "today") else self._year(end_text)
+            return match.group(0), start_year, end_year
+
+        match = self.SINGLE_DATE_PATTERN.search(text)
+        if match:
+            year = self._year(match.group(0))
+            return match.group(0), year, year
+
+        return "", None, None
+
+    @staticmethod
+    def _year(text: str) -> Optional[int]:
+        match = re.search(r"(?:19|20)\d{2}", text)
+        return int(match.group(0)) if match else None
+
+    @staticmethod
+    def _strip_dates(text: str, dates: str) -> str:
+        return text.replace(dates, "").strip(" |,-–—()\t")
+
+class ProfileCache:
+    """Process-wide cache of parsed resume profiles keyed by content hash."""
+
+    _parser = ResumeSectionParser()
+    _cache = LRUCache(max_entries=Config.PROFILE_CACHE_ENTRIES, max_bytes=Config.PROFILE_CACHE_BYTES)
+
+    @classmethod
+    def get_pdf_profile(cls, pdf_bytes: bytes, content_hash: Optional[str] = None) -> ResumeProfile:
+        """
+        Return the parsed profile for a PDF, parsing it only on a cache miss.
+
+        Args:
+            pdf_bytes: Raw PDF bytes
+            content_hash: Precomputed hash of pdf_bytes, if available
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        content_hash = content_hash or ContentHasher.hash_bytes(pdf_bytes)
+        cached = cls._cache.get(content_hash)
+        if cached is not None:
+            return ResumeProfile.from_compact(cached)
+
+        profile = cls._parser.parse_pdf(pdf_bytes, content_hash)
+        cls.put(profile)
+        logger.info(f"Parsed resume {content_hash[:12]} into sections: {', '.join(profile.sections)}")
+        return profile
+
+    @classmethod
+    def get_text_profile(cls, text: str, content_hash: Optional[str] = None) -> ResumeProfile:
+        """
+        Return the parsed profile for a text resume, parsing it only on a cache miss.
+
+        Args:
+            text: Extracted resume text
+            content_hash: Hash of the source document, if available
+
+        Returns:
+            ResumeProfile: Parsed profile
+        """
+        content_hash = content_hash or ContentHasher.hash_text(text)
+        cached = cls._cache.get(content_hash)
+        if cached is not None:
+            return ResumeProfile.from_compact(cached)
+
+        profile = cls._parser.parse_text(text, content_hash)
+        cls.put(profile)
+        logger.info(f"Parsed resume {content_hash[:12]} into sections: {', '.join(profile.sections)}")
+        return profile
+
+    @classmethod
+    def get(cls, content_hash: str) -> Optional[ResumeProfile]:
+        """Return a cached profile, or None."""
+        cached = cls._cache.get(content_hash)
+        return ResumeProfile.from_compact(cached) if cached is not None else None
+
+    @classmethod
+    def put(cls, profile: ResumeProfile) -> None:
+        """Store a profile in its compact form."""
+        cls._cache.put(profile.content_hash, profile.to_compact())
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """Return cache statistics."""
+        return cls._cache.stats()
+
+MemoryAccountant.get().register_shared("profiles", ProfileCache._cache)
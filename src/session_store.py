@@ -0,0 +1,162 @@
+"""
+Session-scoped result persistence for the Technical ATS Resume Expert application.
+
+Streamlit re-executes the script on every widget interaction, including the
+download buttons under each result. Results are therefore kept in session
+state and re-rendered from memory on reruns instead of being recomputed.
+"""
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import Any, MutableMapping, Optional
+import streamlit as st
+from PIL import Image
+from src.cache import ContentHasher, LRUCache
+from src.config import Config
+from src.dedup import DuplicateIndex
+from src.memory import MemoryAccountant
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class AnalysisResult:
+    """Everything needed to re-render one analysis without recomputing it."""
+
+    key: str
+    prompt_type: str
+    response: str
+    preview_jpeg: bytes
+    resume_hash: str
+    jd_hash: str
+    match_percentage: Optional[int] = None
+    chart_png: Optional[bytes] = None
+    source: str = "llm"  # 'llm', 'cascade' (resolved locally) or 'fallback' (AI service unavailable)
+    downgraded: bool = False  # Preview replaced by a thumbnail under memory pressure
+    preview_text: str = ""  # Beginning of a text resume, drawn as its preview on display (no preview_jpeg)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def size_bytes(self) -> int:
+        """Approximate memory held by this result."""
+        return (len(self.preview_jpeg) + len(self.chart_png or b"") + len(self.response.encode("utf-8"))
+                + len(self.preview_text.encode("utf-8")))
+
+class SessionResultStore:
+    """Bounded per-session store of analysis results keyed by (resume, JD, prompt type)."""
+
+    RESULTS_KEY = "_ats_results"
+    ACTIVE_KEY = "_ats_active_result"
+    DUPLICATES_KEY = "_ats_duplicates"
+
+    def __init__(self, state: Optional[MutableMapping[str, Any]] = None,
+                 max_entries: int = Config.SESSION_MAX_RESULTS, max_bytes: int = Config.SESSION_MAX_BYTES,
+                 session_id: Optional[str] = None, accountant: Optional[MemoryAccountant] = None):
+        """
+        Initialize the store.
+
+        Args:
+            state: Mapping that survives reruns (defaults to st.session_state)
+            max_entries: Maximum number of results kept per session
+            max_bytes: Maximum total size of results kept per session
+            session_id: Identifier used for process-wide memory accounting
+            accountant: Memory accountant (defaults to the process-wide one)
+        """
+        self._state = state if state is not None else st.session_state
+        if self.RESULTS_KEY not in self._state:
+            self._state[self.RESULTS_KEY] = LRUCache(
+                max_entries=max_entries,
+                max_bytes=max_bytes,
+                sizeof=MemoryAccountant.estimate_size
+            )
+        if self.DUPLICATES_KEY not in self._state:
+            self._state[self.DUPLICATES_KEY] = DuplicateIndex(
+                max_entries=max_entries,
+                text_threshold=Config.DEDUP_REUSE_THRESHOLD
+            )
+
+        self._accountant = accountant or MemoryAccountant.get()
+        self._accountant.register(session_id or self._session_id(), self._results)
+
+    def _session_id(self) -> str:
+        """Streamlit session id, or a stable id for the state object outside Streamlit."""
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx()
+            if ctx is not None:
+                return ctx.session_id
+        except ImportError:
+            pass
+        return f"state-{id(self._state)}"
+
+    @staticmethod
+    def make_key(resume_hash: str, jd_hash: str, prompt_type: str) -> str:
+        """
+        Build the cache key for an analysis.
+
+        Args:
+            resume_hash: Content hash of the resume
+            jd_hash: Cache key of the compacted job description
+            prompt_type: Prompt type ('analysis', 'improvement', 'matching')
+
+        Returns:
+            str: Result key
+        """
+        return ContentHasher.combine(resume_hash, jd_hash, prompt_type)
+
+    @property
+    def _results(self) -> LRUCache:
+        return self._state[self.RESULTS_KEY]
+
+    def get(self, key: str) -> Optional[AnalysisResult]:
+        """Return a stored result, or None."""
+        return self._results.get(key)
+
+    def find_near_duplicate(self, resume_hash: str, jd_hash: str, prompt_type: str, text: str = "",
+                            image: Optional[Image.Image] = None) -> Optional[AnalysisResult]:
+        """
+        Return this session's result for a near-identical resume, e.g. the same file re-exported.
+
+        Only resumes analyzed in this session are considered, so a lookalike
+        resume of another candidate is never reused. The resume is indexed for
+        later lookups if it matches none.
+
+        Args:
+            resume_hash: Content hash of the resume
+            jd_hash: Cache key of the compacted job description
+            prompt_type: Prompt type of the analysis
+            text: Extracted resume text
+            image: Rendered first page, fingerprinted when the resume has too little text
+
+        Returns:
+            Optional[AnalysisResult]: Result of the near-duplicate for the same JD and prompt type, or None
+        """
+        match = self._state[self.DUPLICATES_KEY].find_or_add(resume_hash, text, image)
+        if match is None:
+            return None
+        result = self.get(self.make_key(match.key, jd_hash, prompt_type))
+        if result:
+            logger.info(f"Resume is a near-duplicate of {match.key[:12]} ({match.method}, {match.similarity:.0%} similar)")
+        return result
+
+    def put(self, result: AnalysisResult) -> None:
+        """Store a result, evicting the least recently used ones if over budget."""
+        self._results.put(result.key, result)
+        self._accountant.enforce()
+        logger.info(
+            f"Stored {result.prompt_type} result ({result.size_bytes / 1024:.0f} KB); "
+            f"session holds {len(self._results)} results, {self._results.total_bytes / 1024:.0f} KB"
+        )
+
+    def activate(self, key: str) -> None:
+        """Mark a result as the one displayed on reruns."""
+        self._state[self.ACTIVE_KEY] = key
+
+    def active(self) -> Optional[AnalysisResult]:
+        """Return the result currently displayed, if it is still stored."""
+        key = self._state.get(self.ACTIVE_KEY)
+        return self.get(key) if key else None
+
+    def clear(self) -> None:
+        """Remove all stored results for this session."""
+        self._results.clear()
+        self._state.pop(self.ACTIVE_KEY, None)
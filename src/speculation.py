@@ -0,0 +1,317 @@
+"""
+Speculative preprocessing for the Technical ATS Resume Expert application.
+
+Work that does not depend on which button is clicked starts as soon as the
+inputs exist: when a resume is uploaded it is validated, hashed, rendered (PDFs
+only) and its text extracted in the background. Optionally, once both the resume and the
+job description are present and have stayed unchanged for a short debounce
+period, the matching request is prefetched too. When the inputs change,
+outdated work is cancelled: a prefetch can be cancelled up to the moment it
+sends its model call, after which its result is discarded. A click then usually finds its inputs ready; work that has
+not started yet is cancelled and done inline instead, so a click never
+waits behind a queue of speculative jobs.
+
+Session slots are only written from the script thread; background tasks
+just return their results through their futures.
+"""
+import io
+import base64
+import logging
+import threading
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Hashable, MutableMapping, Optional, Tuple, Union
+from PIL import Image
+import streamlit as st
+from src.ai_service import PromptManager
+from src.config import Config
+from src.ingestion import DocumentIngestor, TextDocument
+from src.profiling import RequestTag
+from src.utils import PDFProcessor, PDFValidationError, ValidatedPDF
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PreparedResume:
+    """Result of preprocessing an upload: the validated document and its preview, or why it was rejected."""
+
+    upload_key: Hashable
+    validated: Optional[Union[ValidatedPDF, TextDocument]] = None
+    preview_jpeg: Optional[bytes] = None  # First page of a PDF; text documents are never rendered
+    error: Optional[str] = None
+
+    @property
+    def is_text(self) -> bool:
+        """True for DOCX, TXT, Markdown and RTF uploads, which are analyzed as text."""
+        return isinstance(self.validated, TextDocument)
+
+    @property
+    def pdf_base64(self) -> str:
+        """Base64 encoded first page JPEG, as sent to the AI service."""
+        return base64.b64encode(self.preview_jpeg).decode()
+
+    def page_image(self) -> Image.Image:
+        """Open the first page as a PIL image (the caller closes it)."""
+        return Image.open(io.BytesIO(self.preview_jpeg))
+
+class _CancelToken:
+    """Lets the script thread cancel a background task until the task commits to its model call."""
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._lock = threading.Lock()
+        self._committed = False
+
+    def cancel(self) -> bool:
+        """Cancel unless the model call was already sent; returns True if the task is cancelled."""
+        with self._lock:
+            if not self._committed:
+                self._cancelled.set()
+            return self._cancelled.is_set()
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to seconds; returns True (early) if cancelled."""
+        return self._cancelled.wait(seconds)
+
+    def commit(self) -> bool:
+        """Called by the task right before its model call; returns False if it was cancelled."""
+        with self._lock:
+            if self._cancelled.is_set():
+                return False
+            self._committed = True
+            return True
+
+class _UploadCopy(io.BytesIO):
+    """In-memory copy of an upload, so background threads never share the uploader's file object."""
+
+    def __init__(self, data: bytes, name: str):
+        super().__init__(data)
+        self.name = name
+        self.size = len(data)
+
+class SpeculativePipeline:
+    """Starts upload preprocessing and the matching request ahead of the user's click."""
+
+    STATE_KEY = "_ats_speculation"
+
+    _executor = ThreadPoolExecutor(max_workers=Config.SPECULATION_WORKERS, thread_name_prefix="speculative")
+    # Prefetches block on the LLM, so they get their own threads and never delay preprocessing
+    _prefetch_executor = ThreadPoolExecutor(max_workers=Config.SPECULATION_PREFETCH_WORKERS,
+                                            thread_name_prefix="speculative-prefetch")
+
+    def __init__(self, gemini_service, jd_compactor, scoring_cascade, long_resume_analyzer,
+                 state: Optional[MutableMapping[str, Any]] = None):
+        """
+        Initialize the pipeline for the current session.
+
+        Args:
+            gemini_service: GeminiService used for the matching prefetch
+            jd_compactor: JobDescriptionCompactor applied to the job description
+            scoring_cascade: ScoringCascade deciding whether matching needs the LLM at all
+            long_resume_analyzer: LongResumeAnalyzer whose page digests are warmed for long resumes
+            state: Mapping that survives reruns (defaults to st.session_state)
+        """
+        self.gemini_service = gemini_service
+        self.jd_compactor = jd_compactor
+        self.scoring_cascade = scoring_cascade
+        self.long_resume_analyzer = long_resume_analyzer
+        self._state = state if state is not None else st.session_state
+        if self.STATE_KEY not in self._state:
+            self._state[self.STATE_KEY] = {
+                "upload_key": None, "resume": None, "prefetch_key": None, "prefetch": None, "prefetch_token": None
+            }
+
+    @property
+    def _slots(self) -> dict:
+        return self._state[self.STATE_KEY]
+
+    @staticmethod
+    def upload_key(uploaded_file) -> Hashable:
+        """Identity of an upload across reruns."""
+        return getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
+
+    def on_inputs(self, job_description: str, uploaded_file) -> None:
+        """
+        Start (or cancel) speculative work for the current inputs; called on every rerun.
+
+        Args:
+            job_description: Current job description text
+            uploaded_file: Current upload, or None
+        """
+        slots = self._slots
+        if uploaded_file is None:
+            self._cancel("resume")
+            self._cancel("prefetch")
+            slots["upload_key"] = slots["prefetch_key"] = None
+            return
+
+        upload_key = self.upload_key(uploaded_file)
+        if upload_key != slots["upload_key"]:
+            self._cancel("resume")
+            slots["upload_key"] = upload_key
+            slots["resume"] = self._executor.submit(
+                RequestTag.propagate(self._prepare), upload_key, uploaded_file.name, uploaded_file.getvalue()
+            )
+            logger.info(f"Started speculative preprocessing of {uploaded_file.name}")
+
+        if Config.SPECULATIVE_PREFETCH and (job_description or "").strip():
+            self._start_prefetch(job_description)
+
+    def prepared_resume(self, uploaded_file) -> PreparedResume:
+        """
+        Return the preprocessed upload, waiting for the background work or doing it now.
+
+        Args:
+            uploaded_file: Current upload
+
+        Returns:
+            PreparedResume: Validated and rendered resume, or the rejection reason
+        """
+        slots = self._slots
+        upload_key = self.upload_key(uploaded_file)
+        future = slots["resume"]
+        if upload_key == slots["upload_key"] and future is not None and not future.cancel():
+            if future.done():
+                logger.info("Using speculatively preprocessed resume")
+            return future.result()  # Running or finished
+
+        # Not started yet (now cancelled) or outdated: doing it here beats waiting in the queue
+        prepared = self._prepare(upload_key, uploaded_file.name, uploaded_file.getvalue())
+        if upload_key == slots["upload_key"]:
+            done = Future()
+            done.set_result(prepared)
+            slots["resume"] = done
+        return prepared
+
+    def prefetched_response(self, resume_hash: str, jd_cache_key: str) -> Optional[str]:
+        """
+        Return the prefetched matching response for these inputs, waiting only if it is already running.
+
+        Args:
+            resume_hash: Content hash of the resume
+            jd_cache_key: Cache key of the compacted job description
+
+        Returns:
+            Optional[str]: Response text, or None if nothing usable was prefetched
+        """
+        slots = self._slots
+        future = slots["prefetch"]
+        if future is None or slots["prefetch_key"] is None or slots["prefetch_key"][1] != jd_cache_key:
+            return None
+        if future.cancel() or slots["prefetch_token"].cancel():
+            return None  # Model call not sent yet; the caller's own request is no slower
+        try:
+            prefetched = future.result()
+        except CancelledError:
+            return None
+        except Exception as e:
+            logger.warning(f"Matching prefetch failed: {str(e)}")
+            return None
+
+        if prefetched is None or prefetched[0] != resume_hash or not prefetched[1]:
+            return None
+        logger.info("Using prefetched matching response")
+        return prefetched[1]
+
+    def _start_prefetch(self, job_description: str) -> None:
+        """Queue the matching prefetch behind preprocessing and the debounce, replacing a prefetch for older inputs."""
+        compacted_jd = self.jd_compactor.compact(job_description)
+        slots = self._slots
+        prefetch_key = (slots["upload_key"], compacted_jd.cache_key)
+        if prefetch_key == slots["prefetch_key"] and slots["prefetch"] is not None:
+            return  # Already prefetched for exactly these inputs
+
+        self._cancel("prefetch")
+        slots["prefetch_key"] = prefetch_key
+        slots["prefetch_token"] = _CancelToken()
+        slots["prefetch"] = self._prefetch_executor.submit(
+            RequestTag.propagate(self._prefetch_matching), slots["resume"], compacted_jd.text, slots["prefetch_token"]
+        )
+
+    def _prefetch_matching(self, resume_future: Future, job_description: str,
+                           token: _CancelToken) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Run the LLM part of matching for inputs the user has not submitted yet.
+
+        Args:
+            resume_future: Preprocessing of the upload, awaited first
+            job_description: Compacted job description
+            token: Cancelled when the inputs change or the user clicks before the model call is sent
+
+        Returns:
+            Optional[Tuple[str, Optional[str]]]: Resume content hash and response, or None if the
+                upload was rejected, its preprocessing cancelled or the prefetch itself cancelled
+        """
+        # Debounce: inputs still being edited cancel this wait and start a new one
+        if token.wait(Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS):
+            return None
+
+        try:
+            prepared = resume_future.result()
+        except CancelledError:
+            return None  # Preprocessing was done inline by a click, which makes its own request
+        if prepared.error:
+            return None
+
+        content_hash = prepared.validated.content_hash
+        profile = DocumentIngestor.profile(prepared.validated)
+        decision = self.scoring_cascade.decide(profile.full_text, job_description)
+        if Config.CASCADE_ENABLED and not decision.escalate:
+            return content_hash, None  # Resolved locally on click, no LLM call to hide
+
+        prompt = PromptManager.get_prompt('matching')
+        if not token.commit():
+            return None  # Cancelled while preprocessing finished; no model call was sent
+
+        if self.long_resume_analyzer.should_use(prepared.validated.page_count):
+            # The final prompt is cheap to start on click; warming the page digests is what saves time
+            pages = self.long_resume_analyzer.extract_pages(prepared.validated.data)
+            self.long_resume_analyzer.map_pages(pages)
+            return content_hash, None
+
+        logger.info("Prefetching matching response")
+        if prepared.is_text:
+            return content_hash, self.gemini_service.prefetch_text_response(
+                job_description, profile.prompt_text('matching'), prompt
+            )
+        return content_hash, self.gemini_service.prefetch_response(job_description, prepared.pdf_base64, prompt)
+
+    def _cancel(self, slot: str) -> None:
+        future = self._slots.get(slot)
+        token = self._slots.get(f"{slot}_token")
+        if future is not None and (future.cancel() or (token is not None and token.cancel())):
+            logger.info(f"Cancelled outdated speculative {slot} work")
+        self._slots[slot] = None
+
+    @staticmethod
+    def _prepare(upload_key: Hashable, name: str, data: bytes) -> PreparedResume:
+        """Validate, hash, render and extract the text of an upload (no UI calls; runs in the background)."""
+        try:
+            validated = DocumentIngestor.ingest(_UploadCopy(data, name))
+        except PDFValidationError as e:
+            logger.warning(f"Rejected upload {name}: {str(e)}")
+            return PreparedResume(upload_key, error=str(e))
+        except Exception as e:
+            # Anything else would surface from future.result() on click as an uncaught error
+            logger.error(f"Error processing upload {name}: {str(e)}")
+            return PreparedResume(upload_key, error=f"Error processing file: {str(e)}")
+
+        if isinstance(validated, TextDocument):
+            # Text was extracted during validation; only the profile is left to build
+            DocumentIngestor.profile(validated)
+            return PreparedResume(upload_key, validated)
+
+        try:
+            pil_image, base64_encoded = PDFProcessor.render_first_page(validated.data)
+            pil_image.close()
+        except Exception as e:
+            logger.error(f"Error processing PDF {name}: {str(e)}")
+            return PreparedResume(upload_key, error=f"Error processing PDF: {str(e)}")
+
+        try:
+            DocumentIngestor.profile(validated)
+        except Exception as e:
+            # Text extraction is only needed by some analyses, which retry it themselves
+            logger.warning(f"Could not extract text from {name}: {str(e)}")
+
+        return PreparedResume(upload_key, validated, base64.b64decode(base64_encoded))
@@ -4,17 +4,35 @@ Utility functions for the Technical ATS Resume Expert application.
 import re
 import io
 import base64
+import hashlib
 import logging
-from typing import Tuple, Optional
+from dataclasses import dataclass
+from typing import List, Tuple, Optional
 import fitz  # PyMuPDF
 from PIL import Image
 import streamlit as st
+from src.config import Config
 
 logger = logging.getLogger(__name__)
 
+class PDFValidationError(Exception):
+    """Raised when an uploaded PDF is rejected; the message is safe to show to users."""
+
+@dataclass
+class ValidatedPDF:
+    """An uploaded PDF that passed validation."""
+    
+    name: str
+    data: bytes
+    content_hash: str
+    page_count: int
+
 class PDFProcessor:
     """Handles PDF file processing operations."""
     
+    PDF_MAGIC = b"%PDF-"
+    MAGIC_SEARCH_BYTES = 1024  # The PDF spec tolerates leading junk before the header
+    
     @staticmethod
     def validate_pdf_file(uploaded_file) -> bool:
         """
@@ -26,22 +44,171 @@ class PDFProcessor:
         Returns:
             bool: True if valid, False otherwise
         """
+        return PDFProcessor.load_pdf(uploaded_file) is not None
+    
+    @staticmethod
+    def load_pdf(uploaded_file) -> Optional[ValidatedPDF]:
+        """
+        Validate an uploaded PDF and return its contents, showing errors in the UI.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object
+            
+        Returns:
+            Optional[ValidatedPDF]: Validated PDF, or None if rejected
+        """
         if uploaded_file is None:
-            return False
+            return None
+        
+        try:
+            return PDFProcessor.inspect_pdf(uploaded_file)
+        except PDFValidationError as e:
+            st.error(f"⚠️ {str(e)}")
+            logger.warning(f"Rejected upload {getattr(uploaded_file, 'name', '?')}: {str(e)}")
+            return None
+    
+    @staticmethod
+    def inspect_pdf(uploaded_file) -> ValidatedPDF:
+        """
+        Incrementally read and validate an uploaded PDF without rendering it.
+        
+        The file is read in chunks and hashed as it streams in, so oversized
+        uploads and non-PDF content are rejected before the whole file is held
+        in memory. The document structure is then checked (encryption, page
+        count, page area and embedded images) before any rasterization happens.
+        
+        Args:
+            uploaded_file: Streamlit uploaded file object (any binary file-like with a name)
             
-        if uploaded_file.size == 0:
-            st.error("⚠️ The uploaded file is empty.")
-            return False
+        Returns:
+            ValidatedPDF: Validated PDF contents and metadata
             
-        if uploaded_file.size > 10 * 1024 * 1024:  # 10MB limit
-            st.error("⚠️ File size exceeds 10MB limit.")
-            return False
+        Raises:
+            PDFValidationError: If the upload is rejected
+        """
+        name = getattr(uploaded_file, "name", "") or ""
+        if not name.lower().endswith('.pdf'):
+            raise PDFValidationError("Please upload a PDF file.")
+        
+        size = getattr(uploaded_file, "size", None)
+        if size == 0:
+            raise PDFValidationError("The uploaded file is empty.")
+        if size is not None and size > Config.MAX_FILE_SIZE:
+            raise PDFValidationError(f"File size exceeds {Config.MAX_FILE_SIZE // (1024 * 1024)}MB limit.")
+        
+        data, content_hash = PDFProcessor._read_chunked(uploaded_file)
+        page_count = PDFProcessor._check_structure(data)
+        
+        return ValidatedPDF(name=name, data=data, content_hash=content_hash, page_count=page_count)
+    
+    @staticmethod
+    def _read_chunked(uploaded_file) -> Tuple[bytes, str]:
+        """Read the upload in chunks, checking the header and size limit and hashing as we go."""
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        
+        hasher = hashlib.sha256()
+        buffer = bytearray()
+        
+        while True:
+            chunk = uploaded_file.read(Config.UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
             
-        if not uploaded_file.name.lower().endswith('.pdf'):
-            st.error("⚠️ Please upload a PDF file.")
-            return False
+            buffer.extend(chunk)
+            hasher.update(chunk)
             
-        return True
+            if len(buffer) > Config.MAX_FILE_SIZE:
+                raise PDFValidationError(f"File size exceeds {Config.MAX_FILE_SIZE // (1024 * 1024)}MB limit.")
+            
+            # Reject non-PDF content as soon as the header window has arrived
+            if len(buffer) - len(chunk) < PDFProcessor.MAGIC_SEARCH_BYTES <= len(buffer) \
+                    and PDFProcessor.PDF_MAGIC not in buffer[:PDFProcessor.MAGIC_SEARCH_BYTES]:
+                raise PDFValidationError("The uploaded file is not a valid PDF.")
+        
+        if hasattr(uploaded_file, "seek"):
+            uploaded_file.seek(0)
+        
+        if not buffer:
+            raise PDFValidationError("The uploaded file is empty.")
+        if PDFProcessor.PDF_MAGIC not in buffer[:PDFProcessor.MAGIC_SEARCH_BYTES]:
+            raise PDFValidationError("The uploaded file is not a valid PDF.")
+        
+        return bytes(buffer), hasher.hexdigest()
+    
+    @staticmethod
+    def _check_structure(pdf_bytes: bytes) -> int:
+        """Check document-level limits using only metadata (no page rendering or image decoding)."""
+        try:
+            pdf_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+        except (fitz.FileDataError, RuntimeError):
+            raise PDFValidationError("Invalid PDF file. Please upload a valid PDF.")
+        
+        with pdf_doc:
+            return PDFProcessor.check_document(pdf_doc)
+    
+    @staticmethod
+    def check_document(pdf_doc) -> int:
+        """
+        Check an open PDF against the upload limits (encryption, page count, page area and embedded images).
+        
+        Args:
+            pdf_doc: Open PyMuPDF document
+            
+        Returns:
+            int: Page count
+            
+        Raises:
+            PDFValidationError: If the document is rejected
+        """
+        if pdf_doc.needs_pass or pdf_doc.is_encrypted:
+            raise PDFValidationError("The PDF is password protected. Please upload an unencrypted file.")
+        
+        page_count = len(pdf_doc)
+        if page_count == 0:
+            raise PDFValidationError("The PDF file appears to be empty or corrupted.")
+        if page_count > Config.MAX_PDF_PAGES:
+            raise PDFValidationError(
+                f"The PDF has {page_count} pages; resumes are limited to {Config.MAX_PDF_PAGES} pages."
+            )
+        
+        zoom_area = Config.PDF_RENDER_ZOOM ** 2
+        image_count = 0
+        for page in pdf_doc:
+            if page.rect.width * page.rect.height * zoom_area > Config.MAX_PAGE_PIXELS:
+                raise PDFValidationError(f"Page {page.number + 1} is too large to process.")
+            
+            # (xref, smask, width, height, ...) - dimensions come from the image dictionary
+            for image in page.get_images(full=True):
+                image_count += 1
+                if image[2] * image[3] > Config.MAX_IMAGE_PIXELS:
+                    raise PDFValidationError(f"Page {page.number + 1} contains an oversized embedded image.")
+            
+            if image_count > Config.MAX_EMBEDDED_IMAGES:
+                raise PDFValidationError("The PDF contains too many embedded images.")
+        
+        return page_count
+    
+    @staticmethod
+    def render_first_page(pdf_bytes: bytes) -> Tuple[Image.Image, str]:
+        """
+        Render the first page of a validated PDF.
+        
+        Args:
+            pdf_bytes: Raw PDF bytes
+            
+        Returns:
+            Tuple[Image, str]: PIL Image and base64 encoded JPEG
+        """
+        with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+            first_page = pdf_doc[0]
+            zoom = Config.PDF_RENDER_ZOOM
+            pixmap = first_page.get_pixmap(matrix=fitz.Matrix(zoom, zoom))
+            jpeg_bytes = pixmap.tobytes("jpeg")
+        
+        pil_image = Image.open(io.BytesIO(jpeg_bytes))
+        base64_encoded = base64.b64encode(jpeg_bytes).decode()
+        return pil_image, base64_encoded
     
     @staticmethod
     def process_pdf(uploaded_file) -> Tuple[Optional[Image.Image], Optional[str]]:
@@ -51,43 +218,38 @@ class PDFProcessor:
         Args:
             uploaded_file: Streamlit uploaded file object
             
+        Returns:
+            Tuple[Image, str]: PIL Image and base64 encoded string, or (None, None) if error
+        """
+        validated = PDFProcessor.load_pdf(uploaded_file)
+        if validated is None:
+            return None, None
+        
+        return PDFProcessor.process_validated_pdf(validated)
+    
+    @staticmethod
+    def process_validated_pdf(validated: ValidatedPDF) -> Tuple[Optional[Image.Image], Optional[str]]:
+        """
+        Render an already validated PDF, showing errors in the UI.
+        
+        Args:
+            validated: PDF returned by load_pdf()
+            
         Returns:
             Tuple[Image, str]: PIL Image and base64 encoded string, or (None, None) if error
         """
         try:
-            if not PDFProcessor.validate_pdf_file(uploaded_file):
-                return None, None
-                
-            # Read the uploaded PDF file
-            pdf_bytes = uploaded_file.read()
-            
-            with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
-                if len(pdf_doc) == 0:
-                    st.error("⚠️ The PDF file appears to be empty or corrupted.")
-                    return None, None
-                    
-                # Get the first page as an image
-                first_page = pdf_doc[0]
-                pixmap = first_page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Higher resolution
-                img_byte_arr = io.BytesIO(pixmap.tobytes("jpeg"))
-                
-                # Create PIL Image
-                pil_image = Image.open(img_byte_arr)
-                
-                # Encode to base64
-                img_byte_arr.seek(0)
-                base64_encoded = base64.b64encode(img_byte_arr.getvalue()).decode()
-                
-                logger.info(f"Successfully processed PDF: {uploaded_file.name}")
-                return pil_image, base64_encoded
-                
+            pil_image, base64_encoded = PDFProcessor.render_first_page(validated.data)
+            logger.info(f"Successfully processed PDF: {validated.name}")
+            return pil_image, base64_encoded
+            
         except fitz.FileDataError:
             st.error("⚠️ Invalid PDF file. Please upload a valid PDF.")
-            logger.error(f"Invalid PDF file: {uploaded_file.name}")
+            logger.error(f"Invalid PDF file: {validated.name}")
             return None, None
         except Exception as e:
             st.error(f"⚠️ Error processing PDF: {str(e)}")
-            logger.error(f"Error processing PDF {uploaded_file.name}: {str(e)}")
+            logger.error(f"Error processing PDF {validated.name}: {str(e)}")
             return None, None
 
 class TextAnalyzer:
@@ -107,11 +269,11 @@ class TextAnalyzer:
         try:
             # Try multiple patterns to extract percentage
             patterns = [
-                r"Match Percentage[:\s]*(\d+)%",
-                r"Match[:\s]*(\d+)%",
-                r"Percentage[:\s]*(\d+)%",
+                r"Match Percentage[*:\s]*(\d+)%",
+                r"Match[*:\s]*(\d+)%",
+                r"Percentage[*:\s]*(\d+)%",
                 r"(\d+)%\s*match",
-                r"Score[:\s]*(\d+)%"
+                r"Score[*:\s]*(\d+)%"
             ]
             
             for pattern in patterns:
@@ -129,6 +291,39 @@ class TextAnalyzer:
             logger.error(f"Error extracting match percentage: {str(e)}")
             return 0
     
+    @staticmethod
+    def extract_missing_keywords(response_text: str) -> List[str]:
+        """
+        Extract the missing keywords list from an ATS matching response.
+        
+        Args:
+            response_text: Response text from Gemini API
+            
+        Returns:
+            List[str]: Missing keywords in the order listed
+        """
+        if not response_text:
+            return []
+        
+        # Everything between the "Missing Keywords" heading and the next bold heading
+        match = re.search(
+            r"Missing Keywords[*:\s]*(.*?)(?:\n\s*\*\*|\Z)",
+            response_text,
+            re.IGNORECASE | re.DOTALL
+        )
+        if not match:
+            return []
+        
+        keywords = []
+        for line in match.group(1).splitlines():
+            line = re.sub(r"^\s*(?:[-*•]|\d+[.)])\s*", "", line).strip()
+            # Single-line lists: "Docker, Kubernetes, Terraform"
+            for item in (line.split(",") if "," in line and len(line) < 200 else [line]):
+                item = item.strip(" .*`")
+                if item and item.lower() not in ("none", "n/a"):
+                    keywords.append(item)
+        return keywords
+    
     @staticmethod
     def validate_job_description(job_description: str) -> bool:
         """
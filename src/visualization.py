@@ -1,6 +1,7 @@
 """
 Visualization components for the Technical ATS Resume Expert application.
 """
+import io
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 import streamlit as st
@@ -24,6 +25,7 @@ class ChartGenerator:
         Returns:
             Optional[plt.Figure]: Matplotlib figure or None if error
         """
+        fig = None
         try:
             # Validate input
             if not 0 <= match_percentage <= 100:
@@ -79,10 +81,34 @@ class ChartGenerator:
             return fig
             
         except Exception as e:
+            if fig is not None:
+                plt.close(fig)  # Don't leak a half-built figure in pyplot's registry
             logger.error(f"Error creating pie chart: {str(e)}")
             st.error(f"⚠️ Error creating visualization: {str(e)}")
             return None
     
+    @staticmethod
+    def figure_to_png(fig: plt.Figure, dpi: int = 100) -> Optional[bytes]:
+        """
+        Render a figure to PNG bytes and release it.
+        
+        Args:
+            fig: Matplotlib figure
+            dpi: Output resolution
+            
+        Returns:
+            Optional[bytes]: PNG image, or None if error
+        """
+        try:
+            buffer = io.BytesIO()
+            fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+            return buffer.getvalue()
+        except Exception as e:
+            logger.error(f"Error rendering chart: {str(e)}")
+            return None
+        finally:
+            plt.close(fig)
+    
     @staticmethod
     def create_skills_gap_chart(missing_skills: list, present_skills: list) -> Optional[plt.Figure]:
         """
@@ -95,6 +121,7 @@ class ChartGenerator:
         Returns:
             Optional[plt.Figure]: Matplotlib figure or None if error
         """
+        fig = None
         try:
             if not missing_skills and not present_skills:
                 return None
@@ -130,6 +157,8 @@ class ChartGenerator:
             return fig
             
         except Exception as e:
+            if fig is not None:
+                plt.close(fig)
             logger.error(f"Error creating skills gap chart: {str(e)}")
             return None
 
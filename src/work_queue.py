@@ -0,0 +1,296 @@
+"""
+Durable work queue for distributed resume analysis.
+
+Jobs live in a SQLite database that any number of worker processes open,
+on one machine or on several sharing a filesystem. A worker leases jobs for
+a visibility timeout and renews the lease with heartbeats while it works. A
+job whose lease expires, because its worker crashed or hung, becomes
+visible again and is leased by another worker; after max_attempts leases it
+is marked failed instead of being retried forever.
+
+Results are written idempotently: the first result stored for a job wins,
+so a slow worker finishing a job that was already re-leased and completed
+elsewhere does not produce a duplicate.
+"""
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional
+from src.config import Config
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Job:
+    """A leased unit of work."""
+
+    job_id: str
+    payload: Dict[str, Any]
+    attempts: int
+    lease_expires: float
+
+class WorkQueue:
+    """SQLite-backed job queue with leases, heartbeats and visibility timeouts."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS jobs (
+        job_id TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        lease_owner TEXT,
+        lease_expires REAL,
+        enqueued_at REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        error TEXT
+    );
+    CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, lease_expires, enqueued_at);
+    CREATE TABLE IF NOT EXISTS results (
+        job_id TEXT PRIMARY KEY,
+        result TEXT NOT NULL,
+        worker_id TEXT NOT NULL,
+        completed_at REAL NOT NULL
+    );
+    """
+
+    STATUSES = ("queued", "leased", "done", "failed")
+
+    def __init__(self, path: str = Config.WORK_QUEUE_PATH,
+                 visibility_timeout: float = Config.WORKER_VISIBILITY_TIMEOUT,
+                 max_attempts: int = Config.WORKER_MAX_ATTEMPTS,
+                 journal_mode: str = Config.WORK_QUEUE_JOURNAL_MODE):
+        """
+        Open (and if necessary create) a queue.
+
+        Args:
+            path: SQLite database file
+            visibility_timeout: Seconds a lease lasts without a heartbeat
+            max_attempts: Leases a job gets before it is marked failed
+            journal_mode: SQLite journal mode ('WAL' locally; 'DELETE' on network filesystems,
+                which don't support WAL's shared memory)
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.journal_mode = journal_mode
+        self._local = threading.local()
+
+        self._connection().executescript(self.SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread connection; SQLite connections must not be shared across threads."""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            connection.execute("PRAGMA synchronous=NORMAL" if self.journal_mode.upper() == "WAL"
+                               else "PRAGMA synchronous=FULL")
+            self._local.connection = connection
+        return connection
+
+    @contextmanager
+    def _transaction(self):
+        """Run statements in a write transaction, taking the database lock up front."""
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    def close(self) -> None:
+        """Close this thread's connection."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def enqueue(self, job_id: str, payload: Dict[str, Any]) -> bool:
+        """
+        Add a job unless a job with the same ID already exists.
+
+        Args:
+            job_id: Stable identifier, so re-enqueueing the same work is a no-op
+            payload: JSON-serializable job description
+
+        Returns:
+            bool: True if the job was added
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, payload, enqueued_at, updated_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(payload), now, now)
+            )
+            return cursor.rowcount == 1
+
+    def lease(self, worker_id: str, limit: int = 1) -> List[Job]:
+        """
+        Lease the oldest visible jobs: queued ones and those whose lease has expired.
+
+        Args:
+            worker_id: Identifier of the leasing worker
+            limit: Maximum number of jobs to lease
+
+        Returns:
+            List[Job]: Leased jobs (empty if none are visible)
+        """
+        now = time.time()
+        expires = now + self.visibility_timeout
+        jobs = []
+
+        with self._transaction() as connection:
+            # Jobs abandoned by their worker after their last attempt are given up on
+            abandoned = connection.execute(
+                "UPDATE jobs SET status = 'failed', lease_owner = NULL, updated_at = ?, "
+                "error = 'Lease expired after the final attempt' "
+                "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            ).rowcount
+            if abandoned:
+                logger.warning(f"Marked {abandoned} abandoned jobs as failed")
+
+            rows = connection.execute(
+                "SELECT job_id, payload, attempts, status FROM jobs "
+                "WHERE status = 'queued' OR (status = 'leased' AND lease_expires < ?) "
+                "ORDER BY enqueued_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+
+            for job_id, payload, attempts, status in rows:
+                if status == "leased":
+                    logger.warning(f"Re-leasing job {job_id[:12]} whose lease expired")
+                connection.execute(
+                    "UPDATE jobs SET status = 'leased', lease_owner = ?, lease_expires = ?, "
+                    "attempts = attempts + 1, updated_at = ? WHERE job_id = ?",
+                    (worker_id, expires, now, job_id)
+                )
+                jobs.append(Job(job_id, json.loads(payload), attempts + 1, expires))
+        return jobs
+
+    def heartbeat(self, worker_id: str, job_ids: List[str]) -> List[str]:
+        """
+        Extend the leases a worker still holds.
+
+        Args:
+            worker_id: Identifier of the worker
+            job_ids: Jobs the worker is processing
+
+        Returns:
+            List[str]: Jobs whose lease was extended (a job missing here was re-leased elsewhere)
+        """
+        if not job_ids:
+            return []
+        now = time.time()
+        extended = []
+        with self._transaction() as connection:
+            for job_id in job_ids:
+                cursor = connection.execute(
+                    "UPDATE jobs SET lease_expires = ?, updated_at = ? "
+                    "WHERE job_id = ? AND lease_owner = ? AND status = 'leased'",
+                    (now + self.visibility_timeout, now, job_id, worker_id)
+                )
+                if cursor.rowcount:
+                    extended.append(job_id)
+        return extended
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]) -> bool:
+        """
+        Store a job's result and mark it done; the first stored result wins.
+
+        Args:
+            job_id: Completed job
+            worker_id: Worker that produced the result
+            result: JSON-serializable result
+
+        Returns:
+            bool: True if this result was stored, False if the job already had one
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            stored = connection.execute(
+                "INSERT OR IGNORE INTO results (job_id, result, worker_id, completed_at) VALUES (?, ?, ?, ?)",
+                (job_id, json.dumps(result), worker_id, now)
+            ).rowcount == 1
+            connection.execute(
+                "UPDATE jobs SET status = 'done', lease_owner = NULL, lease_expires = NULL, error = NULL, "
+                "updated_at = ? WHERE job_id = ?",
+                (now, job_id)
+            )
+        if not stored:
+            logger.info(f"Job {job_id[:12]} was already completed elsewhere; result discarded")
+        return stored
+
+    def fail(self, job_id: str, worker_id: str, error: str, retry: bool = True) -> bool:
+        """
+        Record a failed attempt, making the job visible again unless it is out of attempts.
+
+        Args:
+            job_id: Failed job
+            worker_id: Worker that held the lease
+            error: Failure description
+            retry: False for permanent failures, which are not retried regardless of attempts
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts FROM jobs WHERE job_id = ? AND lease_owner = ? AND status = 'leased'",
+                (job_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return False  # Lease lost; the current holder decides
+            retry = retry and row[0] < self.max_attempts
+            connection.execute(
+                "UPDATE jobs SET status = ?, lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+                "WHERE job_id = ?",
+                ("queued" if retry else "failed", error, now, job_id)
+            )
+        return retry
+
+    def release(self, job_id: str, worker_id: str) -> None:
+        """Return a leased job to the queue without counting the attempt (e.g. on shutdown)."""
+        with self._transaction() as connection:
+            connection.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), lease_owner = NULL, "
+                "lease_expires = NULL, updated_at = ? WHERE job_id = ? AND lease_owner = ? AND status = 'leased'",
+                (time.time(), job_id, worker_id)
+            )
+
+    def has_result(self, job_id: str) -> bool:
+        """True if a result is stored for the job."""
+        return self._connection().execute(
+            "SELECT 1 FROM results WHERE job_id = ?", (job_id,)
+        ).fetchone() is not None
+
+    def results(self) -> Iterator[Dict[str, Any]]:
+        """Yield stored results in completion order."""
+        cursor = self._connection().execute("SELECT result FROM results ORDER BY completed_at")
+        for (result,) in cursor:
+            yield json.loads(result)
+
+    def failures(self) -> Dict[str, Optional[str]]:
+        """Return the last error of every failed job."""
+        return dict(self._connection().execute("SELECT job_id, error FROM jobs WHERE status = 'failed'"))
+
+    def stats(self) -> Dict[str, int]:
+        """Return job counts by status, plus the number of stored results."""
+        connection = self._connection()
+        counts = dict(connection.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+        stats = {status: counts.get(status, 0) for status in self.STATUSES}
+        stats["results"] = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+        return stats
+
+    def pending(self) -> int:
+        """Number of jobs not yet done or failed."""
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')"
+        ).fetchone()[0]
@@ -0,0 +1,433 @@
+"""
+Worker processes for distributed resume analysis.
+
+A single Streamlit process bounds batch throughput, so batches can instead
+be put on a shared WorkQueue and processed by any number of worker
+processes, on one machine or on several sharing a filesystem. Each worker
+leases jobs, runs the same pipeline as the app (ingest and extract, local
+scoring cascade, render only when the LLM needs a page image, LLM call) and
+writes results back idempotently. Leases are renewed by a heartbeat thread;
+if a worker dies its jobs are re-leased once their visibility timeout
+passes. Jobs are independent, so throughput grows with the number of
+workers until the AI service's rate limit is reached. Near-duplicate
+resumes are only known across the whole queue, so they are flagged in a
+duplicate_of column when the results are exported.
+
+Usage:
+    python -m src.worker enqueue --manifest requests.jsonl [--queue work_queue.db]
+    python -m src.worker run [--queue work_queue.db] [--threads 4] [--backend local] [--exit-when-empty]
+    python -m src.worker status [--queue work_queue.db]
+    python -m src.worker export --output results.jsonl [--queue work_queue.db]
+
+The manifest has the same format as the one of src.bulk. Resume paths are
+stored as absolute paths, so on several machines the files must be mounted
+at the same location. On network filesystems set WORK_QUEUE_JOURNAL_MODE=DELETE.
+"""
+import os
+import json
+import time
+import socket
+import shutil
+import signal
+import logging
+import base64
+import argparse
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from src.ai_service import GeminiService, PromptManager
+from src.cache import ContentHasher
+from src.compaction import JobDescriptionCompactor
+from src.config import Config
+from src.dedup import DuplicateIndex
+from src.export import ResultsWriter
+from src.ingestion import DocumentIngestor, TextDocument
+from src.map_reduce import LongResumeAnalyzer
+from src.matching import LocalMatcher, ScoringCascade
+from src.rendering import RenderEngine
+from src.utils import PDFValidationError, TextAnalyzer, ValidatedPDF
+from src.work_queue import Job, WorkQueue
+
+logger = logging.getLogger(__name__)
+
+class Worker:
+    """Leases jobs from a WorkQueue and runs the analysis pipeline on them."""
+
+    def __init__(self, queue: WorkQueue, responder: Callable[[list], Optional[str]],
+                 long_resume_analyzer: Optional[LongResumeAnalyzer] = None, worker_id: Optional[str] = None,
+                 threads: int = Config.WORKER_THREADS, heartbeat_interval: float = Config.WORKER_HEARTBEAT_SECONDS,
+                 poll_interval: float = Config.WORKER_POLL_SECONDS):
+        """
+        Initialize the worker.
+
+        Args:
+            queue: Shared work queue
+            responder: Sends content parts (as GeminiService builds them) to the model and returns the response;
+                one with a true text_only attribute (see local_responder) is never sent page images
+            long_resume_analyzer: Digests multi-page PDFs page by page (None to send only the first page)
+            worker_id: Identifier recorded on leases and results (defaults to host:pid)
+            threads: Jobs processed concurrently; LLM calls are I/O bound
+            heartbeat_interval: Seconds between lease renewals (well below the visibility timeout)
+            poll_interval: Seconds to wait when no job is visible
+        """
+        self.queue = queue
+        self.responder = responder
+        self.text_only = getattr(responder, "text_only", False)
+        self.long_resume_analyzer = long_resume_analyzer
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.threads = max(1, threads)
+        self.heartbeat_interval = heartbeat_interval
+        self.poll_interval = poll_interval
+        self.jd_compactor = JobDescriptionCompactor()
+        self.scoring_cascade = ScoringCascade()
+        self._held: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._local = threading.local()
+        self.completed = 0
+        self.failed = 0
+
+    def run(self, exit_when_empty: bool = False) -> Dict[str, int]:
+        """
+        Process jobs until stopped (or, with exit_when_empty, until no job is left anywhere).
+
+        Args:
+            exit_when_empty: Exit once every job is done or failed, including ones leased by other workers
+
+        Returns:
+            Dict[str, int]: Jobs completed and failed by this worker
+        """
+        logger.info(f"Worker {self.worker_id} started with {self.threads} threads")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="worker-heartbeat", daemon=True)
+        heartbeat.start()
+
+        loops = [
+            threading.Thread(target=self._loop, args=(exit_when_empty,), name=f"worker-{index}")
+            for index in range(self.threads)
+        ]
+        for loop in loops:
+            loop.start()
+        for loop in loops:
+            loop.join()
+
+        self._stop.set()
+        heartbeat.join()
+        logger.info(f"Worker {self.worker_id} stopped: {self.completed} completed, {self.failed} failed")
+        return {"completed": self.completed, "failed": self.failed}
+
+    def stop(self) -> None:
+        """Stop leasing new jobs; jobs in progress are finished first."""
+        self._stop.set()
+
+    def _loop(self, exit_when_empty: bool) -> None:
+        try:
+            while not self._stop.is_set():
+                jobs = self.queue.lease(self.worker_id)
+                if not jobs:
+                    # Jobs still leased elsewhere may come back if their worker dies, so keep polling
+                    if exit_when_empty and self.queue.pending() == 0:
+                        return
+                    self._stop.wait(self.poll_interval)
+                    continue
+
+                job = jobs[0]
+                with self._lock:
+                    self._held.add(job.job_id)
+                try:
+                    self._run_job(job)
+                finally:
+                    with self._lock:
+                        self._held.discard(job.job_id)
+        finally:
+            self.queue.close()
+            engine = getattr(self._local, "render_engine", None)
+            if engine is not None:
+                engine.close()
+                shutil.rmtree(engine.output_dir, ignore_errors=True)
+
+    def _run_job(self, job: Job) -> None:
+        try:
+            result = self.process(job)
+        except PDFValidationError as e:
+            # The same input fails the same way every time, so it is not retried
+            self.queue.fail(job.job_id, self.worker_id, str(e), retry=False)
+            self._count("failed")
+            logger.error(f"Job {job.job_id[:12]} rejected: {str(e)}")
+            return
+        except Exception as e:
+            retry = self.queue.fail(job.job_id, self.worker_id, str(e))
+            self._count("failed")
+            logger.error(f"Job {job.job_id[:12]} failed (attempt {job.attempts}, "
+                         f"{'will retry' if retry else 'giving up'}): {str(e)}")
+            return
+
+        self.queue.complete(job.job_id, self.worker_id, result)
+        self._count("completed")
+
+    def _count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stop.wait(self.heartbeat_interval):
+            with self._lock:
+                held = list(self._held)
+            try:
+                extended = self.queue.heartbeat(self.worker_id, held)
+            except Exception as e:
+                logger.error(f"Heartbeat failed: {str(e)}")
+                continue
+            for job_id in set(held) - set(extended):
+                # Its result is discarded on completion if the new holder stores one first
+                logger.warning(f"Lost the lease on job {job_id[:12]}")
+        self.queue.close()
+
+    def process(self, job: Job) -> Dict[str, Any]:
+        """
+        Run the analysis pipeline for one job.
+
+        Args:
+            job: Leased job whose payload has 'resume', 'job_description' and 'prompt_type'
+
+        Returns:
+            Dict[str, Any]: Result row (ResultsWriter fields)
+
+        Raises:
+            PDFValidationError: If the resume is rejected
+            RuntimeError: If the AI service gave no response
+        """
+        payload = job.payload
+        prompt_type = payload.get("prompt_type", "matching")
+        timings = {}
+
+        started = time.perf_counter()
+        with open(payload["resume"], "rb") as resume_file:
+            document = DocumentIngestor.ingest(resume_file)
+        profile = DocumentIngestor.profile(document)
+        compacted_jd = self.jd_compactor.compact(payload["job_description"])
+        timings["extract"] = round(time.perf_counter() - started, 3)
+
+        image_only = (isinstance(document, ValidatedPDF)
+                      and len(profile.full_text.strip()) < Config.BULK_MIN_TEXT_CHARS)
+        decision = None
+        if prompt_type == "matching" and not image_only:
+            # Keyword screening of a resume without a text layer would reject it as a clear mismatch
+            decision = self.scoring_cascade.decide(profile.full_text, compacted_jd.text)
+
+        started = time.perf_counter()
+        if decision and Config.CASCADE_ENABLED and not decision.escalate:
+            response = decision.local.to_ats_response(
+                note=f"Resolved by local keyword screening as a clear "
+                     f"{'match' if decision.verdict == 'strong' else 'mismatch'}."
+            )
+        else:
+            response = self.responder(self._content_parts(document, profile.prompt_text(prompt_type), image_only,
+                                                          payload["resume"], compacted_jd.text,
+                                                          PromptManager.get_prompt(prompt_type)))
+            if not response:
+                raise RuntimeError("The AI service returned no response")
+            if decision:
+                self.scoring_cascade.log_llm_score(decision.local.score,
+                                                   TextAnalyzer.extract_match_percentage(response),
+                                                   decision.local.jd_skills, decision.audit)
+        timings["analyze"] = round(time.perf_counter() - started, 3)
+
+        return {
+            "request_id": job.job_id,
+            "resume_hash": document.content_hash,
+            "jd_hash": compacted_jd.cache_key,
+            "prompt_type": prompt_type,
+            "resume_path": payload["resume"],  # Not exported; lets the export find near-duplicates
+            "match_percentage": TextAnalyzer.extract_match_percentage(response) if prompt_type == "matching" else None,
+            "missing_keywords": TextAnalyzer.extract_missing_keywords(response) if prompt_type == "matching" else None,
+            "sections": list(profile.sections),
+            "timings": timings,
+            "response": response
+        }
+
+    def _content_parts(self, document, resume_text: str, image_only: bool, resume_path: str,
+                       job_description: str, prompt: str) -> list:
+        """Build the model request the app would send for this resume (resume_text is sent for text documents)."""
+        if isinstance(document, TextDocument):
+            return [job_description, f"Resume:\n{resume_text}", prompt]
+
+        if self.text_only:
+            # A text-only responder would score the page image as an empty resume
+            if image_only:
+                raise PDFValidationError("The PDF has no text layer and the local backend cannot read page images")
+            return [job_description, f"Resume:\n{resume_text}", prompt]
+
+        if self.long_resume_analyzer and LongResumeAnalyzer.should_use(document.page_count):
+            digests = self.long_resume_analyzer.map_pages(LongResumeAnalyzer.extract_pages(document.data))
+            return [job_description, f"Resume:\n{LongResumeAnalyzer.combine(digests)}", prompt]
+
+        # Rendering is the expensive step, so it only happens for single-page PDFs sent as an image
+        return [job_description, {"mime_type": "image/jpeg", "data": self._render(resume_path)}, prompt]
+
+    def _render(self, resume_path: str) -> str:
+        """Render a PDF's first page in this thread's render process and return it as base64 JPEG."""
+        engine = getattr(self._local, "render_engine", None)
+        if engine is None:
+            # One process per thread: threads render in parallel and a MuPDF crash only fails its own job
+            engine = self._local.render_engine = RenderEngine(max_workers=1)
+
+        result = next(engine.render_files([resume_path]))
+        if not result.ok:
+            raise PDFValidationError(f"The PDF could not be rendered: {result.error}")
+        try:
+            with open(result.image_path, "rb") as image_file:
+                return base64.b64encode(image_file.read()).decode()
+        finally:
+            os.remove(result.image_path)
+
+def local_responder(delay: float = 0.0) -> Callable[[list], str]:
+    """
+    Responder that scores keyword coverage locally, for tests and dry runs.
+
+    It reads text only: Worker sends it the extracted text of PDFs and fails
+    PDFs without a text layer rather than scoring them as empty resumes.
+
+    Args:
+        delay: Seconds to sleep per request, simulating model latency
+
+    Returns:
+        Callable[[list], str]: Responder producing a parseable matching response
+    """
+    def respond(content_parts: list) -> str:
+        if delay:
+            time.sleep(delay)
+        job_description, resume = content_parts[0], content_parts[1]
+        if not isinstance(resume, str):
+            raise ValueError("Page images cannot be scored locally")
+        return LocalMatcher().score(resume[len("Resume:\n"):], job_description).to_ats_response()
+
+    # Worker sends PDFs as their extracted text and fails image-only PDFs instead of sending page images
+    respond.text_only = True
+    return respond
+
+def export_results(queue: WorkQueue, writer: ResultsWriter) -> int:
+    """
+    Write the queue's stored results, flagging near-duplicate resumes.
+
+    Resumes are extracted again one at a time for clustering and only their
+    MinHash signatures are kept, so the export runs in bounded memory.
+
+    Args:
+        queue: Work queue holding the results
+        writer: Destination of the results
+
+    Returns:
+        int: Results written (those already in the output are skipped)
+    """
+    resume_paths: Dict[str, Optional[str]] = {}
+    for result in queue.results():
+        resume_paths.setdefault(result["resume_hash"], result.get("resume_path"))
+
+    def resumes() -> Iterator[Tuple[str, str]]:
+        for resume_hash, resume_path in resume_paths.items():
+            try:
+                with open(resume_path, "rb") as resume_file:
+                    document = DocumentIngestor.ingest(resume_file)
+            except (TypeError, OSError, PDFValidationError):
+                continue  # Moved since it was analyzed (or stored before paths were recorded)
+            if document.content_hash != resume_hash:
+                continue  # Changed since it was analyzed
+            yield resume_hash, DocumentIngestor.profile(document).full_text
+
+    duplicates = DuplicateIndex().cluster(resumes())
+    return sum(
+        writer.append({**result, "duplicate_of": duplicates.get(result["resume_hash"])})
+        for result in queue.results()
+    )
+
+def manifest_jobs(path: str) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Turn a bulk manifest into (job ID, payload) pairs without extracting any text.
+
+    Job IDs default to the session store key of the (resume, job description,
+    prompt type) triple, so enqueueing the same manifest twice adds nothing.
+
+    Args:
+        path: JSONL manifest
+
+    Returns:
+        List[Tuple[str, Dict[str, Any]]]: Jobs in manifest order
+    """
+    jobs = []
+    compactor = JobDescriptionCompactor()
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            resume_path = os.path.abspath(entry["resume"])
+            job_description = entry.get("job_description")
+            if job_description is None:
+                with open(entry["job_description_path"], "r", encoding="utf-8") as jd_file:
+                    job_description = jd_file.read()
+            prompt_type = entry.get("prompt_type", "matching")
+
+            job_id = entry.get("request_id")
+            if job_id is None:
+                with open(resume_path, "rb") as resume_file:
+                    resume_hash = ContentHasher.hash_bytes(resume_file.read())
+                job_id = ContentHasher.combine(resume_hash, compactor.compact(job_description).cache_key, prompt_type)
+
+            jobs.append((str(job_id), {
+                "resume": resume_path,
+                "job_description": job_description,
+                "prompt_type": prompt_type
+            }))
+    return jobs
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(description="Process resume analyses from a shared work queue.")
+    parser.add_argument("--queue", default=Config.WORK_QUEUE_PATH, help="SQLite work queue file")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    enqueue = commands.add_parser("enqueue", help="Add the requests of a manifest to the queue")
+    enqueue.add_argument("--manifest", required=True, help="JSONL file of requests")
+
+    run = commands.add_parser("run", help="Process jobs")
+    run.add_argument("--threads", type=int, default=Config.WORKER_THREADS)
+    run.add_argument("--backend", choices=("gemini", "local"), default="gemini")
+    run.add_argument("--local-delay", type=float, default=0.0, help="Simulated model latency of the local backend")
+    run.add_argument("--exit-when-empty", action="store_true", help="Exit once no job is queued or leased")
+
+    commands.add_parser("status", help="Show job counts")
+
+    export = commands.add_parser("export", help="Write stored results to a file")
+    export.add_argument("--output", required=True, help="Results file (.jsonl, .csv) or Parquet directory")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    queue = WorkQueue(args.queue)
+
+    if args.command == "enqueue":
+        jobs = manifest_jobs(args.manifest)
+        added = sum(queue.enqueue(job_id, payload) for job_id, payload in jobs)
+        logger.info(f"Enqueued {added} of {len(jobs)} jobs ({len(jobs) - added} already queued)")
+
+    elif args.command == "run":
+        if args.backend == "local":
+            responder, analyzer = local_responder(args.local_delay), None
+        else:
+            service = GeminiService()
+            responder, analyzer = service.generate_quietly, LongResumeAnalyzer(service)
+
+        worker = Worker(queue, responder, analyzer, threads=args.threads)
+        # Finish the jobs in progress on Ctrl+C or SIGTERM; a hard kill is covered by lease expiry
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+        worker.run(exit_when_empty=args.exit_when_empty)
+
+    elif args.command == "status":
+        print(json.dumps(queue.stats()))
+
+    elif args.command == "export":
+        with ResultsWriter(args.output) as writer:
+            written = export_results(queue, writer)
+        logger.info(f"Exported {written} results to {args.output}")
+
+if __name__ == "__main__":
+    main()
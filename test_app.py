@@ -119,6 +119,12 @@ def test_utilities():
         percentage = analyzer.extract_match_percentage(sample_text)
         assert percentage == 85, f"Expected 85, got {percentage}"
         
+        # The matching prompt asks for bold markdown headings
+        sample_text = "**Match Percentage**: 72%\n\n**Missing Keywords**: \n- Kubernetes\n- Terraform\n\n**Final Thoughts**: Good"
+        assert analyzer.extract_match_percentage(sample_text) == 72, "Markdown percentage not extracted"
+        keywords = analyzer.extract_missing_keywords(sample_text)
+        assert keywords == ["Kubernetes", "Terraform"], f"Unexpected keywords: {keywords}"
+        
         print("✅ Percentage extraction works correctly")
         
         return True
@@ -181,6 +187,1513 @@ def test_visualization():
         print(f"❌ Visualization test failed: {e}")
         return False
 
+def test_jd_compaction():
+    """Test job description compaction."""
+    print("\n🧪 Testing job description compaction...")
+    
+    from src.compaction import JobDescriptionCompactor
+    
+    job_description = """Senior Python Engineer
+
+About Us
+We are a fast growing startup founded in 2010 with a mission to change the world.
+
+Requirements:
+- 5+ years of Python experience
+- 5+ years of Python experience
+- Experience with Docker and Kubernetes
+
+Benefits
+- Free lunch and a generous 401k match
+
+We are an equal opportunity employer and value diversity at our company.
+"""
+    compactor = JobDescriptionCompactor()
+    compacted = compactor.compact(job_description)
+    
+    assert "Python" in compacted.text, "Requirements were removed"
+    assert "Free lunch" not in compacted.text, "Benefits section was not removed"
+    assert "startup" not in compacted.text, "About section was not removed"
+    assert "equal opportunity" not in compacted.text, "EEO boilerplate was not removed"
+    assert compacted.text.count("5+ years of Python") == 1, "Duplicate requirement was not removed"
+    assert compacted.compacted_tokens < compacted.original_tokens, "Token count did not decrease"
+    
+    print("✅ Boilerplate and duplicates are removed")
+    
+    # The compacted text is the cache key, so boilerplate changes must not alter it
+    reworded = job_description.replace("Free lunch", "Free dinner")
+    assert compactor.compact(reworded).cache_key == compacted.cache_key, "Cache key depends on boilerplate"
+    
+    print("✅ Cache key is stable across boilerplate changes")
+
+def test_resume_parser():
+    """Test resume section parsing and the compact profile format."""
+    print("\n🧪 Testing resume section parser...")
+    
+    from src.resume_parser import ResumeSectionParser, ResumeProfile
+    
+    resume_text = """Jane Doe
+Experience
+Senior Engineer, Acme Corp
+Jan 2020 - Present
+- Built Python services on AWS
+Engineer | Beta Inc | 2016 - 2019
+- Wrote Go microservices
+Skills
+Languages: Python, Go, SQL
+Education
+BSc Computer Science 2012 - 2016
+"""
+    profile = ResumeSectionParser().parse_text(resume_text)
+    
+    assert {"experience", "skills", "education"} <= set(profile.sections), "Sections not detected"
+    assert profile.skills == ["Python", "Go", "SQL"], f"Unexpected skills: {profile.skills}"
+    
+    recent = profile.recent_experience(1)
+    assert recent[0].title == "Senior Engineer, Acme Corp", "Most recent role not first"
+    assert recent[0].start_year == 2020, "Start year not parsed"
+    
+    selected = profile.select_text(("skills",))
+    assert "Python" in selected and "Acme" not in selected, "Section selection failed"
+    
+    print("✅ Sections, skills and dated entries are parsed")
+    
+    restored = ResumeProfile.from_compact(profile.to_compact())
+    assert restored == profile, "Compact representation does not round-trip"
+    
+    print("✅ Compact profile representation round-trips")
+    
+    matching_text = profile.prompt_text("matching")
+    assert "Python" in matching_text and "BSc" not in matching_text, "Matching prompt text not selected"
+    assert "BSc" in profile.prompt_text("analysis"), "Analysis prompt text should be complete"
+    assert ResumeSectionParser().parse_text("Jane Doe\nBuilt things").prompt_text("matching"), \
+        "Resume without sections sent empty"
+    
+    print("✅ Prompts get the sections they need")
+    
+    def line(x0, y0, x1, text):
+        return {"bbox": (x0, y0, x1, y0 + 12), "spans": [{"text": text}]}
+    
+    def order(lines):
+        return [ResumeSectionParser._line_text(item) for item in ResumeSectionParser._reading_order(lines, 612)]
+    
+    two_columns = [
+        line(40, 20, 570, "Jane Doe, Senior Engineer"),
+        line(40, 60, 200, "Skills"), line(330, 60, 570, "Experience"),
+        line(40, 80, 200, "Python, Go"), line(330, 80, 570, "Senior Engineer, Acme"),
+        line(40, 100, 200, "Education"), line(330, 100, 570, "Jan 2020 - Present"),
+        line(40, 120, 200, "BSc 2012 - 2016"), line(330, 124, 570, "Built Python services"),
+    ]
+    assert order(two_columns) == ["Jane Doe, Senior Engineer", "Skills", "Python, Go", "Education", "BSc 2012 - 2016",
+                                  "Experience", "Senior Engineer, Acme", "Jan 2020 - Present",
+                                  "Built Python services"], \
+        f"Two-column layout read across columns: {order(two_columns)}"
+    dated_rows = [
+        line(40, 60, 300, "Senior Engineer, Acme"), line(480, 60, 570, "2020 - Present"),
+        line(40, 80, 300, "Engineer, Beta"), line(480, 80, 570, "2016 - 2019"),
+    ]
+    assert order(dated_rows) == ["Senior Engineer, Acme", "2020 - Present", "Engineer, Beta", "2016 - 2019"], \
+        f"Right-aligned dates were read as a column: {order(dated_rows)}"
+    
+    print("✅ PDF text is read column by column, keeping right-aligned dates on their line")
+
+def test_upload_validation():
+    """Test early rejection of bad uploads."""
+    print("\n🧪 Testing upload validation...")
+    
+    import io
+    from src.config import Config
+    from src.utils import PDFProcessor, PDFValidationError
+    
+    class FakeUpload(io.BytesIO):
+        def __init__(self, data, name):
+            super().__init__(data)
+            self.name = name
+            self.size = len(data)
+    
+    rejected = [
+        (b"not a pdf at all" * 100, "resume.pdf"),
+        (b"%PDF-1.7", "resume.docx"),
+        (b"", "resume.pdf"),
+        (b"%PDF-1.7" + b"0" * Config.MAX_FILE_SIZE, "resume.pdf"),
+    ]
+    for data, name in rejected:
+        try:
+            PDFProcessor.inspect_pdf(FakeUpload(data, name))
+            raise AssertionError(f"{name} ({len(data)} bytes) was not rejected")
+        except PDFValidationError:
+            pass
+    
+    print("✅ Wrong types, empty, oversized and non-PDF uploads are rejected")
+
+def test_document_ingestion():
+    """Test text extraction from DOCX, TXT, Markdown and RTF uploads."""
+    print("\n🧪 Testing document ingestion...")
+    
+    import io
+    import zipfile
+    from PIL import Image
+    from src.config import Config
+    from src.ingestion import DocumentIngestor, DocumentValidationError, TextDocument, TextPreview
+    
+    class FakeUpload(io.BytesIO):
+        def __init__(self, data, name):
+            super().__init__(data)
+            self.name = name
+            self.size = len(data)
+    
+    def docx(paragraphs):
+        namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+        body = "".join(f"<w:p><w:r><w:t>{text}</w:t></w:r></w:p>" for text in paragraphs)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("word/document.xml",
+                             f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+        return buffer.getvalue()
+    
+    uploads = {
+        "resume.txt": "Jane Doe\nSkills\nPython, Docker, AWS\nExperience\nEngineer 2020 - Present".encode("utf-16"),
+        "resume.md": b"# Jane Doe\n\n## Skills\n* **Python**, Docker, AWS\n\n## Experience\n"
+                     b"Engineer at [Acme](https://acme.example) 2020 - Present\n",
+        "resume.docx": docx(["Jane Doe", "Skills", "Python, Docker, AWS", "Experience", "Engineer 2020 - Present"]),
+        "resume.rtf": b"{\\rtf1\\ansi{\\fonttbl{\\f0 Arial;}}\\f0 Jane Doe\\par Skills\\par "
+                      b"Python, Docker, AWS\\par Experience\\par Engineer 2020 \\endash  Present\\par}",
+    }
+    for name, data in uploads.items():
+        document = DocumentIngestor.ingest(FakeUpload(data, name))
+        assert isinstance(document, TextDocument), f"{name} was not read as text"
+        assert "Python, Docker, AWS" in document.text, f"{name}: {document.text!r}"
+        assert not any(mark in document.text for mark in ("#", "**", "](", "\\par")), f"{name}: {document.text!r}"
+        profile = DocumentIngestor.profile(document)
+        assert "skills" in profile.sections and "experience" in profile.sections, f"{name}: {list(profile.sections)}"
+    
+    print("✅ DOCX, TXT, Markdown and RTF resumes are parsed into profiles without rendering")
+    
+    original_limit = Config.MAX_DOCX_XML_BYTES
+    Config.MAX_DOCX_XML_BYTES = 100
+    rejected = [
+        (docx(["x" * 1000]), "resume.docx"),
+        (b"PK not really a zip", "resume.docx"),
+        (b"plain text", "resume.rtf"),
+        (b"\x00\x01\x02binary", "resume.txt"),
+        (b"   \n\n", "resume.md"),
+        (b"text", "resume.exe"),
+    ]
+    try:
+        for data, name in rejected:
+            try:
+                DocumentIngestor.ingest(FakeUpload(data, name))
+                raise AssertionError(f"{name} ({data[:20]!r}) was not rejected")
+            except DocumentValidationError:
+                pass
+    finally:
+        Config.MAX_DOCX_XML_BYTES = original_limit
+    
+    print("✅ Oversized, corrupt, binary, empty and unsupported documents are rejected")
+    
+    preview = TextPreview.get("preview-hash", "Jane Doe\n" + "Python developer with ten years of experience. " * 200)
+    assert TextPreview.get("preview-hash", "") is preview, "Preview was rendered twice"
+    with Image.open(io.BytesIO(preview)) as image:
+        assert image.format == "JPEG" and image.width == Config.PREVIEW_THUMBNAIL_WIDTH, "Bad preview image"
+    # Bullets, dashes and non-Latin names are common in resumes and must not break the preview
+    assert TextPreview.render("José Müller — Engineer\n• Built APIs\n• 東京 office")[:2] == b"\xff\xd8"
+    
+    print("✅ Text previews are rendered once and cached")
+
+def test_render_engine():
+    """Test the process-pool render engine's ordering and error isolation."""
+    print("\n🧪 Testing render engine...")
+    
+    import tempfile
+    from src.rendering import RenderEngine
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = []
+        for name, data in [("empty.pdf", b""), ("text.pdf", b"plain text"), ("broken.pdf", b"%PDF-1.4 garbage")]:
+            path = os.path.join(tmp_dir, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+        
+        with RenderEngine(max_workers=2, output_dir=tmp_dir) as engine:
+            results = list(engine.render_files(paths))
+        
+        assert [r.index for r in results] == [0, 1, 2], "Results are not in input order"
+        assert all(not r.ok for r in results), "Invalid PDFs were rendered"
+    
+    print("✅ Invalid files fail individually and results keep input order")
+    
+    # Render workers apply the same structure checks as uploads
+    import fitz
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "locked.pdf")
+        with fitz.open() as pdf_doc:
+            pdf_doc.new_page()
+            pdf_doc.save(path, encryption=fitz.PDF_ENCRYPT_AES_256, owner_pw="owner", user_pw="user")
+        
+        with RenderEngine(max_workers=1, output_dir=tmp_dir) as engine:
+            result = next(engine.render_files([path]))
+        assert not result.ok and "password protected" in result.error, f"Encrypted PDF was rendered: {result}"
+    
+    print("✅ Render workers reject PDFs that fail the upload checks")
+    
+    # Before Python 3.11 workers are recycled by replacing the pool once it has run its share of tasks
+    import src.rendering as rendering
+    from src.config import Config
+    original = rendering._NATIVE_RECYCLING, Config.RENDER_MAX_TASKS_PER_CHILD
+    rendering._NATIVE_RECYCLING, Config.RENDER_MAX_TASKS_PER_CHILD = False, 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "text.pdf")
+            with open(path, "wb") as f:
+                f.write(b"plain text")
+            
+            with RenderEngine(max_workers=1, output_dir=tmp_dir) as engine:
+                pools = []
+                new_executor = engine._new_executor
+                engine._new_executor = lambda workers: pools.append(workers) or new_executor(workers)
+                results = list(engine.render_files([path] * 5))
+        
+        assert [r.index for r in results] == list(range(5)), "Recycling lost or reordered tasks"
+        assert len(pools) == 3, f"Expected the pool to be replaced twice, got {len(pools)} pools"
+    finally:
+        rendering._NATIVE_RECYCLING, Config.RENDER_MAX_TASKS_PER_CHILD = original
+    
+    print("✅ Render workers are recycled without max_tasks_per_child")
+
+def test_session_store():
+    """Test session-scoped result persistence."""
+    print("\n🧪 Testing session result store...")
+    
+    from src.session_store import SessionResultStore, AnalysisResult
+    
+    state = {}
+    store = SessionResultStore(state=state, max_entries=2, max_bytes=10 * 1024)
+    
+    def make_result(prompt_type, size=100):
+        key = SessionResultStore.make_key("resume", "jd", prompt_type)
+        return AnalysisResult(key=key, prompt_type=prompt_type, response="ok",
+                              preview_jpeg=b"x" * size, resume_hash="resume", jd_hash="jd")
+    
+    analysis = make_result('analysis')
+    store.put(analysis)
+    store.activate(analysis.key)
+    
+    # A new store over the same state simulates a Streamlit rerun
+    rerun_store = SessionResultStore(state=state)
+    assert rerun_store.active() is analysis, "Active result did not survive rerun"
+    
+    print("✅ Results survive reruns")
+    
+    store.put(make_result('improvement'))
+    store.put(make_result('matching'))
+    assert store.get(analysis.key) is None, "Entry cap was not enforced"
+    
+    store.put(make_result('analysis', size=20 * 1024))
+    assert store.get(analysis.key) is None, "Byte cap was not enforced"
+    
+    print("✅ Per-session entry and memory caps are enforced")
+    
+    base = " ".join(f"Built service {i} in Python and Django on AWS for team {i % 7}." for i in range(60))
+    store = SessionResultStore(state={})
+    assert store.find_near_duplicate("original", "jd", "matching", base) is None, "New resume reused a result"
+    original = AnalysisResult(key=SessionResultStore.make_key("original", "jd", "matching"), prompt_type="matching",
+                              response="ok", preview_jpeg=b"", resume_hash="original", jd_hash="jd")
+    store.put(original)
+    
+    reexported = base.replace("team 3.", "team 3,")
+    assert store.find_near_duplicate("reexported", "jd", "matching", reexported) is original, \
+        "Re-exported resume did not reuse its result"
+    assert store.find_near_duplicate("reexported", "other-jd", "matching", reexported) is None, \
+        "A result for another job description was reused"
+    edited = base.replace("Django", "Flask")
+    assert store.find_near_duplicate("edited", "jd", "matching", edited) is None, "Edited resume reused a result"
+    assert SessionResultStore(state={}).find_near_duplicate("reexported", "jd", "matching", reexported) is None, \
+        "Another session's result was reused"
+    
+    print("✅ Near-identical resumes reuse results within their session only")
+
+def test_memory_accounting():
+    """Test process-wide memory accounting across sessions."""
+    print("\n🧪 Testing memory accounting...")
+    
+    import io
+    import gc
+    import random
+    from PIL import Image
+    from src.memory import MemoryAccountant
+    from src.session_store import SessionResultStore, AnalysisResult
+    
+    # A noisy render-sized preview compresses poorly, like a real resume page
+    rng = random.Random(0)
+    image = Image.frombytes("L", (1200, 1600), bytes(rng.getrandbits(8) for _ in range(1200 * 1600)))
+    buffer = io.BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=85)
+    preview = buffer.getvalue()
+    
+    accountant = MemoryAccountant(process_budget=int(len(preview) * 2.5))
+    
+    def make_result(prompt_type, resume):
+        key = SessionResultStore.make_key(resume, "jd", prompt_type)
+        return AnalysisResult(key=key, prompt_type=prompt_type, response="ok",
+                              preview_jpeg=preview, resume_hash=resume, jd_hash="jd")
+    
+    first = SessionResultStore(state={}, session_id="first", accountant=accountant)
+    second = SessionResultStore(state={}, session_id="second", accountant=accountant)
+    first.put(make_result('analysis', "a"))
+    first.put(make_result('matching', "a"))
+    assert accountant.stats()["downgrades"] == 0, "Downgraded while under budget"
+    
+    second.put(make_result('analysis', "b"))
+    assert accountant.total_bytes() <= accountant.process_budget, "Process budget not enforced"
+    assert accountant.stats()["downgrades"] >= 1, "Previews were not downgraded first"
+    assert accountant.stats()["evictions"] == 0, "Evicted although downgrading was enough"
+    
+    print("✅ Previews are downgraded to thumbnails under memory pressure")
+    
+    # With room for only a couple of thumbnails, eviction has to free memory
+    accountant.process_budget = 150 * 1024
+    second.put(make_result('improvement', "b"))
+    assert accountant.total_bytes() <= accountant.process_budget, "Process budget not enforced"
+    assert accountant.stats()["evictions"] >= 1, "Nothing was evicted"
+    
+    # Ending a session releases its accounting
+    del first
+    gc.collect()
+    assert accountant.stats()["sessions"] == 1, "Ended session is still accounted"
+    
+    print("✅ Least recently used results are evicted across sessions")
+    
+    # Process-wide caches count toward the budget and are evicted from too
+    from src.cache import LRUCache
+    import src.ingestion, src.map_reduce  # noqa: F401 - importing registers their caches
+    shared = MemoryAccountant.get().stats()
+    assert all(f"shared_{name}_bytes" in shared for name in ("profiles", "page_digests", "text_previews")), \
+        f"Shared caches not registered: {shared}"
+    
+    digests = LRUCache(max_entries=10, max_bytes=len(preview) * 4)
+    accountant.register_shared("digests", digests)
+    digests.put("old", preview)
+    digests.put("new", preview)
+    second.put(make_result('analysis', "c"))
+    assert accountant.stats()["shared_digests_bytes"] <= len(preview), "Shared cache not evicted over budget"
+    assert accountant.total_bytes() <= accountant.process_budget, "Process budget not enforced"
+    
+    # A value that grows in place still respects the cache's own bound
+    bounded = LRUCache(max_entries=10, max_bytes=10)
+    bounded.put("a", b"12345")
+    bounded.put("b", b"12345")
+    bounded.replace("b", b"123456789")
+    assert bounded.total_bytes <= 10 and "a" not in bounded, "Grown entry did not evict"
+    
+    print("✅ Shared caches are accounted and grown entries evict")
+
+def test_request_profiler():
+    """Test on-demand request profiling."""
+    print("\n🧪 Testing request profiler...")
+    
+    import os
+    import json
+    import time
+    import shutil
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from src.config import Config
+    from src.profiling import RequestProfiler, RequestTag
+    
+    def busy_handler():
+        end = time.monotonic() + 0.2
+        while time.monotonic() < end:
+            sum(range(1000))
+    
+    original = (Config.PROFILE_ENABLED, Config.PROFILE_ADMIN_TOKEN, Config.PROFILE_SAMPLE_RATE)
+    Config.PROFILE_ENABLED, Config.PROFILE_ADMIN_TOKEN, Config.PROFILE_SAMPLE_RATE = False, "secret", 0.0
+    
+    try:
+        with tempfile.TemporaryDirectory() as output_dir:
+            with RequestProfiler("matching", admin_token="wrong", output_dir=output_dir) as profiler:
+                busy_handler()
+            assert not profiler.enabled and not os.listdir(output_dir), "Profiled without a valid token"
+            
+            with RequestProfiler("matching", metadata={"prompt_type": "matching"},
+                                 admin_token="secret", output_dir=output_dir) as profiler:
+                busy_handler()
+            
+            with open(profiler.profile_path) as handle:
+                folded = handle.read()
+            assert "busy_handler" in folded, "Handler frames missing from profile"
+            assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines()), "Not collapsed format"
+            
+            with open(profiler.profile_path[:-len(".folded")] + ".json") as handle:
+                metadata = json.load(handle)
+            assert metadata["trigger"] == "admin" and metadata["prompt_type"] == "matching"
+            assert metadata["samples"] > 0, "No samples recorded"
+            
+            print("✅ Admin-triggered profile saved as collapsed stacks with metadata")
+            
+            def pool_task():
+                busy_handler()
+                return True
+            
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                with RequestProfiler("matching", admin_token="secret",
+                                     output_dir=os.path.join(output_dir, "pool")) as profiler:
+                    assert executor.submit(RequestTag.propagate(pool_task)).result()
+                untagged = executor.submit(pool_task)
+                assert untagged.result() and not RequestTag.threads(RequestTag.get()), "Thread tag leaked"
+            
+            with open(profiler.profile_path) as handle:
+                folded = handle.read()
+            assert "pool_task" in folded, "Executor work of the request missing from profile"
+            assert "thread:ThreadPoolExecutor" in folded, "Pool thread not identified in profile"
+            
+            shutil.rmtree(os.path.dirname(profiler.profile_path))
+            print("✅ Executor threads working for the request are sampled")
+            
+            for _ in range(3):
+                with RequestProfiler("analysis", admin_token="secret", output_dir=output_dir):
+                    pass
+            assert RequestProfiler.prune(output_dir, max_files=2) == 2, "Retention limit not applied"
+            assert len(os.listdir(output_dir)) == 4, "Metadata files not pruned with profiles"
+            
+            print("✅ Profile retention is enforced")
+    finally:
+        Config.PROFILE_ENABLED, Config.PROFILE_ADMIN_TOKEN, Config.PROFILE_SAMPLE_RATE = original
+
+def test_duplicate_detection():
+    """Test near-duplicate resume detection."""
+    print("\n🧪 Testing near-duplicate detection...")
+    
+    from PIL import Image, ImageDraw
+    from src.dedup import DuplicateIndex
+    
+    base = " ".join(
+        f"Built service {i} in Python with Django and PostgreSQL, deployed on AWS with Docker for team {i % 7}."
+        for i in range(40)
+    )
+    edited = base.replace("service 12 ", "services 12 ").replace("team 3.", "team 3, on call.")
+    other = " ".join(f"Managed retail store {i}, handled inventory, staff schedules and sales targets." for i in range(40))
+    
+    index = DuplicateIndex()
+    assert index.find_or_add("original", base) is None, "First resume flagged as duplicate"
+    match = index.find_or_add("edited", edited)
+    assert match and match.key == "original" and match.method == "text", f"Edited copy not detected: {match}"
+    assert index.find_or_add("other", other) is None, "Different resume flagged as duplicate"
+    
+    print(f"✅ Edited re-export detected ({match.similarity:.0%} similar), different resume not")
+    
+    def page(shift=0, title="Jane Doe"):
+        image = Image.new("RGB", (600, 800), "white")
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((40 + shift, 40, 560, 120), fill="black")
+        draw.text((60, 60), title, fill="white")
+        for row in range(12):
+            draw.rectangle((40, 160 + row * 50, 200 + (row * 97) % 360, 180 + row * 50), fill="gray")
+        return image
+    
+    index.add("scan", image=page())
+    match = index.find(image=page(shift=2).resize((590, 790)))
+    assert match and match.key == "scan" and match.method == "image", f"Re-scanned page not detected: {match}"
+    
+    blank = Image.new("RGB", (600, 800), "white")
+    ImageDraw.Draw(blank).rectangle((300, 0, 600, 800), fill="black")
+    assert index.find(image=blank) is None, "Different page flagged as duplicate"
+    
+    print("✅ Image-only resumes matched by perceptual hash")
+    
+    duplicates = DuplicateIndex().cluster([("a", base), ("b", other), ("c", edited), ("d", base)])
+    assert duplicates == {"c": "a", "d": "a"}, f"Unexpected batch clusters: {duplicates}"
+    
+    print("✅ Batch runs flag near-duplicates")
+
+def test_map_reduce():
+    """Test map-reduce analysis of multi-page resumes."""
+    print("\n🧪 Testing map-reduce analysis...")
+    
+    from src.config import Config
+    from src.map_reduce import LongResumeAnalyzer, ResumePage
+    
+    class FakeService:
+        def __init__(self):
+            self.digests = []
+            self.final_calls = []
+        
+        def generate_page_digest(self, prompt, page_text=None, page_image=None):
+            self.digests.append(page_image or page_text)
+            return "Transcribed: AWS Certified" if page_image else "Summary: Python, Kubernetes"
+        
+        def generate_text_response(self, job_description, resume_text, prompt, fallback=None):
+            self.final_calls.append(resume_text)
+            return "**Match Percentage**: 80%"
+    
+    service = FakeService()
+    analyzer = LongResumeAnalyzer(service)
+    long_text = "Led platform team, Python and Kubernetes. " * (Config.MAPREDUCE_PAGE_CHARS // 40 + 10)
+    pages = [
+        ResumePage(1, "Jane Doe\nSenior Engineer 2019 - Present", "hash-short"),
+        ResumePage(2, long_text, "hash-long"),
+        ResumePage(3, "", "hash-scan", image_base64="c2Nhbg=="),
+    ]
+    
+    digests = analyzer.map_pages(pages)
+    assert [d.method for d in digests] == ["text", "summary", "transcription"], f"Unexpected: {digests}"
+    assert len(service.digests) == 2, "Short text pages should not need an LLM call"
+    
+    response = analyzer.reduce("Python role", digests, "prompt")
+    assert response and len(service.final_calls) == 1, "Final prompt should run exactly once"
+    combined = service.final_calls[0]
+    assert "[Page 1]" in combined and "Summary: Python" in combined and "AWS Certified" in combined
+    
+    print("✅ Pages digested in parallel and reduced with one final call")
+    
+    # Resubmission with one changed page only reprocesses that page
+    service.digests.clear()
+    pages[1] = ResumePage(2, long_text + " Terraform.", "hash-long-edited")
+    digests = analyzer.map_pages(pages)
+    assert len(service.digests) == 1, f"Expected one new digest, got {len(service.digests)}"
+    assert [d.cached for d in digests] == [True, False, True], "Unchanged pages not served from cache"
+    
+    print("✅ Unchanged pages reuse cached digests")
+
+def test_speculative_pipeline():
+    """Test speculative preprocessing and matching prefetch."""
+    print("\n🧪 Testing speculative preprocessing...")
+    
+    import io
+    from src.config import Config
+    from src.compaction import JobDescriptionCompactor
+    from src.map_reduce import LongResumeAnalyzer
+    from src.matching import LocalMatcher, ScoringCascade
+    from src.resume_parser import ProfileCache, ResumeSectionParser
+    from src.speculation import SpeculativePipeline, PreparedResume
+    from src.utils import ValidatedPDF
+    
+    class Upload(io.BytesIO):
+        def __init__(self, data, name):
+            super().__init__(data)
+            self.name, self.size = name, len(data)
+    
+    class FakeService:
+        def __init__(self):
+            self.prefetches = []
+        
+        def prefetch_response(self, job_description, pdf_content, prompt):
+            self.prefetches.append(job_description)
+            return f"**Match Percentage**: 70% for {job_description[:20]}"
+    
+    service = FakeService()
+    cascade = ScoringCascade(LocalMatcher(), reject_below=0, accept_above=101, log_path=None)
+    pipeline = SpeculativePipeline(service, JobDescriptionCompactor(), cascade,
+                                   LongResumeAnalyzer(service), state={})
+    
+    upload = Upload(b"not a resume", "resume.exe")
+    pipeline.on_inputs("", upload)
+    prepared = pipeline.prepared_resume(upload)
+    assert prepared.error == "Please upload a PDF, DOCX, TXT, Markdown or RTF file.", f"Unexpected: {prepared.error}"
+    
+    from src.ingestion import DocumentIngestor
+    original_ingest = DocumentIngestor.__dict__["ingest"]
+    DocumentIngestor.ingest = classmethod(lambda cls, uploaded_file: 1 / 0)
+    try:
+        upload = Upload(b"%PDF-broken", "broken.pdf")
+        pipeline.on_inputs("", upload)
+        prepared = pipeline.prepared_resume(upload)
+        assert prepared.error and prepared.error.startswith("Error processing file"), f"Unexpected: {prepared.error}"
+    finally:
+        DocumentIngestor.ingest = original_ingest
+    
+    print("✅ Uploads are validated in the background")
+    
+    text = "Skills\nPython, Docker, AWS\nExperience\nEngineer 2020 - Present"
+    validated = ValidatedPDF("resume.pdf", b"%PDF-", "resume-hash", 1)
+    ProfileCache.put(ResumeSectionParser().parse_text(text, "resume-hash"))
+    original_prepare = SpeculativePipeline.__dict__["_prepare"]
+    SpeculativePipeline._prepare = staticmethod(
+        lambda key, name, data: PreparedResume(key, validated, b"jpeg")
+    )
+    original_prefetch = Config.SPECULATIVE_PREFETCH
+    original_debounce = Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS
+    Config.SPECULATIVE_PREFETCH = True
+    Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS = 0
+    
+    try:
+        upload = Upload(b"%PDF-", "resume.pdf")
+        first_jd = JobDescriptionCompactor().compact("Python developer with Kubernetes")
+        pipeline.on_inputs("Python developer with Kubernetes", upload)
+        pipeline._slots["prefetch"].result(timeout=5)
+        response = pipeline.prefetched_response("resume-hash", first_jd.cache_key)
+        assert response and len(service.prefetches) == 1, "Matching was not prefetched"
+        
+        pipeline.on_inputs("Python developer with Kubernetes", upload)
+        assert len(service.prefetches) == 1, "Unchanged inputs prefetched twice"
+        
+        print("✅ Matching is prefetched once for stable inputs")
+        
+        second_jd = JobDescriptionCompactor().compact("Go developer with Terraform")
+        pipeline.on_inputs("Go developer with Terraform", upload)
+        pipeline._slots["prefetch"].result(timeout=5)
+        assert pipeline.prefetched_response("resume-hash", first_jd.cache_key) is None, "Stale prefetch used"
+        assert pipeline.prefetched_response("resume-hash", second_jd.cache_key), "New inputs not prefetched"
+        
+        print("✅ Changed inputs replace the outdated prefetch")
+        
+        # Inputs still being edited never reach the model, and a click cancels a prefetch not yet sent
+        Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS = 0.5
+        prefetches = len(service.prefetches)
+        pipeline.on_inputs("Rust developer with gRPC", upload)
+        editing = pipeline._slots["prefetch"]
+        pipeline.on_inputs("Rust developer with gRPC and Kafka", upload)
+        assert editing.cancelled() or editing.result(timeout=5) is None, "Superseded prefetch was not cancelled"
+        pipeline._slots["prefetch"].result(timeout=5)
+        assert service.prefetches[prefetches:] == [
+            JobDescriptionCompactor().compact("Rust developer with gRPC and Kafka").text
+        ], f"Unstable inputs were prefetched: {service.prefetches[prefetches:]}"
+        
+        Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS = 5
+        clicked_jd = JobDescriptionCompactor().compact("Java developer with Spring")
+        pipeline.on_inputs("Java developer with Spring", upload)
+        pending = pipeline._slots["prefetch"]
+        assert pipeline.prefetched_response("resume-hash", clicked_jd.cache_key) is None
+        assert (pending.cancelled() or pending.result(timeout=1) is None) and len(service.prefetches) == prefetches + 1, \
+            "Click waited for or sent a debouncing prefetch"
+        Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS = 0
+        
+        print("✅ Prefetches are debounced and cancelled before their model call")
+        
+        # A click does queued preprocessing itself instead of waiting behind other speculative work
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        busy = threading.Event()
+        pipeline._executor = ThreadPoolExecutor(max_workers=1)
+        pipeline._executor.submit(busy.wait, 5)
+        Config.SPECULATIVE_PREFETCH = False
+        upload = Upload(b"%PDF-1", "other.pdf")
+        pipeline.on_inputs("Go developer with Terraform", upload)
+        queued = pipeline._slots["resume"]
+        prepared = pipeline.prepared_resume(upload)
+        assert queued.cancelled() and prepared.validated is validated, "Click waited for queued preprocessing"
+        assert pipeline.prepared_resume(upload) is prepared, "Inline result was not kept for the session"
+        busy.set()
+        pipeline._executor.shutdown()
+        assert SpeculativePipeline._prefetch_executor is not SpeculativePipeline._executor, \
+            "Prefetches share threads with preprocessing"
+        
+        print("✅ Queued speculative work is cancelled and done inline on click")
+    finally:
+        Config.SPECULATIVE_PREFETCH = original_prefetch
+        Config.SPECULATION_PREFETCH_DEBOUNCE_SECONDS = original_debounce
+        SpeculativePipeline._prepare = original_prepare
+
+def test_admission_control():
+    """Test process-wide admission control and load shedding."""
+    print("\n🧪 Testing admission control...")
+    
+    import time
+    import threading
+    from src.admission import AdmissionController, AdmissionRejected
+    
+    controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=5, metrics_path=None)
+    release = threading.Event()
+    started = threading.Event()
+    order, positions = [], {}
+    
+    def holder():
+        with controller.admit():
+            started.set()
+            release.wait(5)
+    
+    def waiter(name):
+        with controller.admit(on_wait=lambda position: positions.setdefault(name, []).append(position)):
+            order.append(name)
+    
+    threads = [threading.Thread(target=holder)]
+    threads[0].start()
+    started.wait(5)
+    for name in ("first", "second"):
+        threads.append(threading.Thread(target=waiter, args=(name,)))
+        threads[-1].start()
+        while controller.stats()["waiting"] < len(threads) - 1:
+            time.sleep(0.01)
+    
+    try:
+        with controller.admit():
+            pass
+        raise AssertionError("Request admitted past the queue limit")
+    except AdmissionRejected:
+        pass
+    
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    
+    assert order == ["first", "second"], f"Queue is not FIFO: {order}"
+    assert positions["first"][0] == 1 and positions["second"][0] == 2, f"Unexpected positions: {positions}"
+    
+    print("✅ Waiting requests are admitted in order and see their position")
+    
+    stats = controller.stats()
+    assert stats["shed"] == 1 and stats["admitted"] == 3 and stats["running"] == 0, f"Unexpected stats: {stats}"
+    metrics = controller.prometheus()
+    assert "# TYPE ats_admission_shed_total counter" in metrics and "ats_admission_shed_total 1" in metrics
+    
+    timeout_controller = AdmissionController(max_concurrent=0, max_queue=1, max_wait=0.05, metrics_path=None)
+    try:
+        with timeout_controller.admit():
+            pass
+        raise AssertionError("Request admitted without a free slot")
+    except AdmissionRejected:
+        assert timeout_controller.stats()["timed_out"] == 1
+    
+    print("✅ Load is shed past the queue limit and after long waits, with metrics exported")
+    
+    # A waiter interrupted while queued (Streamlit stops the script on a new click) leaves the line
+    class Stopped(Exception):
+        pass
+    
+    def interrupted(position):
+        raise Stopped()
+    
+    controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=2, metrics_path=None)
+    with controller.admit():
+        try:
+            with controller.admit(on_wait=interrupted):
+                pass
+            raise AssertionError("Interrupted waiter was admitted")
+        except Stopped:
+            pass
+    assert controller.stats()["waiting"] == 0, "Interrupted waiter left its ticket in the queue"
+    
+    started = time.monotonic()
+    with controller.admit():
+        pass
+    assert time.monotonic() - started < 1, "Request waited behind an abandoned ticket"
+    
+    print("✅ Interrupted waiters leave the queue")
+    
+    # Waiters are polled on every tick, and model calls made inside waiting() report to its callback
+    controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait=2, metrics_path=None, poll_interval=0.01)
+    ticks = []
+    release = threading.Event()
+    def hold():
+        with controller.admit():
+            release.wait(5)
+    
+    holder_thread = threading.Thread(target=hold)
+    holder_thread.start()
+    while controller.stats()["running"] < 1:
+        time.sleep(0.01)
+    threading.Timer(0.2, release.set).start()
+    
+    from src.ai_service import GeminiService
+    service = GeminiService(controller)
+    service._call_model = lambda content_parts: controller.stats()["running"]
+    with AdmissionController.waiting(ticks.append):
+        assert service._admitted_call(["prompt"]) == 1, "Model call ran without an admission slot"
+    holder_thread.join(5)
+    assert ticks.count(1) > 3 and ticks[-1] == 0, f"Waiter not polled on every tick: {ticks}"
+    assert controller.stats()["running"] == 0, "Slot held after the model call"
+    
+    print("✅ Only model calls are admitted and waiters are polled on every tick")
+
+def test_bulk_mode():
+    """Test offline bulk analysis with the local batch backend."""
+    print("\n🧪 Testing bulk mode...")
+    
+    import os
+    import json
+    import base64
+    import tempfile
+    from src.bulk import BulkRequest, BulkRunner, LocalBatchBackend
+    from src.export import ResultsWriter
+    
+    jd = "Backend engineer: Python, Docker, Kubernetes and AWS"
+    requests = [
+        BulkRequest.build(f"Candidate {i}: Python and Docker on AWS", f"resume-{i}", jd) for i in range(5)
+    ]
+    
+    class Interrupted(Exception):
+        pass
+    
+    class InterruptedBackend(LocalBatchBackend):
+        def status(self, job_name):
+            raise Interrupted()
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work")
+        output = os.path.join(tmp_dir, "results.jsonl")
+        
+        # The first run is interrupted after submitting its jobs
+        try:
+            with ResultsWriter(output, flush_every=1) as writer:
+                BulkRunner(InterruptedBackend(), work_dir, chunk_size=2, poll_interval=0).run(requests, writer)
+            raise AssertionError("Run was not interrupted")
+        except Interrupted:
+            pass
+        
+        with open(os.path.join(work_dir, "checkpoint.json")) as handle:
+            chunks = json.load(handle)["chunks"]
+        assert [chunk["state"] for chunk in chunks] == ["submitted"] * 3, "Checkpoint not written"
+        
+        # The resumed run resubmits the lost jobs instead of packing the requests again
+        flaky = {requests[3].request_id}
+        
+        def responder(parts):
+            if any("Candidate 3" in part for part in parts) and flaky:
+                raise RuntimeError("quota")
+            return LocalBatchBackend._local_match(parts)
+        
+        with ResultsWriter(output, flush_every=1) as writer:
+            counts = BulkRunner(LocalBatchBackend(responder), work_dir, chunk_size=2, poll_interval=0).run(
+                requests, writer
+            )
+        assert counts == {"packed": 0, "joined": 4, "failed": 1}, f"Unexpected counts: {counts}"
+        
+        print("✅ Interrupted runs resume from the checkpoint")
+        
+        # The failed request is packed again on the next run
+        flaky.clear()
+        backend = LocalBatchBackend(responder)
+        with ResultsWriter(output, flush_every=1) as writer:
+            counts = BulkRunner(backend, work_dir, chunk_size=2, poll_interval=0).run(requests, writer)
+        assert counts == {"packed": 1, "joined": 1, "failed": 0}, f"Unexpected counts: {counts}"
+        assert len(backend.submitted) == 1, "Finished batches were resubmitted"
+        
+        with open(output) as handle:
+            rows = [json.loads(line) for line in handle]
+        assert sorted(row["request_id"] for row in rows) == sorted(r.request_id for r in requests)
+        assert all(row["match_percentage"] == 75 and row["missing_keywords"] == ["kubernetes"] for row in rows), \
+            f"Results not parsed: {rows[0]}"
+        
+        print("✅ Batch results are joined by request ID into parsed results")
+        
+        # Manifest resumes go through the same ingestion as uploads
+        import io
+        import zipfile
+        from src.bulk import load_manifest
+        namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("word/document.xml", f'<w:document xmlns:w="{namespace}"><w:body>'
+                                                  f'<w:p><w:r><w:t>Python, Docker, AWS</w:t></w:r></w:p>'
+                                                  f'</w:body></w:document>')
+        files = {
+            "resume.docx": buffer.getvalue(),
+            "resume.rtf": b"{\\rtf1\\ansi Python, Docker, AWS\\par}",
+            "resume.exe": b"MZ",
+        }
+        manifest = os.path.join(tmp_dir, "manifest.jsonl")
+        with open(manifest, "w") as handle:
+            for name, data in files.items():
+                path = os.path.join(tmp_dir, name)
+                with open(path, "wb") as resume_file:
+                    resume_file.write(data)
+                handle.write(json.dumps({"resume": path, "job_description": jd}) + "\n")
+        
+        loaded = list(load_manifest(manifest))
+        assert [bool(request.error) for request in loaded] == [False, False, True], \
+            f"Unsupported resume not failed: {[request.error for request in loaded]}"
+        loaded = loaded[:2]
+        assert all(request.duplicate_of is None for request in loaded), "Distinct resumes flagged as duplicates"
+        for request in loaded:
+            resume_part = request.parts[1]
+            assert "Python, Docker, AWS" in resume_part and "PK" not in resume_part and "\\par" not in resume_part, \
+                f"Resume not extracted: {resume_part!r}"
+        
+        print("✅ Manifest resumes of every supported format are extracted like uploads")
+        
+        # Near-duplicate resumes are flagged in the results
+        from src.bulk import find_duplicates
+        base = " ".join(f"Built service {i} in Python with Docker on AWS for team {i % 7}." for i in range(40))
+        with open(manifest, "w") as handle:
+            for name, text in [("first.txt", base), ("copy.txt", base + "\n"), ("other.txt", base.replace("Built service", "Designed cluster"))]:
+                path = os.path.join(tmp_dir, name)
+                with open(path, "w") as resume_file:
+                    resume_file.write(text)
+                handle.write(json.dumps({"resume": path, "job_description": jd}) + "\n")
+        
+        duplicates = find_duplicates(manifest)
+        loaded = list(load_manifest(manifest, duplicates))
+        assert [request.duplicate_of for request in loaded] == [None, loaded[0].resume_hash, None], \
+            f"Unexpected duplicates: {duplicates}"
+        output = os.path.join(tmp_dir, "duplicates.jsonl")
+        with ResultsWriter(output) as writer:
+            BulkRunner(LocalBatchBackend(), os.path.join(tmp_dir, "dup-work"), poll_interval=0).run(loaded, writer)
+        with open(output) as handle:
+            flagged = {row["resume_hash"]: row["duplicate_of"] for row in map(json.loads, handle)}
+        assert flagged[loaded[1].resume_hash] == loaded[0].resume_hash, f"duplicate_of not written: {flagged}"
+        
+        print("✅ Near-duplicate manifest resumes are flagged in the results")
+        
+        # Bad manifest lines become failed results instead of aborting the run
+        import fitz
+        scanned = os.path.join(tmp_dir, "scanned.pdf")
+        pdf = fitz.open()
+        pdf.new_page().draw_rect(fitz.Rect(72, 72, 300, 200), color=(0, 0, 0), fill=(0.2, 0.2, 0.2))
+        pdf.save(scanned)
+        pdf.close()
+        with open(manifest, "w") as handle:
+            handle.write(json.dumps({"resume": os.path.join(tmp_dir, "first.txt"), "job_description": jd}) + "\n")
+            handle.write(json.dumps({"resume": os.path.join(tmp_dir, "missing.pdf"), "job_description": jd}) + "\n")
+            handle.write(json.dumps({"resume": os.path.join(tmp_dir, "first.txt"), "request_id": "no-jd"}) + "\n")
+            handle.write("{not json\n")
+            handle.write(json.dumps({"resume": scanned, "job_description": jd, "request_id": "scanned"}) + "\n")
+        
+        loaded = {request.request_id: request for request in load_manifest(manifest)}
+        assert loaded["scanned"].parts[1]["mime_type"] == "image/jpeg", "Image-only PDF not sent as an image"
+        assert base64.b64decode(loaded["scanned"].parts[1]["data"])[:2] == b"\xff\xd8", "Page not rendered to JPEG"
+        assert "inline_data" in loaded["scanned"].to_batch_line()["request"]["contents"][0]["parts"][1]
+        
+        output = os.path.join(tmp_dir, "bad-lines.jsonl")
+        with ResultsWriter(output) as writer:
+            counts = BulkRunner(LocalBatchBackend(), os.path.join(tmp_dir, "bad-work"), poll_interval=0).run(
+                loaded.values(), writer
+            )
+        with open(output) as handle:
+            errors = {row["request_id"]: row["error"] for row in map(json.loads, handle)}
+        assert errors == {
+            next(iter(loaded)): None,
+            "manifest.jsonl:2": errors["manifest.jsonl:2"],
+            "no-jd": "Missing field 'job_description_path'",
+            "manifest.jsonl:4": "Manifest line is not a JSON object",
+        }, f"Unexpected results: {errors}"
+        assert "missing.pdf" in errors["manifest.jsonl:2"], f"Missing file not reported: {errors}"
+        # The local backend cannot read images, so the scanned resume stays unfinished for the next run
+        assert counts == {"packed": 2, "joined": 1, "failed": 4}, f"Unexpected counts: {counts}"
+        
+        print("✅ Bad manifest lines are failed results and image-only PDFs are sent as page images")
+
+def test_distributed_workers():
+    """Test the shared work queue with several worker processes."""
+    print("\n🧪 Testing distributed workers...")
+    
+    import os
+    import sys
+    import json
+    import time
+    import sqlite3
+    import tempfile
+    import subprocess
+    from src.work_queue import WorkQueue
+    from src.utils import PDFValidationError
+    from src.worker import Worker, local_responder, manifest_jobs
+    
+    def write_manifest(tmp_dir, count, extra=()):
+        manifest = os.path.join(tmp_dir, "manifest.jsonl")
+        with open(manifest, "w") as handle:
+            for i in range(count):
+                resume = os.path.join(tmp_dir, f"resume-{i}.txt")
+                with open(resume, "w") as resume_file:
+                    resume_file.write(f"Candidate {i}\nSkills\nPython, Docker, AWS\nExperience\n"
+                                      + " ".join(f"Built service {j} in Python with Docker on AWS." for j in range(20)))
+                handle.write(json.dumps({"resume": resume, "prompt_type": "analysis",
+                                         "job_description": "Backend engineer: Python, Docker, Kubernetes"}) + "\n")
+            for entry in extra:
+                handle.write(json.dumps(entry) + "\n")
+        return manifest
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bad_resume = os.path.join(tmp_dir, "resume.exe")
+        with open(bad_resume, "w") as handle:
+            handle.write("not a resume")
+        manifest = write_manifest(tmp_dir, 5, [{"resume": bad_resume, "job_description": "Python"}])
+        queue = WorkQueue(os.path.join(tmp_dir, "queue.db"), visibility_timeout=0.5, max_attempts=3)
+        
+        jobs = manifest_jobs(manifest)
+        assert sum(queue.enqueue(job_id, payload) for job_id, payload in jobs) == 6, "Jobs not enqueued"
+        assert sum(queue.enqueue(job_id, payload) for job_id, payload in jobs) == 0, "Jobs enqueued twice"
+        
+        # A worker that leases a job and dies never completes or renews it
+        abandoned = queue.lease("crashed-worker")[0]
+        worker = Worker(queue, local_responder(), threads=2, heartbeat_interval=0.1, poll_interval=0.1)
+        counts = worker.run(exit_when_empty=True)
+        
+        stats = queue.stats()
+        assert stats["done"] == 5 and stats["failed"] == 1 and stats["results"] == 5, f"Unexpected stats: {stats}"
+        assert counts == {"completed": 5, "failed": 1}, f"Unexpected counts: {counts}"
+        assert not queue.complete(abandoned.job_id, "crashed-worker", {"request_id": "late"}), \
+            "A late result replaced the stored one"
+        assert list(queue.failures().values()) == ["Please upload a PDF, DOCX, TXT, Markdown or RTF file."], \
+            "Invalid resume was not failed permanently"
+        
+        print("✅ Expired leases are re-leased and results are stored once")
+        
+        # Single-page PDFs are rendered in a render process, with the upload checks applied there
+        import base64
+        import fitz
+        from src.work_queue import Job
+        pdf_path = os.path.join(tmp_dir, "scan.pdf")
+        with fitz.open() as pdf_doc:
+            pdf_doc.new_page().insert_text((72, 72), "Jane Doe")
+            pdf_doc.save(pdf_path)
+        sent = []
+        worker = Worker(queue, lambda parts: sent.append(parts) or "Analysis")
+        try:
+            worker.process(Job("scan", {"resume": pdf_path, "job_description": "Python", "prompt_type": "analysis"}, 1, 0))
+        finally:
+            worker._local.render_engine.close()
+        image_part = sent[0][1]
+        assert image_part["mime_type"] == "image/jpeg" and base64.b64decode(image_part["data"])[:2] == b"\xff\xd8", \
+            "First page was not rendered to JPEG"
+        
+        print("✅ Worker pages are rendered through the render engine")
+        
+        # The local backend scores PDFs on their text and fails image-only PDFs instead of scoring them 0%
+        scanned_path = os.path.join(tmp_dir, "image-only.pdf")
+        with fitz.open() as pdf_doc:
+            pdf_doc.new_page().draw_rect(fitz.Rect(72, 72, 300, 200), color=(0, 0, 0), fill=(0.2, 0.2, 0.2))
+            pdf_doc.save(scanned_path)
+        text_path = os.path.join(tmp_dir, "text.pdf")
+        with fitz.open() as pdf_doc:
+            pdf_doc.new_page().insert_text((72, 72), "Skills: Python, Docker, AWS. " * 6)
+            pdf_doc.save(text_path)
+        worker = Worker(queue, local_responder())
+        result = worker.process(Job("text", {"resume": text_path, "job_description": "Python and Docker"}, 1, 0))
+        assert result["match_percentage"] == 100, f"Text PDF not scored on its text: {result['match_percentage']}"
+        try:
+            worker.process(Job("image-only", {"resume": scanned_path, "job_description": "Python and Docker"}, 1, 0))
+            raise AssertionError("Image-only PDF was scored locally")
+        except PDFValidationError as e:
+            assert "no text layer" in str(e), f"Unexpected error: {e}"
+        
+        print("✅ The local backend fails image-only PDFs instead of scoring them as empty")
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue_path = os.path.join(tmp_dir, "queue.db")
+        queue = WorkQueue(queue_path)
+        for job_id, payload in manifest_jobs(write_manifest(tmp_dir, 12)):
+            queue.enqueue(job_id, payload)
+        
+        env = dict(os.environ, WORKER_VISIBILITY_TIMEOUT="1", WORKER_HEARTBEAT_SECONDS="0.2",
+                   WORKER_POLL_SECONDS="0.1")
+        command = [sys.executable, "-m", "src.worker", "--queue", queue_path, "run", "--backend", "local",
+                   "--threads", "1"]
+        cwd = os.path.dirname(os.path.abspath(__file__))
+        
+        # This worker hangs on its first job and is then killed
+        victim = subprocess.Popen(command + ["--local-delay", "60"], cwd=cwd, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.time() + 30
+        while queue.stats()["leased"] == 0 and time.time() < deadline:
+            time.sleep(0.1)
+        victim.kill()
+        victim.wait()
+        assert queue.stats()["leased"] == 1, "The victim never leased a job"
+        
+        workers = [
+            subprocess.Popen(command + ["--local-delay", "0.2", "--exit-when-empty"], cwd=cwd, env=env,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            for _ in range(3)
+        ]
+        for process in workers:
+            assert process.wait(timeout=120) == 0, "A worker exited with an error"
+        
+        stats = queue.stats()
+        assert stats["done"] == 12 and stats["results"] == 12, f"Unexpected stats: {stats}"
+        with sqlite3.connect(queue_path) as connection:
+            worker_ids = {row[0] for row in connection.execute("SELECT worker_id FROM results")}
+            attempts = sorted(row[0] for row in connection.execute("SELECT attempts FROM jobs"))
+        assert len(worker_ids) > 1, "Only one worker processed jobs"
+        assert attempts == [1] * 11 + [2], f"Unexpected attempts: {attempts}"
+        
+        output = os.path.join(tmp_dir, "results.jsonl")
+        subprocess.run([sys.executable, "-m", "src.worker", "--queue", queue_path, "export", "--output", output],
+                       cwd=cwd, env=env, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(output) as handle:
+            rows = [json.loads(line) for line in handle]
+        assert len(rows) == 12, "Results were not exported"
+        # The manifest's resumes differ only in the candidate number
+        originals = {row["resume_hash"] for row in rows if row["duplicate_of"] is None}
+        assert len(originals) < 6 and all(row["duplicate_of"] in originals for row in rows
+                                          if row["duplicate_of"] is not None), "Near-duplicates were not flagged"
+        
+        print(f"✅ {len(worker_ids)} worker processes shared the queue and recovered a killed worker's job")
+
+def test_match_matrix():
+    """Test local skill matching and the resume x job score matrix."""
+    print("\n🧪 Testing match matrix...")
+    
+    from src.matching import SkillExtractor, LocalMatcher, MatchMatrix
+    
+    extractor = SkillExtractor()
+    skills = extractor.extract("Python, Go, k8s and Node.js; we go to R&D meetings")
+    assert skills == {"python", "go", "kubernetes", "node.js"}, f"Unexpected skills: {skills}"
+    
+    result = LocalMatcher(extractor).score("Python and Docker on AWS", "Python, Docker, Kubernetes, AWS")
+    assert result.missing == ["kubernetes"], f"Unexpected missing skills: {result.missing}"
+    assert result.score == 75, f"Expected 75, got {result.score}"
+    
+    print("✅ Local matching extracts skills and scores coverage")
+    
+    resumes = {"alice": "Python Django PostgreSQL AWS", "bob": "Java Spring Kubernetes Docker"}
+    jobs = {"backend": "Python, Django, PostgreSQL", "platform": "Kubernetes, Docker, Terraform"}
+    matrix = MatchMatrix.build(resumes, jobs, extractor)
+    
+    assert matrix.scores.shape == (2, 2), "Matrix has the wrong shape"
+    assert matrix.top_jobs("alice", 1)[0][0] == "backend", "Wrong best job for alice"
+    assert matrix.top_resumes("platform", 1)[0][0] == "bob", "Wrong best resume for platform"
+    assert matrix.missing_keywords("bob", "platform") == ["terraform"], "Wrong missing keywords"
+    assert matrix.score("alice", "backend") == 100, "Full coverage should score 100"
+    
+    print("✅ Score matrix, top-k and missing keywords are correct")
+    
+    class QuietService:
+        def generate_quietly(self, content_parts):
+            return None if "Java" in content_parts[1] else f"Narrative for {content_parts[0]}"
+        
+        def generate_text_response(self, *args, **kwargs):
+            raise AssertionError("Narratives must not use the UI-bound request path")
+    
+    narratives = matrix.narrate_top_cells(QuietService(), resumes, jobs, "prompt", k=2)
+    assert narratives == {("alice", "backend"): "Narrative for Python, Django, PostgreSQL",
+                          ("bob", "platform"): None}, f"Unexpected narratives: {narratives}"
+    
+    print("✅ Top cells are narrated quietly, failures left empty")
+    
+    # The matrix command scores resumes in blocks and writes the same top-k cells as the full matrix
+    import json
+    import random
+    import tempfile
+    from src.bulk import main as bulk_main
+    skills = ["Python", "Django", "PostgreSQL", "AWS", "Docker", "Kubernetes", "Terraform", "Java", "React", "Go"]
+    rng = random.Random(7)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        def write_files(prefix, count, size):
+            texts = {}
+            for i in range(count):
+                path = os.path.join(tmp_dir, f"{prefix}-{i}.txt")
+                texts[path] = ", ".join(rng.sample(skills, size))
+                with open(path, "w") as handle:
+                    handle.write(texts[path])
+            return texts
+        
+        resume_texts, job_texts = write_files("resume", 7, 4), write_files("jd", 4, 3)
+        output = os.path.join(tmp_dir, "matrix.jsonl")
+        bulk_main(["matrix", "--resumes", *resume_texts, "--jds", *job_texts, "--output", output,
+                   "--top-k", "2", "--block-rows", "3"])
+        with open(output) as handle:
+            cells = {row["request_id"]: row for row in map(json.loads, handle)}
+        
+        full = MatchMatrix.build(resume_texts, job_texts, extractor)
+        expected = {(r, j) for r in resume_texts for j, _ in full.top_jobs(r, 2)}
+        expected |= {(r, j) for j in job_texts for r, _ in full.top_resumes(j, 2)}
+        assert set(cells) == {f"{r}::{j}" for r, j in expected}, "Blocked matrix wrote different top-k cells"
+        for r, j in expected:
+            cell = cells[f"{r}::{j}"]
+            assert cell["match_percentage"] == full.score(r, j) and \
+                cell["missing_keywords"] == full.missing_keywords(r, j), f"Wrong cell {r} x {j}: {cell}"
+    
+    print("✅ Matrix command writes per-resume and per-job top-k cells in blocks")
+
+def test_incremental_matcher():
+    """Test live re-scoring from incremental term count updates."""
+    print("\n🧪 Testing incremental matcher...")
+    
+    import random
+    from src.matching import IncrementalMatcher, LocalMatcher
+    
+    matcher = LocalMatcher()
+    jd = "Backend engineer\nPython, Docker and Kubernetes required\nAWS or GCP a plus\nSQL daily"
+    resume = [f"Line {i}: shipped features" for i in range(200)] + ["Skills: Python, SQL"]
+    
+    live = IncrementalMatcher(matcher)
+    result = live.update(resume_text="\n".join(resume), job_description=jd)
+    assert result == matcher.score("\n".join(resume), jd), "Initial score differs from a full computation"
+    
+    scanned = live.lines_scanned
+    resume[100] = "Line 100: deployed services with Docker on Kubernetes"
+    result = live.update(resume_text="\n".join(resume))
+    assert live.lines_scanned - scanned == 1, f"Scanned {live.lines_scanned - scanned} lines for a one-line edit"
+    assert "docker" in result.matched and "kubernetes" in result.matched, f"Edit not scored: {result}"
+    assert live.previous.score < result.score, "Previous score not kept"
+    
+    print("✅ A one-line edit rescans one line")
+    
+    rng = random.Random(7)
+    words = ["Python", "Docker", "AWS", "GCP", "SQL", "Kubernetes", "Excel", "team", "built", "k8s"]
+    for _ in range(200):
+        position = rng.randrange(len(resume) + 1)
+        action = rng.choice(["insert", "delete", "replace"])
+        line = " ".join(rng.choice(words) for _ in range(4))
+        if action == "insert" or not resume:
+            resume.insert(position, line)
+        elif action == "delete":
+            del resume[min(position, len(resume) - 1)]
+        else:
+            resume[min(position, len(resume) - 1)] = line
+        result = live.update(resume_text="\n".join(resume))
+        assert result == matcher.score("\n".join(resume), jd), "Incremental score drifted"
+    
+    jd += "\nTerraform experience"
+    assert live.update(job_description=jd) == matcher.score("\n".join(resume), jd), "JD edit not scored"
+    
+    print("✅ Incremental scores match full recomputation across random edits")
+
+def test_results_writer():
+    """Test streaming export and resume after interruption."""
+    print("\n🧪 Testing results writer...")
+    
+    import tempfile
+    from src.export import ResultsWriter
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for fmt in ("jsonl", "csv"):
+            path = os.path.join(tmp_dir, f"results.{fmt}")
+            
+            with ResultsWriter(path, flush_every=2) as writer:
+                for i in range(3):
+                    writer.append({
+                        "request_id": f"req-{i}",
+                        "match_percentage": 70 + i,
+                        "missing_keywords": ["Kubernetes"],
+                        "timings": {"llm": 1.2}
+                    })
+            
+            # Simulate a crash in the middle of writing a record
+            with open(path, "a", encoding="utf-8") as f:
+                f.write('req-9,"partial')
+            
+            resumed = ResultsWriter(path)
+            assert resumed.completed_ids == {"req-0", "req-1", "req-2"}, f"{fmt}: wrong completed ids"
+            assert not resumed.append({"request_id": "req-1"}), f"{fmt}: duplicate was appended"
+            assert resumed.append({"request_id": "req-3"}), f"{fmt}: new record was rejected"
+            resumed.close()
+            
+            assert len(ResultsWriter(path).completed_ids) == 4, f"{fmt}: resumed record missing"
+    
+    print("✅ JSONL and CSV exports flush incrementally and resume idempotently")
+    
+    # CSV fields with line breaks: a crash right after one leaves a torn record ending in a newline
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "results.csv")
+        with ResultsWriter(path) as writer:
+            writer.append({"request_id": "req-0", "response": "**Match Percentage**: 80%\n\n- Kubernetes\n"})
+        with open(path, "rb") as f:
+            complete = f.read()
+        with open(path, "a", encoding="utf-8", newline="") as f:
+            f.write('req-1,,,,,,,,"**Match Percentage**: 75%\n')
+        
+        resumed = ResultsWriter(path)
+        assert resumed.completed_ids == {"req-0"}, f"Wrong completed ids: {resumed.completed_ids}"
+        resumed.close()
+        with open(path, "rb") as f:
+            assert f.read() == complete, "Torn CSV record was not removed"
+    
+    print("✅ Torn CSV records with multi-line fields are removed on resume")
+    
+    # The repair reads small blocks and works on bytes, so characters split across blocks cannot shift the cut
+    from src.config import Config
+    original_block = Config.EXPORT_SCAN_BLOCK_BYTES
+    Config.EXPORT_SCAN_BLOCK_BYTES = 7
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fmt, complete, torn in [
+                ("csv", "req-0,,,,,,,,\"caf\u00e9 \u2014 \u2022\nsecond \"\"line\"\"\",\r\n".encode("utf-8"), "req-1,,,,,,,,\"open \u2014\n".encode("utf-8")),
+                ("jsonl", "{\"request_id\":\"req-0\",\"response\":\"\u2014\u2022\"}\n".encode("utf-8"), b'{"request_id":"req-1","resp'),
+            ]:
+                path = os.path.join(tmp_dir, f"results.{fmt}")
+                with open(path, "wb") as f:
+                    f.write(complete + torn)
+                ResultsWriter(path).close()
+                with open(path, "rb") as f:
+                    assert f.read() == complete, f"{fmt}: wrong repair"
+    finally:
+        Config.EXPORT_SCAN_BLOCK_BYTES = original_block
+    
+    print("✅ Torn tails are found block by block on raw bytes")
+
+def test_resilience():
+    """Test deadlines, hedged requests and the circuit breaker."""
+    print("\n🧪 Testing request resilience...")
+    
+    import time
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from src.resilience import CircuitBreaker, DeadlineExceeded, HedgedCaller
+    
+    executor = ThreadPoolExecutor(max_workers=4)
+    caller = HedgedCaller(executor, min_delay=0.05, max_delay=0.05, max_hedge_ratio=1.0, enabled=True)
+    
+    # The first attempt hangs, the hedge answers quickly
+    attempts = []
+    lock = threading.Lock()
+    
+    def slow_then_fast():
+        with lock:
+            attempts.append(1)
+            first = len(attempts) == 1
+        time.sleep(1.0 if first else 0.01)
+        return "slow" if first else "fast"
+    
+    assert caller.call(slow_then_fast, deadline=2.0) == "fast", "Hedge response did not win"
+    assert caller.stats()["hedge_wins"] == 1, "Hedge win not counted"
+    
+    print("✅ Hedged request wins over a slow primary")
+    
+    try:
+        caller.call(lambda: time.sleep(0.5), deadline=0.1, hedge=False)
+        raise AssertionError("Deadline was not enforced")
+    except DeadlineExceeded:
+        pass
+    
+    print("✅ Deadlines are enforced")
+    
+    breaker = CircuitBreaker(failure_rate=0.5, window=10, min_calls=4, open_seconds=0.1)
+    for _ in range(4):
+        assert breaker.allow(), "Breaker opened too early"
+        breaker.record_failure()
+    assert not breaker.allow(), "Breaker did not open"
+    
+    time.sleep(0.15)
+    assert breaker.allow(), "Breaker did not allow a probe after cool-down"
+    assert not breaker.allow(), "Breaker allowed more than one probe"
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED, "Successful probe did not close the breaker"
+    
+    print("✅ Circuit breaker opens, probes and closes")
+    
+    executor.shutdown(wait=False)
+
+def test_single_flight():
+    """Test coalescing of identical concurrent requests."""
+    print("\n🧪 Testing single-flight coalescing...")
+    
+    import time
+    import threading
+    from src.resilience import SingleFlight
+    
+    flight = SingleFlight()
+    executions = []
+    results = []
+    
+    def expensive_call():
+        executions.append(1)
+        time.sleep(0.2)
+        return "response"
+    
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("same-key", expensive_call)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert len(executions) == 1, f"Expected 1 execution, got {len(executions)}"
+    assert [value for value, _ in results] == ["response"] * 5, "Not every caller got the result"
+    assert sum(shared for _, shared in results) == 4, "Shared results not flagged"
+    assert flight.stats()["coalesced"] == 4, "Coalesced calls not counted"
+    
+    # Once the call has finished, the next one runs again
+    flight.do("same-key", expensive_call)
+    assert len(executions) == 2, "Completed flight was reused"
+    
+    print("✅ Concurrent identical calls share one execution")
+
+def test_concurrency_limiter():
+    """Test the process-wide Gemini concurrency limiter."""
+    print("\n🧪 Testing shared AI concurrency limiter...")
+    
+    from src.ai_service import GeminiConcurrencyLimiter
+    
+    assert GeminiConcurrencyLimiter.get() is GeminiConcurrencyLimiter.get(), "Limiter is not shared"
+    
+    limiter = GeminiConcurrencyLimiter(max_concurrency=2)
+    with limiter.lease():
+        with limiter.lease():
+            stats = limiter.stats()
+            assert stats["in_use"] == 2 and stats["utilization"] == 1.0, "Slot usage not tracked"
+    
+    stats = limiter.stats()
+    assert stats["in_use"] == 0 and stats["peak_in_use"] == 2, "Slots not released"
+    assert stats["requests"] == 2, "Requests not counted"
+    
+    print("✅ Limiter is shared and tracks slot utilization")
+
+def test_scoring_cascade():
+    """Test the local-first scoring cascade and its calibration."""
+    print("\n🧪 Testing scoring cascade...")
+    
+    import tempfile
+    from src.matching import ScoringCascade
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cascade = ScoringCascade(
+            reject_below=20,
+            accept_above=90,
+            log_path=os.path.join(tmp_dir, "scores.jsonl"),
+            thresholds_path=os.path.join(tmp_dir, "thresholds.json")
+        )
+        
+        jd = "Python, Django, PostgreSQL, Docker and Kubernetes"
+        assert cascade.decide("Python Django PostgreSQL Docker Kubernetes", jd).verdict == "strong"
+        assert cascade.decide("Sales and marketing", jd).verdict == "reject"
+        assert cascade.decide("Python and Docker", jd).escalate, "Ambiguous match was not escalated"
+        
+        print("✅ Clear rejects and matches resolve locally, the middle band escalates")
+        
+        # Too few lexicon skills in the JD to judge locally, whatever the score
+        non_tech_jd = "Store manager with retail experience, leadership and customer service skills"
+        decision = cascade.decide("Ten years managing retail stores", non_tech_jd)
+        assert decision.local.jd_skills == 0
+        assert decision.verdict == "ambiguous", f"JD without known skills resolved as {decision.verdict}"
+        assert cascade.decide("Marketing", "Looking for a Python developer").escalate, \
+            "Single-skill JD was resolved locally"
+        
+        # Their local scores say nothing about the LLM's, so they are not used for calibration
+        cascade.log_llm_score(0, 85, jd_skills=0)
+        assert cascade.load_pairs() == [], "Pair escalated for too few skills was logged"
+        
+        print("✅ Job descriptions with too few known skills always go to the LLM")
+        
+        # Local scores track the LLM well at the extremes and poorly in the middle
+        for local in range(0, 101, 2):
+            llm = 10 if local < 30 else 90 if local >= 70 else 50
+            cascade.log_llm_score(local, llm)
+        
+        report = cascade.calibrate(target_agreement=1.0)
+        assert report.reject_below == 30, f"Unexpected reject threshold {report.reject_below}"
+        assert report.accept_above == 70, f"Unexpected accept threshold {report.accept_above}"
+        assert report.agreement == 1.0, "Calibrated decisions disagree with the LLM"
+        assert 0 < report.escalation_rate < 1, "Escalation rate out of range"
+        
+        reloaded = ScoringCascade(log_path=cascade.log_path, thresholds_path=cascade.thresholds_path)
+        assert reloaded.reject_below == 30, "Calibrated thresholds were not persisted"
+    
+    print("✅ Calibration against logged LLM scores picks the agreeing bands")
+    
+    # A sample of locally resolvable pairs still goes to the LLM, weighted up in the calibration log
+    import io
+    import json
+    import contextlib
+    from src.config import Config
+    from src.matching import main as cascade_main
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cascade = ScoringCascade(reject_below=20, accept_above=90, log_path=os.path.join(tmp_dir, "scores.jsonl"),
+                                 thresholds_path=os.path.join(tmp_dir, "thresholds.json"))
+        decisions = [cascade.decide(f"Sales and marketing {i}", jd) for i in range(400)]
+        audited = [d for d in decisions if d.audit]
+        assert all(d.verdict == "reject" for d in decisions), "Sampling changed verdicts"
+        assert all(d.escalate for d in audited), "Audited pairs were not escalated"
+        assert 0 < len(audited) < 60, f"Unexpected audit sample: {len(audited)} of 400"
+        assert cascade.decide("Sales and marketing 0", jd).audit == decisions[0].audit, "Sampling is not stable"
+        
+        cascade.log_llm_score(5, 10, jd_skills=5, audit=True)
+        assert len(cascade.load_pairs()) == round(1 / Config.CASCADE_AUDIT_RATE), "Audited pair was not weighted"
+        
+        for local in range(0, 101, 2):
+            cascade.log_llm_score(local, 10 if local < 30 else 90 if local >= 70 else 50)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cascade_main(["calibrate", "--log", cascade.log_path, "--thresholds", cascade.thresholds_path,
+                          "--target-agreement", "1.0"])
+        report = json.loads(output.getvalue())
+        assert (report["reject_below"], report["accept_above"]) == (30, 70), f"Unexpected report: {report}"
+        assert ScoringCascade(log_path=cascade.log_path, thresholds_path=cascade.thresholds_path).accept_above == 70
+    
+    print("✅ Audited local decisions are weighted and calibration runs from the command line")
+
 def test_file_structure():
     """Test if required files and directories exist."""
     print("\n🧪 Testing file structure...")
@@ -238,7 +1751,28 @@ def main():
         test_config,
         test_utilities,
         test_prompts,
-        test_visualization
+        test_visualization,
+        test_jd_compaction,
+        test_resume_parser,
+        test_upload_validation,
+        test_document_ingestion,
+        test_render_engine,
+        test_session_store,
+        test_memory_accounting,
+        test_request_profiler,
+        test_duplicate_detection,
+        test_map_reduce,
+        test_speculative_pipeline,
+        test_admission_control,
+        test_bulk_mode,
+        test_distributed_workers,
+        test_match_matrix,
+        test_incremental_matcher,
+        test_results_writer,
+        test_resilience,
+        test_single_flight,
+        test_concurrency_limiter,
+        test_scoring_cascade
     ]
     
     passed = 0
@@ -246,10 +1780,13 @@ def main():
     
     for test in tests:
         try:
-            if test():
+            # Older tests report failure by returning False, newer ones by raising
+            if test() is not False:
                 passed += 1
             else:
                 print(f"❌ {test.__name__} failed")
+        except AssertionError as e:
+            print(f"❌ {test.__name__} failed: {e}")
         except Exception as e:
             print(f"❌ {test.__name__} crashed: {e}")
     